@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Automatic ROI calibration for Mine Tool.
+
+Run this while the minigame is on screen to find the curved bar (see
+mine_tool.calibrate.locate_bar) and write its ROI to config.ini:
+
+    python calibrate.py
+    python calibrate.py --image assets/roi_example.png --dry-run
+"""
+import argparse
+import sys
+import time
+
+import cv2
+
+from mine_tool.calibrate import grab_screen, locate_bar
+from mine_tool.config import CONFIG_FILE, load_config, save_roi
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Locate the minigame's curved bar and store its ROI in config.ini.")
+    parser.add_argument('--image', help="Search this screenshot instead of the screen")
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help="Seconds to keep searching the screen for the bar (default: 10)")
+    parser.add_argument('--dry-run', action='store_true', help="Only print the ROI, do not write config.ini")
+    args = parser.parse_args(argv)
+
+    config = load_config(CONFIG_FILE)
+    colors = (config.bar_bgr, config.grey_bgr, config.white_bgr)
+    found = None
+    if args.image:
+        image = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if image is None:
+            parser.error(f"Could not read image '{args.image}'")
+        found = locate_bar(image, *colors, config.color_tolerance, config.bar_thickness_percentage)
+    else:
+        print(f"Searching the screen for the curved bar for up to {args.timeout:g} s. "
+              f"Start mining so the minigame is visible.")
+        deadline = time.perf_counter() + args.timeout
+        while found is None and time.perf_counter() < deadline:
+            image, (left, top, _, _) = grab_screen(config.capture_backend)
+            found = locate_bar(image, *colors, config.color_tolerance, config.bar_thickness_percentage)
+            if found is not None:
+                (x1, y1, x2, y2), score = found
+                found = ((x1 + left, y1 + top, x2 + left, y2 + top), score)
+            else:
+                time.sleep(0.2)
+
+    if found is None:
+        print("Could not find the curved bar. Check HEX_BAR, HEX_GREY, HEX_WHITE and COLOR_TOLERANCE.",
+              file=sys.stderr)
+        return 1
+
+    roi, score = found
+    print(f"Found the curved bar at ({roi[0]},{roi[1]}) to ({roi[2]},{roi[3]}), "
+          f"{roi[2] - roi[0]}x{roi[3] - roi[1]} px, shape match {score:.2f}.")
+    if not args.dry_run:
+        save_roi(roi, CONFIG_FILE)
+        print(f"Saved the ROI to '{CONFIG_FILE}'.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
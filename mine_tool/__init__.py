@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Mine Tool detection core as an importable package.
+
+Importing the package is free of side effects: no config file is read or
+written, and no mouse, keyboard or GUI hooks are created. The names below are
+loaded lazily from their submodules on first access, so
+`from mine_tool import Detector` only pulls in NumPy and OpenCV, and
+`from mine_tool import load_config` only the standard library.
+
+    from mine_tool import Detector, load_config
+
+    config = load_config()
+    detector = Detector.from_config(config)
+    detection = detector.detect(frame_bgr)
+"""
+import importlib
+
+__version__ = "1.0.0-beta.1"
+
+# Public name -> submodule it is defined in
+_EXPORTS = {
+    'Config': 'config',
+    'InstanceConfig': 'config',
+    'load_config': 'config',
+    'save_roi': 'config',
+    'ArcGeometry': 'geometry',
+    'get_arc_geometry': 'geometry',
+    'Detection': 'detector',
+    'Detector': 'detector',
+    'BatchDetector': 'batch',
+    'CaptureBackend': 'capture',
+    'CaptureError': 'capture',
+    'EndOfStream': 'capture',
+    'FileCapture': 'capture',
+    'MultiRoiCapture': 'capture',
+    'create_capture_backend': 'capture',
+    'MouseReleaseSink': 'actions',
+    'RecordingReleaseSink': 'actions',
+    'ScheduledReleaser': 'actions',
+    'StreamTimeReleaser': 'actions',
+    'RoiProcessor': 'loop',
+    'processing_loop': 'loop',
+    'multi_roi_loop': 'loop',
+    'MinigameSimulator': 'sim',
+    'SimulatedCapture': 'sim',
+    'SimulatedMouse': 'sim',
+    'run_simulation': 'sim',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
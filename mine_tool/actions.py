@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Release actions for Mine Tool.
+
+Sinks perform the actual release (`release(frame_index, timestamp)`).
+Releasers decide *when* a sink fires: `ScheduledReleaser` runs a dedicated
+high-priority thread that fires at a precise deadline, independent of the
+frame rate, while `StreamTimeReleaser` does the same against the capture's
+stream time for headless replays.
+"""
+import os
+import sys
+import threading
+import time
+
+class MouseReleaseSink:
+    """Releases the left mouse button through pynput."""
+
+    def __init__(self):
+        from pynput.mouse import Controller as MouseController, Button
+        self._mouse = MouseController()
+        self._button = Button.left
+
+    def release(self, frame_index, timestamp):
+        self._mouse.release(self._button)
+
+class KeyReleaseSink:
+    """Releases a keyboard key through pynput, for clients that mine with a held key."""
+
+    def __init__(self, key_name):
+        from pynput.keyboard import Controller as KeyboardController, Key, KeyCode
+        if len(key_name) == 1:
+            self._key = KeyCode.from_char(key_name)
+        else:
+            try:
+                self._key = Key[key_name]
+            except KeyError:
+                raise ValueError(f"Unknown key '{key_name}'") from None
+        self._keyboard = KeyboardController()
+
+    def release(self, frame_index, timestamp):
+        self._keyboard.release(self._key)
+
+def create_release_sink(action):
+    """
+    Creates the sink for a release ACTION: 'mouse' releases the left mouse
+    button, 'key:<name>' (e.g. 'key:space', 'key:e') releases that key.
+    Raises ValueError for anything else.
+    """
+    if action == 'mouse':
+        return MouseReleaseSink()
+    if action.startswith('key:') and action[4:]:
+        return KeyReleaseSink(action[4:])
+    raise ValueError(f"Unknown release action '{action}'; use 'mouse' or 'key:<name>'")
+
+class RecordingReleaseSink:
+    """Records every release instead of touching the mouse."""
+
+    def __init__(self):
+        self.releases = []
+
+    def release(self, frame_index, timestamp):
+        self.releases.append({'frame_index': frame_index, 'timestamp': timestamp})
+
+def _raise_thread_priority():
+    """Best-effort increase of the calling thread's scheduling priority."""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            THREAD_PRIORITY_TIME_CRITICAL = 15
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL)
+        elif hasattr(os, 'setpriority'):
+            # On Linux a thread's native id can be used as a per-thread nice target
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+    except (OSError, AttributeError):
+        pass
+
+class ScheduledReleaser:
+    """
+    Fires a sink at a scheduled deadline from a dedicated action thread.
+
+    The detector calls `schedule()` with the predicted time until the grey line
+    reaches the center, measured from the frame's capture time. Each newer
+    frame replaces the pending deadline or cancels it, so the release is no
+    longer tied to frame boundaries. The thread sleeps until shortly before the
+    deadline and spins out the remainder for sub-millisecond precision.
+    """
+
+    # Below this much remaining time, spin instead of waiting on the condition
+    SPIN_THRESHOLD = 0.002
+
+    def __init__(self, sink):
+        self._sink = sink
+        self._cond = threading.Condition()
+        self._deadline = None
+        self._pending = None
+        self._fired = None
+        self._running = False
+        self._thread = None
+        self._timer_period_set = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if sys.platform == 'win32':
+            # Raise the system timer resolution to 1 ms so waits wake up on time
+            try:
+                import ctypes
+                self._timer_period_set = ctypes.windll.winmm.timeBeginPeriod(1) == 0
+            except (OSError, AttributeError):
+                pass
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="release-action", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._timer_period_set:
+            import ctypes
+            ctypes.windll.winmm.timeEndPeriod(1)
+            self._timer_period_set = False
+
+    def schedule(self, delay, frame_index, frame_time, captured_at):
+        """
+        Schedules (or reschedules) the release `delay` seconds after the frame
+        captured at `captured_at` (perf_counter time). `frame_time + delay` is
+        passed to the sink as the release timestamp.
+        """
+        with self._cond:
+            self._deadline = captured_at + delay
+            self._pending = (frame_index, frame_time + delay)
+            self._cond.notify()
+
+    def cancel(self):
+        """Cancels the pending release, if any."""
+        with self._cond:
+            if self._deadline is not None:
+                self._deadline = None
+                self._pending = None
+                self._cond.notify()
+
+    @property
+    def pending(self):
+        return self._deadline is not None
+
+    def overdue(self, frame_time):
+        """True if a release is pending past its deadline."""
+        deadline = self._deadline
+        return deadline is not None and time.perf_counter() >= deadline
+
+    def fire(self, frame_time):
+        """
+        Fires the pending release now, from the calling thread, and returns
+        its timestamp; None if nothing was pending.
+        """
+        with self._cond:
+            if self._deadline is None:
+                return None
+            frame_index, release_time = self._pending
+            self._deadline = self._pending = None
+            self._cond.notify()
+            self._sink.release(frame_index, release_time)
+            return release_time
+
+    def poll(self, frame_time):
+        """Returns the timestamp of a release fired since the last poll, or None."""
+        with self._cond:
+            fired, self._fired = self._fired, None
+            return fired
+
+    def _run(self):
+        _raise_thread_priority()
+        with self._cond:
+            while self._running:
+                if self._deadline is None:
+                    self._cond.wait()
+                    continue
+
+                remaining = self._deadline - time.perf_counter()
+                if remaining > self.SPIN_THRESHOLD:
+                    self._cond.wait(remaining - self.SPIN_THRESHOLD)
+                    continue
+                if remaining > 0:
+                    # Briefly drop the lock so newer frames can still refine or cancel
+                    self._cond.wait(0)
+                    continue
+
+                frame_index, release_time = self._pending
+                self._deadline = self._pending = None
+                self._fired = release_time
+                self._sink.release(frame_index, release_time)
+
+class StreamTimeReleaser:
+    """
+    Scheduled releaser driven by capture timestamps instead of a thread.
+
+    Used for headless replays that run faster (or slower) than real time: a
+    pending release fires on the first frame whose timestamp reaches the
+    deadline, and is recorded at the exact deadline time.
+    """
+
+    def __init__(self, sink):
+        self._sink = sink
+        self._deadline = None
+        self._frame_index = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def schedule(self, delay, frame_index, frame_time, captured_at):
+        self._deadline = frame_time + delay
+        self._frame_index = frame_index
+
+    def cancel(self):
+        self._deadline = None
+
+    @property
+    def pending(self):
+        return self._deadline is not None
+
+    def overdue(self, frame_time):
+        return self._deadline is not None and frame_time >= self._deadline
+
+    def fire(self, frame_time):
+        if self._deadline is None:
+            return None
+        self._deadline = None
+        self._sink.release(self._frame_index, frame_time)
+        return frame_time
+
+    def poll(self, frame_time):
+        if self._deadline is None or frame_time < self._deadline:
+            return None
+        fired, self._deadline = self._deadline, None
+        self._sink.release(self._frame_index, fired)
+        return fired
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Automatic ROI calibration and tracking for Mine Tool.
+
+`locate_bar` finds the minigame's curved bar in a screenshot from its colors
+(the dark bar with the grey line and white area on it) and its quarter-ring
+shape, and returns the tight ROI the detection expects: the bar's bounding
+box, with the ring's center at the bottom-left corner.
+
+The `calibrate.py` script at the top of the repository runs it on the
+screen and writes the ROI to config.ini.
+
+During a session, `RoiTracker` re-locates the bar near the last known ROI
+whenever detection has been lost for a while (e.g. after the game window
+moved), so the captured region can stay tight.
+"""
+import sys
+
+import cv2
+import numpy as np
+
+from .capture import CaptureError, create_capture_backend
+from .detector import color_bounds
+from .geometry import build_curved_bar_mask
+
+def _color_mask(image_bgr, target_bgr, tolerance):
+    return cv2.inRange(image_bgr, *color_bounds(target_bgr, tolerance))
+
+def locate_bar(image_bgr, bar_bgr, grey_bgr, white_bgr, tolerance, thickness_percentage,
+               min_size=30, min_score=0.5, expected_size=None):
+    """
+    Searches `image_bgr` for the curved bar.
+
+    Candidates are connected regions of bar, grey-line and white-area colored
+    pixels. A candidate is accepted if its bounding box is roughly square, at
+    least `min_size` pixels, overlaps the ideal quarter ring of that size with
+    an IoU of at least `min_score`, and has grey-line or white-area pixels on
+    the ring. If `expected_size` = (width, height) is given, only candidates
+    within 15% of it are considered.
+
+    Returns ((x1, y1, x2, y2), score) for the best candidate in image
+    coordinates, or None.
+    """
+    markers = cv2.bitwise_or(_color_mask(image_bgr, grey_bgr, tolerance),
+                             _color_mask(image_bgr, white_bgr, tolerance))
+    combined = cv2.bitwise_or(_color_mask(image_bgr, bar_bgr, tolerance), markers)
+    # Close the small gaps the grey line, white area and anti-aliasing leave in the ring
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+    combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel)
+
+    contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = None
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if min(w, h) < min_size or not 0.75 <= w / h <= 1.33:
+            continue
+        if expected_size is not None:
+            expected_w, expected_h = expected_size
+            if abs(w - expected_w) > 0.15 * expected_w or abs(h - expected_h) > 0.15 * expected_h:
+                continue
+
+        ring = build_curved_bar_mask(w, h, thickness_percentage) > 0
+        blob = combined[y:y + h, x:x + w] > 0
+        union = np.count_nonzero(blob | ring)
+        score = np.count_nonzero(blob & ring) / union if union else 0.0
+        if score < min_score:
+            continue
+        if not markers[y:y + h, x:x + w][ring].any():
+            continue
+        if best is None or score > best[1]:
+            best = ((x, y, x + w, y + h), float(score))
+    return best
+
+class RoiTracker:
+    """
+    Re-locates the bar around the current ROI when detection is lost.
+
+    `update()` is called once per frame with whether anything was detected.
+    After `lost_after` seconds without a detection, and then at most every
+    `interval` seconds, it grabs the ROI expanded by `margin` times its size
+    on each side and searches it for a bar of the same size. If the bar is
+    found elsewhere, the capture is moved there (the ROI size never changes)
+    and the new ROI is returned.
+
+    The search area always has the same size, so one capture backend is
+    opened for it up front and moved along with the ROI; `close()` releases
+    it. The search only succeeds while the minigame is on screen, so between
+    rounds it costs one small grab per `interval`.
+    """
+
+    def __init__(self, capture, backend_name, bar_bgr, grey_bgr, white_bgr, tolerance,
+                 thickness_percentage, interval=1.0, margin=1.0, lost_after=0.5):
+        self.capture = capture
+        self.backend_name = backend_name
+        self.colors = (bar_bgr, grey_bgr, white_bgr)
+        self.tolerance = tolerance
+        self.thickness_percentage = thickness_percentage
+        self.interval = interval
+        self.margin = margin
+        self.lost_after = lost_after
+        self.relocations = 0
+        self._last_seen = None
+        self._last_search = None
+        self._backend = create_capture_backend(backend_name, self.search_bbox())
+
+    def close(self):
+        """Releases the capture backend of the search area."""
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+
+    def search_bbox(self):
+        """
+        The current ROI expanded by `margin` times its size on each side,
+        shifted rather than clipped at the top and left screen edges so its
+        size stays the same.
+        """
+        x1, y1, x2, y2 = self.capture.bbox
+        pad_x, pad_y = int((x2 - x1) * self.margin), int((y2 - y1) * self.margin)
+        left, top = max(0, x1 - pad_x), max(0, y1 - pad_y)
+        return (left, top, left + x2 - x1 + 2 * pad_x, top + y2 - y1 + 2 * pad_y)
+
+    def update(self, detected, now):
+        if detected or self._last_seen is None:
+            self._last_seen = now
+            return None
+        if now - self._last_seen < self.lost_after:
+            return None
+        if self._last_search is not None and now - self._last_search < self.interval:
+            return None
+        self._last_search = now
+        return self.search()
+
+    def search(self):
+        """Searches around the current ROI once; returns the new ROI if the bar moved."""
+        x1, y1, x2, y2 = self.capture.bbox
+        width, height = x2 - x1, y2 - y1
+        search_bbox = self.search_bbox()
+        try:
+            self._backend.move(*search_bbox[:2])
+            image = self._backend.grab()
+        except CaptureError as e:
+            # Most likely the search area reaches past the edge of the screen
+            print(f"ROI search around {self.capture.bbox} failed: {e}", file=sys.stderr)
+            return None
+
+        found = locate_bar(image, *self.colors, self.tolerance, self.thickness_percentage,
+                           expected_size=(width, height))
+        if found is None:
+            return None
+        (fx1, _, _, fy2), _ = found
+        # Keep the size, and with it the arc geometry; anchor on the ring's center
+        new_x1, new_y2 = search_bbox[0] + fx1, search_bbox[1] + fy2
+        new_bbox = (new_x1, new_y2 - height, new_x1 + width, new_y2)
+        if new_bbox == self.capture.bbox:
+            return None
+        self.capture.move(new_bbox[0], new_bbox[1])
+        self.relocations += 1
+        self._last_seen = None
+        return new_bbox
+
+def grab_screen(backend_name):
+    """Captures the whole primary screen."""
+    if backend_name in ('auto', 'mss'):
+        try:
+            import mss
+            with mss.mss() as sct:
+                monitor = sct.monitors[1]
+                bbox = (monitor['left'], monitor['top'],
+                        monitor['left'] + monitor['width'], monitor['top'] + monitor['height'])
+        except Exception:
+            bbox = None
+    else:
+        bbox = None
+    if bbox is None:
+        from PIL import ImageGrab
+        width, height = ImageGrab.grab().size
+        bbox = (0, 0, width, height)
+    backend = create_capture_backend(backend_name, bbox)
+    try:
+        return backend.grab().copy(), bbox
+    finally:
+        backend.close()
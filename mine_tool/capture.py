@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+Screen capture backends for Mine Tool.
+
+Every backend keeps a long-lived handle to its source and fills a single
+preallocated BGR (or BGRA) buffer in place, so the processing loop does not
+allocate new full frames on every iteration.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+class CaptureError(Exception):
+    """Raised when a frame could not be captured."""
+
+class EndOfStream(CaptureError):
+    """Raised by file-backed backends when the source has no more frames."""
+
+class CaptureBackend:
+    """
+    Base class for capture backends.
+
+    A backend captures the screen region `bbox` = (x1, y1, x2, y2) into
+    `self.frame`, a preallocated (height, width, channels) uint8 array that is
+    reused for every call to `grab()`. Callers that need to keep a frame past
+    the next `grab()` must copy it.
+
+    Attributes:
+        frame: The reused BGR (channels=3) or BGRA (channels=4) buffer.
+        timestamp: `time.perf_counter()` value (or stream time for file
+            sources) at which the last frame was captured.
+        captured_at: `time.perf_counter()` value at which the last frame
+            became available, for measuring pipeline latency. Equal to
+            `timestamp` for screen backends.
+        frame_index: Index of the last captured frame, starting at 0.
+        realtime: True if frames are captured on the wall clock. False for
+            sources that run on their own stream time (a replay or
+            simulation not paced in real time), whose frames wait for
+            processing, so no capture-to-release latency applies to them.
+    """
+    name = "base"
+    realtime = True
+
+    def __init__(self, bbox, channels=3):
+        if channels not in (3, 4):
+            raise ValueError(f"channels must be 3 (BGR) or 4 (BGRA), got {channels}")
+        x1, y1, x2, y2 = bbox
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Invalid capture region: {bbox}")
+        self.bbox = (x1, y1, x2, y2)
+        self.width = x2 - x1
+        self.height = y2 - y1
+        self.channels = channels
+        self.frame = np.empty((self.height, self.width, channels), dtype=np.uint8)
+        self.timestamp = None
+        self.captured_at = None
+        self.frame_index = -1
+
+    def open(self):
+        """Acquires the long-lived capture handle."""
+
+    def close(self):
+        """Releases the capture handle."""
+
+    def grab(self):
+        """
+        Captures the next frame into `self.frame` and returns it.
+        Raises CaptureError if no frame could be captured.
+        """
+        raise NotImplementedError
+
+    def move(self, x1, y1):
+        """Moves the capture region so its top-left corner is at (x1, y1), keeping its size."""
+        self.bbox = (x1, y1, x1 + self.width, y1 + self.height)
+
+    def _mark_captured(self, timestamp=None, captured_at=None):
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self.timestamp = timestamp
+        self.captured_at = timestamp if captured_at is None else captured_at
+        self.frame_index += 1
+        return self.frame
+
+    def _store(self, src, src_code_bgr, src_code_bgra):
+        """Converts `src` into the preallocated frame buffer."""
+        code = src_code_bgr if self.channels == 3 else src_code_bgra
+        if code is None:
+            np.copyto(self.frame, src)
+        else:
+            cv2.cvtColor(src, code, dst=self.frame)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class MssCapture(CaptureBackend):
+    """
+    Captures with the `mss` library, which talks to the OS screen APIs directly
+    (GDI on Windows, X11 on Linux, CoreGraphics on macOS). The mss handle is
+    opened once and reused for every frame.
+    """
+    name = "mss"
+
+    def __init__(self, bbox, channels=3):
+        super().__init__(bbox, channels)
+        self._sct = None
+        self._monitor = {'left': self.bbox[0], 'top': self.bbox[1],
+                         'width': self.width, 'height': self.height}
+
+    def move(self, x1, y1):
+        super().move(x1, y1)
+        self._monitor = {'left': x1, 'top': y1, 'width': self.width, 'height': self.height}
+
+    def open(self):
+        if self._sct is None:
+            import mss
+            self._sct = mss.mss()
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+    def grab(self):
+        if self._sct is None:
+            self.open()
+        try:
+            shot = self._sct.grab(self._monitor)
+        except Exception as e:
+            raise CaptureError(f"mss grab failed: {e}") from e
+        timestamp = time.perf_counter()
+        # mss returns raw BGRA bytes; wrap them without copying
+        src = np.frombuffer(shot.raw, dtype=np.uint8).reshape(self.height, self.width, 4)
+        self._store(src, cv2.COLOR_BGRA2BGR, None)
+        return self._mark_captured(timestamp)
+
+class PILCapture(CaptureBackend):
+    """Captures with `PIL.ImageGrab`. Slowest backend, kept as a fallback."""
+    name = "pil"
+
+    def __init__(self, bbox, channels=3):
+        super().__init__(bbox, channels)
+        self._image_grab = None
+
+    def open(self):
+        if self._image_grab is None:
+            from PIL import ImageGrab
+            self._image_grab = ImageGrab
+
+    def grab(self):
+        if self._image_grab is None:
+            self.open()
+        try:
+            img = self._image_grab.grab(bbox=self.bbox)
+        except Exception as e:
+            raise CaptureError(f"ImageGrab failed: {e}") from e
+        timestamp = time.perf_counter()
+        src = np.asarray(img)
+        if src.shape[:2] != (self.height, self.width):
+            raise CaptureError(f"ImageGrab returned {src.shape[1]}x{src.shape[0]}, "
+                               f"expected {self.width}x{self.height}")
+        if src.ndim == 3 and src.shape[2] == 4:
+            self._store(src, cv2.COLOR_RGBA2BGR, cv2.COLOR_RGBA2BGRA)
+        else:
+            self._store(src, cv2.COLOR_RGB2BGR, cv2.COLOR_RGB2BGRA)
+        return self._mark_captured(timestamp)
+
+def parse_region(value):
+    """Parses an 'x1,y1,x2,y2' command-line region (see FileCapture) into a tuple of ints."""
+    try:
+        x1, y1, x2, y2 = (int(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected x1,y1,x2,y2, got '{value}'")
+    return x1, y1, x2, y2
+
+class FileCapture(CaptureBackend):
+    """
+    Reads frames from a video file, a single still image or a flight record
+    (.npz, see recorder.py) instead of the screen, so the processing loop can
+    run without a display.
+
+    Args:
+        source: Path to a video file, an image or a flight record.
+        bbox: The ROI; its size determines the frame buffer size.
+        region: Optional (x1, y1, x2, y2) crop in source-frame coordinates.
+            Defaults to `bbox` if it fits inside the source frames (i.e. the
+            recording is a full-screen capture), otherwise the whole frame.
+            The crop is resized to the ROI size if the sizes differ.
+        loop: Restart from the first frame at the end instead of raising
+            EndOfStream.
+        realtime: Pace frames at the source frame rate instead of returning
+            them as fast as possible.
+    """
+    name = "file"
+
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+    def __init__(self, bbox, source, channels=3, region=None, loop=False, realtime=False):
+        super().__init__(bbox, channels)
+        if not source:
+            raise ValueError("FileCapture requires a source file")
+        self.source = source
+        self.region = region
+        self.loop = loop
+        self.realtime = realtime
+        self.fps = 0.0
+        self.frame_count = 0
+        self._cap = None
+        self._still = None
+        self._record = None
+        self._record_times = None
+        self._raw = None
+        self._resized = None
+        self._start_time = None
+
+    def open(self):
+        if self._cap is not None or self._still is not None or self._record is not None:
+            return
+        if not os.path.exists(self.source):
+            raise CaptureError(f"Capture source '{self.source}' does not exist")
+
+        if self.source.lower().endswith('.npz'):
+            try:
+                with np.load(self.source) as data:
+                    self._record = data['frames']
+                    timestamps = data['timestamp']
+            except (OSError, KeyError, ValueError) as e:
+                raise CaptureError(f"Could not read flight record '{self.source}': {e}") from e
+            if len(self._record) == 0:
+                raise CaptureError(f"Flight record '{self.source}' contains no frames")
+            # Replay at the recorded capture times, relative to the first frame
+            self._record_times = timestamps - timestamps[0]
+            self.frame_count = len(self._record)
+            duration = self._record_times[-1]
+            self.fps = (self.frame_count - 1) / duration if duration > 0 else 0.0
+            source_shape = self._record.shape[1:]
+        elif self.source.lower().endswith(self.IMAGE_EXTENSIONS):
+            image = cv2.imread(self.source, cv2.IMREAD_COLOR)
+            if image is None:
+                raise CaptureError(f"Could not read image '{self.source}'")
+            self._still = image
+            self.fps = 0.0
+            self.frame_count = 1
+            source_shape = image.shape
+        else:
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                raise CaptureError(f"Could not open video '{self.source}'")
+            self._cap = cap
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            source_shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+            self._raw = np.empty(source_shape, dtype=np.uint8)
+
+        self.region = self._resolve_region(self.region, source_shape)
+        self._start_time = time.perf_counter()
+
+    def _resolve_region(self, region, source_shape):
+        source_height, source_width = source_shape[:2]
+        if region is None:
+            x1, y1, x2, y2 = self.bbox
+            if (source_width, source_height) == (self.width, self.height):
+                region = (0, 0, source_width, source_height)
+            elif x2 <= source_width and y2 <= source_height:
+                region = self.bbox
+            else:
+                region = (0, 0, source_width, source_height)
+        x1, y1, x2, y2 = region
+        if not (0 <= x1 < x2 <= source_width and 0 <= y1 < y2 <= source_height):
+            raise CaptureError(f"Region {region} is outside the {source_width}x{source_height} source")
+        return tuple(region)
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._still = None
+        self._record = None
+
+    def _stream_time(self):
+        """Returns the presentation time of the next frame in seconds."""
+        if self._record_times is not None:
+            index = self.frame_index + 1
+            # Keep time increasing across loops of a recording
+            loops, index = divmod(index, len(self._record_times))
+            return loops * (self._record_times[-1] + 1.0 / max(self.fps, 1.0)) + self._record_times[index]
+        if self.fps > 0:
+            return (self.frame_index + 1) / self.fps
+        return time.perf_counter() - self._start_time
+
+    def grab(self):
+        if self._cap is None and self._still is None and self._record is None:
+            self.open()
+
+        if self._still is not None:
+            raw = self._still
+        elif self._record is not None:
+            index = self.frame_index + 1
+            if index >= len(self._record) and not self.loop:
+                raise EndOfStream(f"End of '{self.source}' after {self.frame_index + 1} frames")
+            raw = self._record[index % len(self._record)]
+        else:
+            ok, raw = self._cap.read(self._raw)
+            if not ok and self.loop and self.frame_index >= 0:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, raw = self._cap.read(self._raw)
+            if not ok:
+                raise EndOfStream(f"End of '{self.source}' after {self.frame_index + 1} frames")
+
+        timestamp = self._stream_time()
+        if self.realtime:
+            delay = self._start_time + timestamp - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        x1, y1, x2, y2 = self.region
+        crop = raw[y1:y2, x1:x2]
+        if crop.shape[:2] != (self.height, self.width):
+            if self._resized is None or self._resized.shape[2:] != crop.shape[2:]:
+                self._resized = np.empty((self.height, self.width) + crop.shape[2:], dtype=np.uint8)
+            crop = cv2.resize(crop, (self.width, self.height), dst=self._resized, interpolation=cv2.INTER_AREA)
+        self._store(crop, None, cv2.COLOR_BGR2BGRA)
+        return self._mark_captured(timestamp, time.perf_counter())
+
+def _simulated_capture(bbox, channels=3, **kwargs):
+    # Imported on use, as sim.py builds on this module
+    from .sim import SimulatedCapture
+    return SimulatedCapture(bbox, channels, **kwargs)
+
+CAPTURE_BACKENDS = {
+    MssCapture.name: MssCapture,
+    PILCapture.name: PILCapture,
+    FileCapture.name: FileCapture,
+    "sim": _simulated_capture,
+}
+
+def create_capture_backend(name, bbox, source=None, channels=3, **kwargs):
+    """
+    Creates and opens a capture backend by name ('auto', 'mss', 'pil', 'file'
+    or 'sim', see sim.SimulatedCapture). 'auto' prefers mss and falls back to
+    PIL if mss is not installed or fails to open. `kwargs` go to the file and
+    sim backends.
+    """
+    name = (name or 'auto').lower()
+
+    if name == 'auto':
+        if source:
+            name = FileCapture.name
+        else:
+            try:
+                backend = MssCapture(bbox, channels)
+                backend.open()
+                return backend
+            except Exception as e:
+                print(f"mss capture unavailable ({e}), falling back to PIL.", file=sys.stderr)
+                name = PILCapture.name
+
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend '{name}'. "
+                         f"Choose one of: auto, {', '.join(CAPTURE_BACKENDS)}")
+
+    if name == FileCapture.name:
+        backend = FileCapture(bbox, source, channels, **kwargs)
+    else:
+        backend = CAPTURE_BACKENDS[name](bbox, channels, **kwargs)
+    backend.open()
+    return backend
+
+def union_bbox(bboxes):
+    """The smallest (x1, y1, x2, y2) region containing every region in `bboxes`."""
+    x1s, y1s, x2s, y2s = zip(*bboxes)
+    return (min(x1s), min(y1s), max(x2s), max(y2s))
+
+class RoiSlice:
+    """
+    One ROI of a MultiRoiCapture. It has the `bbox`, `width`, `height` and
+    `move()` of a capture backend, so a RoiTracker can follow it.
+    """
+
+    def __init__(self, parent, bbox):
+        x1, y1, x2, y2 = bbox
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Invalid capture region: {bbox}")
+        self.parent = parent
+        self.bbox = (x1, y1, x2, y2)
+        self.width = x2 - x1
+        self.height = y2 - y1
+
+    def move(self, x1, y1):
+        """Moves the ROI so its top-left corner is at (x1, y1), keeping its size."""
+        self.bbox = (x1, y1, x1 + self.width, y1 + self.height)
+        self.parent._roi_moved()
+
+class MultiRoiCapture:
+    """
+    Captures several ROIs (e.g. game clients side by side) with one grab of
+    their bounding union.
+
+    `grab()` captures the union with a single backend and returns a list with
+    each ROI, in the order of `rois`, as a zero-copy view into the backend's
+    reused frame buffer. Like the frame itself, the views are overwritten by
+    the next grab and must be copied to be kept. If a ROI is moved outside
+    the union, the backend is reopened on the new union at the next grab.
+
+    Attributes:
+        rois: The RoiSlice of every ROI.
+        timestamp, captured_at, frame_index, realtime: As for
+            CaptureBackend, for the last union grab.
+    """
+
+    def __init__(self, backend_name, rois, source=None, channels=3, **kwargs):
+        if not rois:
+            raise ValueError("MultiRoiCapture needs at least one ROI")
+        self.backend_name = backend_name
+        self.source = source
+        self.channels = channels
+        self.kwargs = kwargs
+        self.rois = [RoiSlice(self, roi) for roi in rois]
+        self.backend = None
+        self.views = []
+        self.timestamp = None
+        self.captured_at = None
+        self.frame_index = -1
+
+    @property
+    def name(self):
+        return self.backend.name if self.backend is not None else self.backend_name
+
+    @property
+    def realtime(self):
+        """Whether the backend captures in real time; opens it if needed."""
+        self.open()
+        return self.backend.realtime
+
+    @property
+    def bbox(self):
+        """The captured union region."""
+        if self.backend is not None:
+            return self.backend.bbox
+        return union_bbox(roi.bbox for roi in self.rois)
+
+    def open(self):
+        if self.backend is not None:
+            return
+        self.backend = create_capture_backend(self.backend_name, self.bbox, self.source, self.channels,
+                                              **self.kwargs)
+        self._slice()
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def _slice(self):
+        ux1, uy1 = self.backend.bbox[:2]
+        frame = self.backend.frame
+        self.views = [frame[y1 - uy1:y2 - uy1, x1 - ux1:x2 - ux1]
+                      for x1, y1, x2, y2 in (roi.bbox for roi in self.rois)]
+
+    def _roi_moved(self):
+        if self.backend is None:
+            return
+        ux1, uy1, ux2, uy2 = self.backend.bbox
+        if all(ux1 <= x1 and uy1 <= y1 and x2 <= ux2 and y2 <= uy2 for x1, y1, x2, y2 in
+               (roi.bbox for roi in self.rois)):
+            self._slice()
+        else:
+            self.close()
+
+    def grab(self):
+        """Captures the union and returns the list of per-ROI views."""
+        if self.backend is None:
+            self.open()
+        self.backend.grab()
+        self.timestamp = self.backend.timestamp
+        self.captured_at = self.backend.captured_at
+        self.frame_index += 1
+        return self.views
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
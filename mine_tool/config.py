@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Configuration for Mine Tool.
+
+`Config` holds every setting of config.ini as a typed dataclass field; each
+field records the section and key it is read from, so loading and writing
+the file are driven by the dataclass itself. This module only uses the
+standard library and has no side effects on import: the file is only read,
+or created with defaults, when `load_config()` asks for it.
+
+Further game clients are configured in `[Instance <name>]` sections holding
+their own ROI_X1..ROI_Y2 and ACTION; they share every other setting.
+"""
+import configparser
+import sys
+from dataclasses import dataclass, field, fields
+
+CONFIG_FILE = 'config.ini'
+
+# Available detection engines: contour search over the ROI or the polar-unwrapped strip
+DETECTION_ENGINES = ("contour", "polar")
+
+# Available prediction models: alpha-beta tracker with latency compensation or the
+# LOOKAHEAD_FACTOR/EXPONENTIAL_POWER formula
+PREDICTION_MODELS = ("tracker", "legacy")
+
+# Available release modes: precise deadline on an action thread, or at frame boundaries
+RELEASE_MODES = ("scheduled", "frame")
+
+# Available overlay modes: drawn by the processing loop, drawn by the GUI, or no GUI at all
+OVERLAY_MODES = ("eager", "lazy", "off")
+
+# Available pipelines: capture and detection in one process, or in separate processes
+# connected by a shared-memory frame ring
+CAPTURE_PIPELINES = ("thread", "process")
+
+# Available stats log formats
+STATS_LOG_FORMATS = ("jsonl", "csv")
+
+# Keys of a ROI, in (x1, y1, x2, y2) order
+ROI_KEYS = ('ROI_X1', 'ROI_Y1', 'ROI_X2', 'ROI_Y2')
+
+# Sections named "<prefix><name>" configure one more game client each
+INSTANCE_SECTION_PREFIX = 'Instance '
+
+def _option(section, key, default, choices=None, normalize=False):
+    """A Config field read from `key` in `section`; `choices` values are normalized and validated."""
+    return field(default=default, metadata={'section': section, 'key': key, 'choices': choices,
+                                            'normalize': normalize or choices is not None})
+
+def hex_to_bgr(hex_color):
+    """Converts a hexadecimal color string (e.g., "#RRGGBB") to a (B, G, R) tuple."""
+    hex_color = hex_color.lstrip('#')
+    return (int(hex_color[4:6], 16), int(hex_color[2:4], 16), int(hex_color[0:2], 16))
+
+@dataclass(frozen=True)
+class InstanceConfig:
+    """
+    One game client: its ROI (x1, y1, x2, y2), its release ACTION and the
+    config.ini section both are stored in.
+    """
+    name: str
+    section: str
+    roi: tuple
+    action: str
+
+    @property
+    def roi_size(self):
+        return (self.roi[2] - self.roi[0], self.roi[3] - self.roi[1])
+
+@dataclass
+class Config:
+    """All Mine Tool settings. The defaults are the values written to a new config.ini."""
+    roi_x1: int = _option('Detection', 'ROI_X1', 960)
+    roi_y1: int = _option('Detection', 'ROI_Y1', 437)
+    roi_x2: int = _option('Detection', 'ROI_X2', 1080)
+    roi_y2: int = _option('Detection', 'ROI_Y2', 557)
+    hex_grey: str = _option('Detection', 'HEX_GREY', "#485163")
+    hex_white: str = _option('Detection', 'HEX_WHITE', "#cecece")
+    hex_bar: str = _option('Detection', 'HEX_BAR', "#11100e")
+    color_tolerance: int = _option('Detection', 'COLOR_TOLERANCE', 15)
+    middle_threshold: int = _option('Detection', 'MIDDLE_THRESHOLD', 15)
+    bar_thickness_percentage: float = _option('Detection', 'BAR_THICKNESS_PERCENTAGE', 0.15)
+    white_area_width_increase: int = _option('Detection', 'WHITE_AREA_WIDTH_INCREASE', 5)
+    grey_line_min_area: int = _option('Detection', 'GREY_LINE_MIN_AREA', 10)
+    arc_geometry_cache: str = _option('Detection', 'ARC_GEOMETRY_CACHE', "")
+    detection_engine: str = _option('Detection', 'ENGINE', "contour", DETECTION_ENGINES)
+    skip_unchanged_frames: bool = _option('Detection', 'SKIP_UNCHANGED_FRAMES', True)
+    change_tolerance: int = _option('Detection', 'CHANGE_TOLERANCE', 6)
+    detection_workers: int = _option('Detection', 'WORKERS', 0)
+    coarse_to_fine: bool = _option('Detection', 'COARSE_TO_FINE', False)
+    coarse_scale: int = _option('Detection', 'COARSE_SCALE', 2)
+    refine_distance: float = _option('Detection', 'REFINE_DISTANCE', 30.0)
+    refine_margin: int = _option('Detection', 'REFINE_MARGIN', 16)
+
+    click_cooldown_duration: float = _option('Automation', 'CLICK_COOLDOWN_DURATION', 0.5)
+    prediction_enabled: bool = _option('Automation', 'PREDICTION_ENABLED', True)
+    lookahead_factor: float = _option('Automation', 'LOOKAHEAD_FACTOR', 0.01)
+    exponential_power: float = _option('Automation', 'EXPONENTIAL_POWER', 1.015)
+    prediction_model: str = _option('Automation', 'PREDICTION_MODEL', "tracker", PREDICTION_MODELS)
+    tracker_alpha: float = _option('Automation', 'TRACKER_ALPHA', 0.5)
+    tracker_beta: float = _option('Automation', 'TRACKER_BETA', 0.1)
+    release_mode: str = _option('Automation', 'RELEASE_MODE', "scheduled", RELEASE_MODES)
+    release_horizon: float = _option('Automation', 'RELEASE_HORIZON', 0.1)
+    action: str = _option('Automation', 'ACTION', "mouse", normalize=True)
+
+    frame_period: float = _option('Timing', 'FRAME_PERIOD', 0.01)
+    idle_frame_period: float = _option('Timing', 'IDLE_FRAME_PERIOD', 0.05)
+    idle_delay: float = _option('Timing', 'IDLE_DELAY', 0.5)
+    burst_distance: float = _option('Timing', 'BURST_DISTANCE', 60.0)
+
+    overlay_mode: str = _option('Display', 'OVERLAY', "lazy", OVERLAY_MODES)
+    display_fps: float = _option('Display', 'DISPLAY_FPS', 20.0)
+
+    capture_backend: str = _option('Capture', 'BACKEND', "auto")
+    capture_source: str = _option('Capture', 'SOURCE', "")
+    capture_pipeline: str = _option('Capture', 'PIPELINE', "thread", CAPTURE_PIPELINES)
+
+    stats_overlay: bool = _option('Stats', 'OVERLAY', True)
+    stats_log_file: str = _option('Stats', 'LOG_FILE', "")
+    stats_log_format: str = _option('Stats', 'LOG_FORMAT', "jsonl", STATS_LOG_FORMATS)
+    stats_log_interval: float = _option('Stats', 'LOG_INTERVAL', 5.0)
+    stats_http_port: int = _option('Stats', 'HTTP_PORT', 0)
+
+    recorder_enabled: bool = _option('Recorder', 'ENABLED', False)
+    recorder_frames: int = _option('Recorder', 'FRAMES', 120)
+    recorder_post_frames: int = _option('Recorder', 'POST_FRAMES', 30)
+    recorder_directory: str = _option('Recorder', 'DIRECTORY', "flight_records")
+    recorder_hotkey: str = _option('Recorder', 'HOTKEY', "f8", normalize=True)
+
+    track_roi: bool = _option('Calibration', 'TRACK_ROI', True)
+    roi_search_interval: float = _option('Calibration', 'SEARCH_INTERVAL', 1.0)
+    roi_search_margin: float = _option('Calibration', 'SEARCH_MARGIN', 1.0)
+
+    # Further game clients from the [Instance <name>] sections, in file order
+    extra_instances: tuple = ()
+
+    @property
+    def roi(self):
+        """The ROI as (x1, y1, x2, y2) screen coordinates."""
+        return (self.roi_x1, self.roi_y1, self.roi_x2, self.roi_y2)
+
+    @property
+    def roi_size(self):
+        """The ROI as (width, height)."""
+        return (self.roi_x2 - self.roi_x1, self.roi_y2 - self.roi_y1)
+
+    @property
+    def instances(self):
+        """Every game client: the [Detection] ROI with the [Automation] ACTION, then the extra instances."""
+        return (InstanceConfig("main", 'Detection', self.roi, self.action),) + self.extra_instances
+
+    @property
+    def grey_bgr(self):
+        return hex_to_bgr(self.hex_grey)
+
+    @property
+    def white_bgr(self):
+        return hex_to_bgr(self.hex_white)
+
+    @property
+    def bar_bgr(self):
+        return hex_to_bgr(self.hex_bar)
+
+def _default_parser():
+    """A ConfigParser holding the default value of every setting, in field order."""
+    parser = configparser.ConfigParser()
+    for f in fields(Config):
+        if 'section' not in f.metadata:
+            continue
+        section = f.metadata['section']
+        if not parser.has_section(section):
+            parser.add_section(section)
+        parser.set(section, f.metadata['key'], str(f.default))
+    return parser
+
+def load_config(path=CONFIG_FILE, create=False):
+    """
+    Reads `path` into a Config. Missing keys take their default value, and
+    unknown values of enumerated settings fall back to the default with a
+    warning. If the file does not exist, the defaults are used; with
+    `create=True` they are also written to `path` for the user to edit.
+    `[Instance <name>]` sections become the Config's `extra_instances`.
+    """
+    parser = configparser.ConfigParser()
+    if not parser.read(path):
+        if not create:
+            print(f"'{path}' not found or could not be read. Using default values.", file=sys.stderr)
+            return Config()
+        print(f"'{path}' not found or could not be read. Creating with default values.")
+        parser = _default_parser()
+        with open(path, 'w') as configfile:
+            parser.write(configfile)
+        print(f"Default '{path}' created. Please review and adjust values if needed.")
+
+    getters = {int: parser.getint, float: parser.getfloat, bool: parser.getboolean, str: parser.get}
+    values = {}
+    for f in fields(Config):
+        if 'section' not in f.metadata:
+            continue
+        section, key, choices = f.metadata['section'], f.metadata['key'], f.metadata['choices']
+        value = getters[f.type](section, key, fallback=f.default)
+        if f.metadata['normalize']:
+            value = value.strip().lower()
+        if choices is not None and value not in choices:
+            print(f"Unknown [{section}] {key} '{value}', using '{f.default}'.", file=sys.stderr)
+            value = f.default
+        values[f.name] = value
+
+    extra_instances = []
+    for section in parser.sections():
+        if not section.startswith(INSTANCE_SECTION_PREFIX):
+            continue
+        try:
+            roi = tuple(parser.getint(section, key) for key in ROI_KEYS)
+        except (configparser.NoOptionError, ValueError) as e:
+            print(f"Ignoring [{section}]: {e}", file=sys.stderr)
+            continue
+        action = parser.get(section, 'ACTION', fallback=values['action']).strip().lower()
+        extra_instances.append(InstanceConfig(section[len(INSTANCE_SECTION_PREFIX):].strip(), section, roi,
+                                              action))
+    return Config(**values, extra_instances=tuple(extra_instances))
+
+def save_roi(roi, path=CONFIG_FILE, section='Detection'):
+    """Writes ROI (x1, y1, x2, y2) to `section` ([Detection] or an [Instance <name>]) of `path`."""
+    parser = configparser.ConfigParser()
+    parser.read(path)
+    if not parser.has_section(section):
+        parser.add_section(section)
+    for key, value in zip(ROI_KEYS, roi):
+        parser.set(section, key, str(int(value)))
+    with open(path, 'w') as configfile:
+        parser.write(configfile)
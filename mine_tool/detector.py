@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Grey line / white area detection on a single ROI frame.
+
+`Detector` finds the grey line and the white area on the curved bar with
+either engine (contour search or the polar-unwrapped strip, see
+polar.py) and returns their positions as a `Detection`. It holds no release
+or timing state, so one detector can be shared by the live loop, replays
+and tests.
+
+Optionally it works coarse-to-fine: whole frames are searched at a fraction
+of the resolution, and the caller can instead ask for a full-resolution
+search of only a small window around the targets of a recent frame, where
+the precision matters.
+"""
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .geometry import ArcGeometry, get_arc_geometry
+from .polar import PolarUnwrap
+from .stats import NullStageTimer
+
+def color_bounds(target_bgr, color_tolerance):
+    """The (lower, upper) cv2.inRange bounds of the colors within `color_tolerance` of the target BGR."""
+    lower_bound = np.array([max(0, c - color_tolerance) for c in target_bgr])
+    upper_bound = np.array([min(255, c + color_tolerance) for c in target_bgr])
+    return lower_bound, upper_bound
+
+def find_largest_area(mask, min_area=50, offset=(0, 0)):
+    """
+    Finds the largest contour in a binary mask.
+    Returns its centroid, the contour and its minimum area rectangle, or
+    (None, None, None) if no contour of at least `min_area` exists.
+    Coordinates are shifted by `offset`, for masks of part of a frame.
+    """
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+
+    if not contours:
+        return None, None, None
+
+    largest_contour = max(contours, key=cv2.contourArea)
+
+    if cv2.contourArea(largest_contour) < min_area:
+        return None, None, None
+
+    M = cv2.moments(largest_contour)
+    if M["m00"] == 0:
+        return None, None, None
+
+    cX = int(M["m10"] / M["m00"])
+    cY = int(M["m01"] / M["m00"])
+
+    rect = None
+    if len(largest_contour) >= 5:
+        rect = cv2.minAreaRect(largest_contour)
+
+    return (cX, cY), largest_contour, rect
+
+@dataclass
+class Detection:
+    """
+    Where the grey line and the white area are in one frame.
+
+    Centers and contours are in ROI pixel coordinates (contours are None for
+    the polar engine); angles are in radians around the arc center, in the
+    arctan2 convention, and `radius` is the distance of the grey line from the
+    arc center. `white_span` is the (first, last) angle of the white area
+    (polar engine only). Values of an area that was not found are None. The masks are
+    the color masks the areas were searched in, for the debug view; they are
+    the detector's reused buffers and are overwritten by its next `detect()`.
+    """
+    grey_center: Optional[Tuple[int, int]] = None
+    grey_contour: Optional[np.ndarray] = field(default=None, repr=False)
+    white_center: Optional[Tuple[int, int]] = None
+    white_contour: Optional[np.ndarray] = field(default=None, repr=False)
+    angle_grey: Optional[float] = None
+    angle_white: Optional[float] = None
+    radius: Optional[float] = None
+    white_span: Optional[Tuple[float, float]] = None
+    grey_mask: Optional[np.ndarray] = field(default=None, repr=False)
+    white_mask: Optional[np.ndarray] = field(default=None, repr=False)
+
+    @property
+    def visible(self):
+        """True if both the grey line and the white area were found."""
+        return self.grey_center is not None and self.white_center is not None
+
+    @property
+    def arc_distance(self):
+        """Distance along the arc from the grey line to the white area's center, or None."""
+        if not self.visible:
+            return None
+        return abs(self.angle_grey - self.angle_white) * self.radius
+
+def _touches_window_edge(mask, window, shape):
+    """
+    True if `mask`, the mask of `window` = (x1, y1, x2, y2) in a frame of
+    (height, width) `shape`, has a match on an edge of the window that is not
+    also an edge of the frame, i.e. an area may continue outside the window.
+    """
+    x1, y1, x2, y2 = window
+    height, width = shape
+    return ((x1 > 0 and mask[:, 0].any()) or (x2 < width and mask[:, -1].any())
+            or (y1 > 0 and mask[0].any()) or (y2 < height and mask[-1].any()))
+
+class Detector:
+    """
+    Detects the grey line and the white area on the curved bar.
+
+    Args:
+        geometry: The ArcGeometry of the ROI (see geometry.get_arc_geometry).
+        grey_bgr, white_bgr: Target colors.
+        color_tolerance: Allowed per-channel deviation from the target colors.
+        engine: 'contour' or 'polar'.
+        white_area_width_increase: Dilation of the white area mask (contour
+            engine), or the largest gap joined within a white run (polar).
+        grey_line_min_area: Minimum size of the grey line in pixels.
+        coarse_scale: If above 1, whole frames are searched on every
+            `coarse_scale`-th pixel of every `coarse_scale`-th row only.
+        refine_margin: Padding in pixels around the targets of the window
+            searched by `detect(frame, near=...)`.
+
+    The color bounds and dilation kernel are computed once, and every mask is
+    written into a buffer preallocated here (OpenCV `dst=` outputs), so
+    detecting a frame allocates no frame-sized arrays.
+    """
+    WHITE_MIN_AREA = 50
+
+    def __init__(self, geometry, grey_bgr, white_bgr, color_tolerance, engine='contour',
+                 white_area_width_increase=5, grey_line_min_area=10, coarse_scale=1, refine_margin=16):
+        if engine not in ('contour', 'polar'):
+            raise ValueError(f"Unknown detection engine '{engine}'")
+        self.geometry = geometry
+        self.arc_center = geometry.center
+        self.grey_bgr = grey_bgr
+        self.white_bgr = white_bgr
+        self.color_tolerance = color_tolerance
+        self.engine = engine
+        self.white_area_width_increase = white_area_width_increase
+        self.grey_line_min_area = grey_line_min_area
+        self.white_min_area = self.WHITE_MIN_AREA
+        self.refine_margin = refine_margin
+        self.polar_unwrap = PolarUnwrap(geometry) if engine == 'polar' else None
+        # Shown in the mask tiles for frames without anything to detect
+        self._empty_mask = np.zeros_like(geometry.mask)
+
+        self._white_bounds = color_bounds(white_bgr, color_tolerance)
+        self._grey_bounds = color_bounds(grey_bgr, color_tolerance)
+        self._kernel = None
+        if engine == 'contour' and white_area_width_increase > 0:
+            self._kernel = np.ones((white_area_width_increase, white_area_width_increase), np.uint8)
+        mask_shape = self.polar_unwrap.strip.shape[:2] if self.polar_unwrap is not None else geometry.mask.shape
+        self._white_match = np.empty(mask_shape, dtype=np.uint8)
+        self._white_mask = np.empty(mask_shape, dtype=np.uint8) if self._kernel is not None else self._white_match
+        self._grey_mask = np.empty(mask_shape, dtype=np.uint8)
+
+        self.coarse_scale = max(1, int(coarse_scale))
+        self._coarse = self._coarse_frame = None
+        if self.coarse_scale > 1:
+            self._build_coarse(geometry)
+
+    def _build_coarse(self, geometry):
+        """
+        Creates the detector for the strided frame: its bar mask is every
+        `coarse_scale`-th pixel of the full one, and all sizes shrink with it.
+        """
+        scale = self.coarse_scale
+        height, width = geometry.mask.shape
+        coarse_height, coarse_width = height // scale, width // scale
+        bar_mask = np.ascontiguousarray(geometry.mask[:coarse_height * scale:scale, :coarse_width * scale:scale])
+        coarse_geometry = ArcGeometry(coarse_width, coarse_height, geometry.key[2], mask=bar_mask)
+        self._coarse = Detector(coarse_geometry, self.grey_bgr, self.white_bgr, self.color_tolerance, self.engine,
+                                round(self.white_area_width_increase / scale),
+                                max(1, self.grey_line_min_area // scale ** 2))
+        self._coarse.white_min_area = max(1, self.white_min_area // scale ** 2)
+        self._coarse_frame = np.empty((coarse_height, coarse_width, 3), dtype=np.uint8)
+
+    @classmethod
+    def from_config(cls, config, roi_width=None, roi_height=None):
+        """Builds a detector from a Config, for its ROI size unless another size is given."""
+        if roi_width is None or roi_height is None:
+            roi_width, roi_height = config.roi_size
+        geometry = get_arc_geometry(roi_width, roi_height, config.bar_thickness_percentage,
+                                    config.arc_geometry_cache)
+        return cls(geometry, config.grey_bgr, config.white_bgr, config.color_tolerance,
+                   config.detection_engine, config.white_area_width_increase, config.grey_line_min_area,
+                   config.coarse_scale if config.coarse_to_fine else 1, config.refine_margin)
+
+    def empty(self):
+        """The Detection of a frame in which nothing was found."""
+        return Detection(grey_mask=self._empty_mask, white_mask=self._empty_mask)
+
+    def detect(self, frame_bgr, stage_timer=None, near=None):
+        """
+        Detects in one (H, W, 3) BGR frame of the ROI size. `stage_timer`, if
+        given, is marked after the 'bar_mask' (polar engine only), 'white' and
+        'grey' stages.
+
+        With `near`, a visible Detection of a recent frame, only a window
+        around its grey line and white area is searched, at full resolution;
+        the masks then cover only that window. If either area is not found
+        in the window or may extend past it, the whole frame is searched at
+        full resolution instead. Without `near`, the whole frame is searched,
+        at the coarse scale if one is set.
+        """
+        if stage_timer is None:
+            stage_timer = NullStageTimer()
+        if near is not None and near.visible:
+            detection = self._detect_near(frame_bgr, near)
+            if detection is not None:
+                stage_timer.mark('grey')
+                return detection
+        elif self._coarse is not None:
+            return self._detect_coarse(frame_bgr, stage_timer)
+        if self.polar_unwrap is not None:
+            return self._detect_polar(frame_bgr, stage_timer)
+        return self._detect_contour(frame_bgr, stage_timer)
+
+    def _detect_near(self, frame_bgr, near):
+        """The full-resolution Detection in the window around `near`'s areas, or None if it does not hold them."""
+        margin = self.refine_margin
+        if self.polar_unwrap is not None:
+            polar_unwrap = self.polar_unwrap
+            white_first, white_last = near.white_span or (near.angle_white, near.angle_white)
+            first_column = polar_unwrap.column_of(min(near.angle_grey, white_first))
+            last_column = polar_unwrap.column_of(max(near.angle_grey, white_last))
+            margin *= polar_unwrap.ANGLE_BINS_PER_PIXEL
+            columns = slice(max(0, first_column - margin), min(len(polar_unwrap.angles), last_column + margin + 1))
+            detection = self._detect_polar(frame_bgr, NullStageTimer(), columns)
+            # A strip's rows span the whole band, so only its angle ends can cut an area
+            window, shape = (columns.start, 0, columns.stop, 1), (1, len(polar_unwrap.angles))
+        else:
+            height, width = self.geometry.mask.shape
+            grey_x, grey_y = near.grey_center
+            if near.white_contour is not None:
+                white_x, white_y, white_width, white_height = cv2.boundingRect(near.white_contour)
+            else:
+                (white_x, white_y), white_width, white_height = near.white_center, 1, 1
+            window = (max(0, min(grey_x, white_x) - margin), max(0, min(grey_y, white_y) - margin),
+                      min(width, max(grey_x + 1, white_x + white_width) + margin),
+                      min(height, max(grey_y + 1, white_y + white_height) + margin))
+            detection = self._detect_contour(frame_bgr, NullStageTimer(), window)
+            shape = (height, width)
+
+        if not detection.visible:
+            return None
+        if (_touches_window_edge(detection.white_mask, window, shape)
+                or _touches_window_edge(detection.grey_mask, window, shape)):
+            return None
+        return detection
+
+    def _detect_coarse(self, frame_bgr, stage_timer):
+        """Detects on the strided frame and scales the results back to full-frame pixels."""
+        scale = self.coarse_scale
+        coarse_height, coarse_width = self._coarse_frame.shape[:2]
+        # Nearest-neighbour resizing by a whole factor picks every `scale`-th pixel,
+        # like frame[::scale, ::scale] but much faster than NumPy's strided copy
+        cv2.resize(frame_bgr[:coarse_height * scale, :coarse_width * scale], (coarse_width, coarse_height),
+                   dst=self._coarse_frame, interpolation=cv2.INTER_NEAREST)
+        coarse = self._coarse.detect(self._coarse_frame, stage_timer)
+        detection = Detection(white_span=coarse.white_span, grey_mask=coarse.grey_mask, white_mask=coarse.white_mask)
+        arc_x, arc_y = self.arc_center
+        if coarse.white_center is not None:
+            white_x, white_y = coarse.white_center[0] * scale, coarse.white_center[1] * scale
+            detection.white_center = (white_x, white_y)
+            detection.angle_white = float(np.arctan2(white_y - arc_y, white_x - arc_x))
+            if coarse.white_contour is not None:
+                detection.white_contour = coarse.white_contour * scale
+        if coarse.grey_center is not None:
+            grey_x, grey_y = coarse.grey_center[0] * scale, coarse.grey_center[1] * scale
+            detection.grey_center = (grey_x, grey_y)
+            detection.angle_grey = float(np.arctan2(grey_y - arc_y, grey_x - arc_x))
+            detection.radius = float(np.hypot(grey_x - arc_x, grey_y - arc_y))
+            if coarse.grey_contour is not None:
+                detection.grey_contour = coarse.grey_contour * scale
+        return detection
+
+    def _detect_contour(self, frame_bgr, stage_timer, window=None):
+        detection = Detection()
+        arc_x, arc_y = self.arc_center
+        bar_mask = self.geometry.mask
+        white_match, white_mask, grey_mask = self._white_match, self._white_mask, self._grey_mask
+        offset = (0, 0)
+        if window is not None:
+            # Work on views of the window, so every buffer is still written in place
+            x1, y1, x2, y2 = window
+            rows, cols = slice(y1, y2), slice(x1, x2)
+            frame_bgr, bar_mask = frame_bgr[rows, cols], bar_mask[rows, cols]
+            white_match, white_mask, grey_mask = white_match[rows, cols], white_mask[rows, cols], grey_mask[rows, cols]
+            offset = (x1, y1)
+
+        # 1. Mask the White Area within the curved bar and find its largest contour.
+        # Limiting the single-channel match to the bar finds the same bar pixels as
+        # matching the bar-limited frame, with a third of the masking work
+        cv2.inRange(frame_bgr, *self._white_bounds, dst=white_match)
+        cv2.bitwise_and(white_match, bar_mask, dst=white_match)
+        if self._kernel is not None:
+            cv2.dilate(white_match, self._kernel, dst=white_mask)
+        detection.white_mask = white_mask
+        white_center, detection.white_contour, _ = find_largest_area(white_mask, self.white_min_area, offset)
+        if white_center:
+            detection.white_center = white_center
+            # Calculate angles relative to the arc center
+            detection.angle_white = float(np.arctan2(white_center[1] - arc_y, white_center[0] - arc_x))
+        stage_timer.mark('white')
+
+        # 2. Same for the Grey Line
+        cv2.inRange(frame_bgr, *self._grey_bounds, dst=grey_mask)
+        cv2.bitwise_and(grey_mask, bar_mask, dst=grey_mask)
+        detection.grey_mask = grey_mask
+        grey_center, detection.grey_contour, _ = find_largest_area(grey_mask, self.grey_line_min_area, offset)
+        if grey_center:
+            detection.grey_center = grey_center
+            dx_grey = grey_center[0] - arc_x
+            dy_grey = grey_center[1] - arc_y
+            detection.angle_grey = float(np.arctan2(dy_grey, dx_grey))
+            # Calculate the radius of the grey line's path
+            detection.radius = float(np.sqrt(dx_grey**2 + dy_grey**2))
+        stage_timer.mark('grey')
+        return detection
+
+    def _detect_polar(self, frame_bgr, stage_timer, columns=None):
+        detection = Detection()
+        polar_unwrap = self.polar_unwrap
+        white_mask, grey_mask, start = self._white_mask, self._grey_mask, 0
+        if columns is not None:
+            white_mask, grey_mask, start = white_mask[:, columns], grey_mask[:, columns], columns.start
+
+        # 1. Unwrap the curved bar into a strip
+        polar_strip = polar_unwrap.unwrap(frame_bgr, columns)
+        stage_timer.mark('bar_mask')
+
+        # 2. Find the White Area and Grey Line as areas of the strip
+        detection.white_mask = cv2.inRange(polar_strip, *self._white_bounds, dst=white_mask)
+        white_run = polar_unwrap.find_run(detection.white_mask, self.white_min_area,
+                                          self.white_area_width_increase, start)
+        if white_run:
+            angle_white, white_radius, _, detection.white_span = white_run
+            detection.angle_white = angle_white
+            detection.white_center = polar_unwrap.to_point(angle_white, white_radius)
+        stage_timer.mark('white')
+
+        detection.grey_mask = cv2.inRange(polar_strip, *self._grey_bounds, dst=grey_mask)
+        grey_run = polar_unwrap.find_run(detection.grey_mask, self.grey_line_min_area, start=start)
+        if grey_run:
+            detection.angle_grey, detection.radius, _, _ = grey_run
+            detection.grey_center = polar_unwrap.to_point(detection.angle_grey, detection.radius)
+        stage_timer.mark('grey')
+        return detection
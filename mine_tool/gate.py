@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Early-exit change detection for the processing loop.
+
+Most captured frames either show no minigame at all or a bar that has not
+changed since the previous frame (the screen is often captured faster than
+the game renders). `FrameGate` checks the pixels of the bar band before any
+full-frame masking or contour search, so those frames can skip detection and
+reuse the previous result.
+"""
+import math
+
+import cv2
+import numpy as np
+
+from .detector import color_bounds
+
+# Outcomes of FrameGate.check()
+FRAME_CHANGED = "changed"
+FRAME_UNCHANGED = "unchanged"
+FRAME_EMPTY = "empty"
+
+class FrameGate:
+    """
+    Classifies frames from the pixels of the bar band.
+
+    The band's pixels on a regular grid (every `sample_stride`-th row and
+    column) are gathered into a compact sample of at most about
+    `SAMPLE_PIXELS` pixels, and matched against the grey line and white area
+    colors. Detection only depends on which band pixels match those colors,
+    so a frame whose sampled matches are the same as before gives nearly the
+    same result: pixels between the grid points can still change, which may
+    leave the reused centers a pixel or two behind until a sampled pixel
+    changes too. The grid keeps the cost of a check small and independent of
+    the ROI size, well below that of detection.
+
+    `check(frame)` returns:
+        FRAME_UNCHANGED if the sample matches the grey line and white area
+            colors at exactly the same pixels as the last frame that was not
+            unchanged, and no sampled channel differs from that frame by
+            more than `change_tolerance`. Comparing against that reference
+            rather than the previous frame keeps slow drift from going
+            unnoticed.
+        FRAME_EMPTY if no pixel of the band matches the grey line or white
+            area color, i.e. nothing can be detected in the frame.
+        FRAME_CHANGED otherwise; the frame needs full detection.
+
+    Args:
+        geometry: The ArcGeometry of the ROI (see geometry.get_arc_geometry).
+        grey_bgr, white_bgr: Target colors.
+        color_tolerance: Allowed per-channel deviation from the target colors.
+        change_tolerance: Allowed per-channel difference for a sampled pixel
+            to count as unchanged (absorbs capture and compression noise).
+        sample_stride: Spacing of the sampled grid in pixels. None picks the
+            smallest stride that keeps the sample within `SAMPLE_PIXELS`.
+    """
+
+    # Band pixels sampled per frame when the stride is picked automatically
+    SAMPLE_PIXELS = 1000
+
+    def __init__(self, geometry, grey_bgr, white_bgr, color_tolerance, change_tolerance=6,
+                 sample_stride=None):
+        rows, cols = np.divmod(geometry.pixel_index, geometry.key[0])
+        if sample_stride is None:
+            sample_stride = max(1, math.ceil(math.sqrt(len(rows) / self.SAMPLE_PIXELS)))
+        on_grid = (rows % sample_stride == 0) & (cols % sample_stride == 0)
+        self.sample_stride = sample_stride
+        self.sample_index = geometry.pixel_index[on_grid]
+        self.sample_rows, self.sample_cols = rows[on_grid], cols[on_grid]
+        self.change_tolerance = change_tolerance
+        self.bounds = [color_bounds(grey_bgr, color_tolerance), color_bounds(white_bgr, color_tolerance)]
+
+        # (P, 1, 3) BGR, so cv2 treats the sample as a one-column image
+        self._sample = np.empty((len(self.sample_index), 1, 3), dtype=np.uint8)
+        self._reference = np.empty_like(self._sample)
+        self._diff = np.empty_like(self._sample)
+        # Byte offsets of the sampled B, G and R values in a contiguous frame
+        self._channels = None
+        self._byte_index = None
+        # Grey line and white area matches of the sample and of the reference
+        self._matches = np.empty((2, len(self.sample_index), 1), dtype=np.uint8)
+        self._reference_matches = np.empty_like(self._matches)
+        self._has_reference = False
+
+    def reset(self):
+        """Forgets the reference, so the next frame is fully processed."""
+        self._has_reference = False
+
+    def check(self, frame):
+        if not len(self.sample_index):
+            return FRAME_CHANGED
+        channels = frame.shape[2]
+        if channels != self._channels:
+            self._byte_index = (self.sample_index[:, None] * channels + np.arange(3)).ravel()
+            self._channels = channels
+            self._has_reference = False
+        if frame.flags.c_contiguous:
+            np.take(frame.reshape(-1), self._byte_index, out=self._sample.reshape(-1))
+        else:
+            # A view into a larger frame (see capture.MultiRoiCapture); reshaping would copy it
+            self._sample[:, 0] = frame[self.sample_rows, self.sample_cols, :3]
+
+        for (lower, upper), match in zip(self.bounds, self._matches):
+            cv2.inRange(self._sample, lower, upper, dst=match)
+
+        if self._has_reference and np.array_equal(self._matches, self._reference_matches):
+            cv2.absdiff(self._sample, self._reference, dst=self._diff)
+            if self._diff.max(initial=0) <= self.change_tolerance:
+                return FRAME_UNCHANGED
+
+        self._sample, self._reference = self._reference, self._sample
+        self._matches, self._reference_matches = self._reference_matches, self._matches
+        self._has_reference = True
+        if self._reference_matches.any():
+            return FRAME_CHANGED
+        return FRAME_EMPTY
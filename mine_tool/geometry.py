@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Geometry of the minigame's curved bar.
+
+The bar is a quarter ring anchored at the bottom-left corner of the ROI. Its
+mask, contour and per-pixel polar coordinates only depend on the ROI size
+and the bar thickness, so they are built once per process (and optionally
+cached on disk) and shared by every frame and every detector.
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+
+def build_curved_bar_mask(roi_width, roi_height, thickness_percentage):
+    """
+    Creates a mask for the 1st quadrant of a semi-circle anchored at the
+    bottom-left corner of the ROI.
+    """
+    # 1. Define the bar's geometry based on ROI dimensions
+    center_x, center_y = 0, roi_height
+    
+    outer_radius = min(roi_width, roi_height)
+    thickness = int(outer_radius * thickness_percentage)
+    inner_radius = outer_radius - thickness
+
+    # Ensure radii are positive
+    if inner_radius < 0:
+        inner_radius = 0
+
+    # 2. Create an empty mask
+    mask = np.zeros((roi_height, roi_width), dtype=np.uint8)
+
+    # 3. Draw the inner and outer semi-circles on the mask
+    # The angles are 270 to 360 degrees for the 1st quadrant.
+    cv2.ellipse(mask, (center_x, center_y), (outer_radius, outer_radius),
+                0, 270, 360, 255, -1)
+    
+    cv2.ellipse(mask, (center_x, center_y), (inner_radius, inner_radius),
+                0, 270, 360, 0, -1)
+
+    return mask
+
+class ArcGeometry:
+    """
+    Precomputed geometry of the curved bar for one (ROI width, ROI height,
+    thickness) combination. The bar only depends on these values, so it is
+    built once and shared by every frame instead of being redrawn.
+
+    Attributes:
+        key: The (roi_width, roi_height, thickness_percentage) tuple.
+        center: The arc center in local ROI coordinates.
+        outer_radius: Outer radius of the band in pixels.
+        inner_radius: Inner radius of the band in pixels.
+        mask: uint8 mask of the bar band (255 inside the band).
+        contour: Outer contour of the band, for visualization (or None).
+        pixel_index: Flat indices of the band pixels into an (H, W) frame.
+        angles: Angle (radians, arctan2 convention) of each band pixel.
+        radii: Distance from the arc center of each band pixel.
+    """
+    CACHE_VERSION = 1
+
+    def __init__(self, roi_width, roi_height, thickness_percentage, mask=None, contour=None):
+        self.key = (int(roi_width), int(roi_height), float(thickness_percentage))
+        self.center = (0, int(roi_height))
+        self.outer_radius = min(int(roi_width), int(roi_height))
+        self.inner_radius = max(0, self.outer_radius - int(self.outer_radius * thickness_percentage))
+
+        if mask is None:
+            mask = build_curved_bar_mask(roi_width, roi_height, thickness_percentage)
+        self.mask = mask
+
+        if contour is None:
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            contour = contours[0] if contours else None
+        self.contour = contour
+
+        # Sparse index of the band and the polar coordinates of each band pixel
+        self.pixel_index = np.flatnonzero(mask)
+        ys, xs = np.divmod(self.pixel_index, roi_width)
+        dx = (xs - self.center[0]).astype(np.float32)
+        dy = (ys - self.center[1]).astype(np.float32)
+        self.angles = np.arctan2(dy, dx)
+        self.radii = np.hypot(dx, dy)
+
+    def save(self, path):
+        """Writes the geometry to a compressed .npz cache file."""
+        contour = self.contour if self.contour is not None else np.empty((0, 1, 2), dtype=np.int32)
+        with open(path, 'wb') as cache_file:
+            np.savez_compressed(
+                cache_file,
+                version=np.array(self.CACHE_VERSION),
+                key=np.array(self.key, dtype=np.float64),
+                mask=self.mask,
+                contour=contour,
+            )
+
+    @classmethod
+    def load(cls, path, roi_width, roi_height, thickness_percentage):
+        """
+        Loads a geometry from a cache file. Returns None if the file is missing,
+        unreadable, or was built for different settings.
+        """
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != cls.CACHE_VERSION:
+                    return None
+                key = (int(roi_width), int(roi_height), float(thickness_percentage))
+                if tuple(data['key'].tolist()) != key:
+                    return None
+                mask = data['mask']
+                contour = data['contour']
+        except (OSError, KeyError, ValueError):
+            return None
+
+        if mask.shape != (roi_height, roi_width):
+            return None
+        if len(contour) == 0:
+            contour = None
+        return cls(roi_width, roi_height, thickness_percentage, mask=mask, contour=contour)
+
+# In-memory cache of arc geometries, keyed on (roi_width, roi_height, thickness_percentage)
+_arc_geometry_cache = {}
+
+def arc_geometry_cache_path(cache_file, roi_width, roi_height, thickness_percentage):
+    """
+    The file a geometry is cached in: `cache_file` with the ROI size and bar
+    thickness appended to its name, so ROIs of different sizes keep separate files.
+    """
+    root, ext = os.path.splitext(cache_file)
+    return f"{root}_{int(roi_width)}x{int(roi_height)}_{float(thickness_percentage):g}{ext or '.npz'}"
+
+def get_arc_geometry(roi_width, roi_height, thickness_percentage, cache_file=None):
+    """
+    Returns the ArcGeometry for the given ROI size and bar thickness, building it
+    only once per process. If `cache_file` is given, the geometry is also loaded
+    from / saved to disk, in one file per ROI size and thickness (see
+    `arc_geometry_cache_path`); a stale or unreadable file is rebuilt automatically.
+    """
+    key = (int(roi_width), int(roi_height), float(thickness_percentage))
+    geometry = _arc_geometry_cache.get(key)
+    if geometry is not None:
+        return geometry
+
+    if cache_file:
+        cache_file = arc_geometry_cache_path(cache_file, roi_width, roi_height, thickness_percentage)
+        geometry = ArcGeometry.load(cache_file, roi_width, roi_height, thickness_percentage)
+
+    if geometry is None:
+        geometry = ArcGeometry(roi_width, roi_height, thickness_percentage)
+        if cache_file:
+            try:
+                geometry.save(cache_file)
+            except OSError as e:
+                print(f"Could not write arc geometry cache '{cache_file}': {e}", file=sys.stderr)
+
+    _arc_geometry_cache[key] = geometry
+    return geometry
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+The live tool: screen capture, mouse automation, hotkeys and debug view.
+
+`run()` wires the package's parts together from a Config, with one
+processing loop for a single ROI or `multi_roi_loop` when [Instance]
+sections add more game clients. The mouse and keyboard hooks (pynput) and
+the Tk window are only created here, so merely importing the package never
+touches them.
+"""
+import sys
+import threading
+import time
+from functools import partial
+
+from .actions import MouseReleaseSink, ScheduledReleaser, create_release_sink
+from .capture import MultiRoiCapture, create_capture_backend
+from .config import CONFIG_FILE, save_roi
+from .loop import STATS_COUNTERS, multi_roi_loop, processing_loop
+from .scheduler import FrameScheduler
+from .stats import LiveStats, StatsLogger, serve_stats
+
+def hotkey_from_name(name):
+    """Returns the pynput key for a name such as 'f8', 'pause' or a single character."""
+    from pynput import keyboard
+    if len(name) == 1:
+        return keyboard.KeyCode.from_char(name)
+    try:
+        return keyboard.Key[name]
+    except KeyError:
+        return None
+
+def start_key_listener(stop_event, miss_hotkey=None, on_miss=None):
+    """
+    Starts a global keyboard listener: Esc sets `stop_event`, and
+    `miss_hotkey` calls `on_miss()` (if both are given). Returns the listener.
+    """
+    from pynput import keyboard
+    miss_key = hotkey_from_name(miss_hotkey) if miss_hotkey and on_miss is not None else None
+
+    def on_press(key):
+        if key == keyboard.Key.esc:
+            print("Escape pressed, stopping script.")
+            stop_event.set()
+            return False
+        if miss_key is not None and key == miss_key:
+            print("Miss hotkey pressed, saving flight record.")
+            on_miss()
+
+    listener = keyboard.Listener(on_press=on_press)
+    listener.start()
+    return listener
+
+def create_instance_sink(instance):
+    """Returns the release sink for an InstanceConfig's ACTION, or the mouse if the ACTION is invalid."""
+    try:
+        return create_release_sink(instance.action)
+    except ValueError as e:
+        print(f"[{instance.section}] {e}. Using 'mouse'.", file=sys.stderr)
+        return MouseReleaseSink()
+
+def create_releaser(config, release_sink):
+    """Returns a started ScheduledReleaser if RELEASE_MODE is 'scheduled' and prediction is on, else None."""
+    if config.release_mode != 'scheduled' or not config.prediction_enabled:
+        return None
+    releaser = ScheduledReleaser(release_sink)
+    releaser.start()
+    return releaser
+
+def create_roi_tracker(config, capture):
+    """Returns a RoiTracker for `capture` if [Calibration] TRACK_ROI is on and the screen is captured."""
+    if not config.track_roi or config.capture_source:
+        return None
+    from .calibrate import RoiTracker
+    return RoiTracker(capture, config.capture_backend, config.bar_bgr, config.grey_bgr, config.white_bgr,
+                      config.color_tolerance, config.bar_thickness_percentage, config.roi_search_interval,
+                      config.roi_search_margin)
+
+def create_flight_recorder(config):
+    """Returns a started FlightRecorder configured from [Recorder], or None if disabled."""
+    if not config.recorder_enabled:
+        return None
+    from .recorder import FlightRecorder
+    roi_width, roi_height = config.roi_size
+    recorder = FlightRecorder((roi_height, roi_width, 3), config.recorder_frames,
+                              config.recorder_post_frames, config.recorder_directory)
+    recorder.start()
+    print(f"Flight recorder keeping the last {config.recorder_frames} frames; "
+          f"press '{config.recorder_hotkey}' to save them after a miss.")
+    return recorder
+
+def start_stats_reporting(config, live_stats):
+    """
+    Starts the periodic stats log and the local HTTP endpoint configured in
+    [Stats], if any. Returns a function that stops them again.
+    """
+    logger = server = None
+    if config.stats_log_file:
+        logger = StatsLogger(live_stats, config.stats_log_file, config.stats_log_interval,
+                             config.stats_log_format)
+        logger.start()
+        print(f"Writing stats to '{config.stats_log_file}' every {config.stats_log_interval:g} s.")
+    if config.stats_http_port:
+        try:
+            server = serve_stats(live_stats, config.stats_http_port)
+            print(f"Serving stats at http://127.0.0.1:{config.stats_http_port}/")
+        except OSError as e:
+            print(f"Could not serve stats on port {config.stats_http_port}: {e}", file=sys.stderr)
+
+    def stop():
+        if server is not None:
+            server.shutdown()
+        if logger is not None:
+            logger.stop()
+    return stop
+
+def run(config, config_file=CONFIG_FILE):
+    """
+    Runs the live tool until Esc is pressed or the debug view is closed.
+    ROI changes found by the ROI tracker are saved to `config_file`.
+    """
+    stop_event = threading.Event()
+    instances = config.instances
+
+    if config.capture_pipeline == 'process' and len(instances) > 1:
+        print("PIPELINE = process supports a single ROI; running all instances in this process.",
+              file=sys.stderr)
+    elif config.capture_pipeline == 'process':
+        # Capture and detection in their own processes; this one only hosts the view
+        from .pipeline import run_pipeline
+        try:
+            run_pipeline(config, stop_event, config_file)
+        finally:
+            print("Script finished.")
+        return
+
+    # Persistent capture backend shared by every frame
+    if len(instances) > 1:
+        # One grab of the union of all ROIs per frame
+        capture = MultiRoiCapture(config.capture_backend, [instance.roi for instance in instances],
+                                  config.capture_source)
+        capture.open()
+    else:
+        capture = create_capture_backend(config.capture_backend, config.roi, config.capture_source)
+    release_sinks = [create_instance_sink(instance) for instance in instances]
+    scheduler = FrameScheduler(config.frame_period, config.idle_frame_period, config.idle_delay,
+                               config.burst_distance)
+    releasers = [create_releaser(config, release_sink) for release_sink in release_sinks]
+    live_stats = LiveStats(STATS_COUNTERS)
+    stop_stats_reporting = start_stats_reporting(config, live_stats)
+    flight_recorder = create_flight_recorder(config)
+    on_miss = partial(flight_recorder.trigger, 'miss') if flight_recorder is not None else None
+    listener = start_key_listener(stop_event, config.recorder_hotkey, on_miss)
+
+    view = None
+    if config.overlay_mode != 'off':
+        from .view import DebugViewMailbox
+        view = DebugViewMailbox()
+
+    if len(instances) > 1:
+        def on_roi_moved(index, roi):
+            save_roi(roi, config_file, instances[index].section)
+
+        roi_trackers = [create_roi_tracker(config, roi) for roi in capture.rois]
+        processing_thread = threading.Thread(
+            target=multi_roi_loop, args=(config, capture, release_sinks),
+            kwargs={'releasers': releasers, 'names': [instance.name for instance in instances],
+                    'stop_event': stop_event, 'stage_timer': live_stats, 'scheduler': scheduler,
+                    'workers': config.detection_workers, 'recorder': flight_recorder, 'view': view,
+                    'roi_trackers': roi_trackers, 'on_roi_moved': on_roi_moved})
+    else:
+        roi_trackers = [create_roi_tracker(config, capture)]
+        processing_thread = threading.Thread(target=processing_loop, args=(config, capture, release_sinks[0]),
+                                             kwargs={'stop_event': stop_event, 'stage_timer': live_stats,
+                                                     'scheduler': scheduler, 'releaser': releasers[0],
+                                                     'recorder': flight_recorder, 'view': view,
+                                                     'roi_tracker': roi_trackers[0],
+                                                     'on_roi_moved': partial(save_roi, path=config_file)})
+    processing_thread.daemon = True
+    processing_thread.start()
+
+    try:
+        if view is None:
+            # Headless: no debug windows, just wait for Esc or the loop to end
+            while not stop_event.is_set() and processing_thread.is_alive():
+                time.sleep(0.1)
+        else:
+            from .view import run_debug_view
+            run_debug_view(view, *config.roi_size, config.display_fps, stop_event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        listener.stop()
+
+        if processing_thread.is_alive():
+            processing_thread.join(timeout=1.0)
+        for releaser in releasers:
+            if releaser is not None:
+                releaser.stop()
+        for roi_tracker in roi_trackers:
+            if roi_tracker is not None:
+                roi_tracker.close()
+        capture.close()
+        stop_stats_reporting()
+        if flight_recorder is not None:
+            flight_recorder.stop()
+
+        print("Script finished.")
@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""
+The processing loop: capture, detection, release decision and hand-off.
+
+`processing_loop` is shared by the live tool (in a thread, or in the
+detection process of the multi-process pipeline) and the headless replay.
+Everything it depends on is passed in: the Config, a capture backend, a
+release sink, and optionally a releaser, scheduler, stage timer, flight
+recorder, ROI tracker and debug view.
+
+`multi_roi_loop` runs several ROIs (one per game client) from one capture of
+their bounding union, each with its own `RoiProcessor`, and dispatches the
+per-ROI work across a small thread pool.
+"""
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .capture import CaptureError, EndOfStream
+from .detector import Detector
+from .gate import FRAME_CHANGED, FRAME_EMPTY, FRAME_UNCHANGED, FrameGate
+from .overlay import DetectionResult, draw_overlay
+from .stats import NullStageTimer
+from .tracker import AlphaBetaTracker, LatencyEstimator
+
+# Event counters reported by the processing loop
+STATS_COUNTERS = ("failed_captures", "cooldown_suppressed", "dropped_frames", "roi_relocations",
+                  "unchanged_frames", "empty_frames")
+
+class RoiProcessor:
+    """
+    Detection and release decision for one ROI.
+
+    Owns everything that is specific to one minigame: the detector and frame
+    gate for the ROI's size, the grey line tracker and latency estimate, the
+    click cooldown, and the release sink (or releaser) it acts on. `step()`
+    is called once per captured frame of the ROI; the results of the last
+    step stay available as `detection`, `frame_state`, `trigger_distance`,
+    `current_arc_velocity` and `released`.
+    """
+
+    def __init__(self, config, roi_width, roi_height, release_sink, releaser=None, name=None, realtime=True):
+        self.config = config
+        self.release_sink = release_sink
+        self.releaser = releaser
+        self.name = name
+        # Whether the capture runs on the wall clock (see CaptureBackend.realtime)
+        self.realtime = realtime
+
+        # The curved bar only depends on ROI size and thickness, so it is built once
+        self.detector = Detector.from_config(config, roi_width, roi_height)
+        self.frame_gate = None
+        if config.skip_unchanged_frames:
+            self.frame_gate = FrameGate(self.detector.geometry, config.grey_bgr, config.white_bgr,
+                                        config.color_tolerance, config.change_tolerance)
+
+        # Grey line motion tracker and online capture-to-decision latency estimate
+        self.grey_tracker = AlphaBetaTracker(config.tracker_alpha, config.tracker_beta)
+        self.pipeline_latency = LatencyEstimator()
+
+        self.cooldown_active = False
+        self.cooldown_start_time = 0.0
+        # Side of the white area's center the grey line was on when a release was last scheduled
+        self.scheduled_side = 0.0
+        # Last arc distance and its time for the legacy velocity calculation
+        self.last_arc_distance = None
+        self.last_grey_time = None
+
+        self.detection = self.detector.empty()
+        self.frame_state = FRAME_CHANGED
+        self.trigger_distance = float('inf')
+        self.current_arc_velocity = 0.0
+        self.released = False
+        # Coarse-to-fine: whether the next frame is searched only around this one's targets
+        self.refine_next = False
+        self.last_frame_time = None
+
+    @property
+    def visible(self):
+        return self.detection.visible
+
+    def reset(self):
+        """Forgets the last processed frame, so the next one is fully processed."""
+        if self.frame_gate is not None:
+            self.frame_gate.reset()
+
+    def _tag(self, frame_count):
+        return f"[{frame_count}]" if self.name is None else f"[{self.name}:{frame_count}]"
+
+    def _near_release(self, trigger_distance, current_arc_velocity, frame_time):
+        """
+        True if the grey line may be within REFINE_DISTANCE of releasing by
+        the next frame, assuming it comes as long after this one as this one
+        after the last. With a releaser, releases are scheduled up to
+        RELEASE_HORIZON ahead, so that distance counts as well.
+        """
+        config = self.config
+        # The arc velocity is negative while the line approaches the center
+        approach_speed = max(0.0, -current_arc_velocity)
+        frame_interval = frame_time - self.last_frame_time if self.last_frame_time is not None else 0.0
+        reach = config.middle_threshold + config.refine_distance
+        if self.releaser is not None:
+            reach += approach_speed * config.release_horizon
+        return trigger_distance - approach_speed * frame_interval <= reach
+
+    def step(self, frame, frame_count, frame_index, frame_time, captured_at, stage_timer):
+        """
+        Detects the grey line and white area in `frame` and releases (or
+        schedules the release) when the predicted grey line reaches the middle
+        of the white area. Records the 'bar_mask', 'white', 'grey' and
+        'decision' stages on `stage_timer`. Returns True if a release fired.
+        """
+        config = self.config
+        releaser = self.releaser
+        self.released = False
+        if releaser is not None:
+            released_at = releaser.poll(frame_time)
+            if released_at is not None:
+                print(f"{self._tag(frame_count)} Scheduled release fired at t={released_at:.3f}.")
+                self.cooldown_active = True
+                self.cooldown_start_time = released_at
+                self.released = True
+
+        if self.cooldown_active:
+            if frame_time - self.cooldown_start_time >= config.click_cooldown_duration:
+                self.cooldown_active = False
+
+        frame_state = self.frame_gate.check(frame) if self.frame_gate is not None else FRAME_CHANGED
+        self.frame_state = frame_state
+        if frame_state == FRAME_UNCHANGED:
+            # Same bar as the last processed frame: its result and decision still hold
+            stage_timer.count('unchanged_frames')
+        elif frame_state == FRAME_EMPTY:
+            # No grey line or white area colors on the bar, so nothing to detect
+            stage_timer.count('empty_frames')
+            self.detection = self.detector.empty()
+        else:
+            # Close to a release, only the area around the last frame's targets is searched
+            near = self.detection if self.refine_next else None
+            self.detection = self.detector.detect(frame, stage_timer, near)
+        detection = self.detection
+        visible = detection.visible
+
+        # --- Arc Distance & Velocity Calculation ---
+        # A repeated frame carries no new motion, so the tracker, velocity and
+        # any scheduled release keep the state of the last processed frame
+        if frame_state != FRAME_UNCHANGED:
+            trigger_distance = float('inf')
+            current_arc_velocity = 0.0
+            # Predicted seconds from capture until the grey line reaches the center
+            time_to_center = None
+
+            if visible:
+                angle_grey_rad, angle_white_rad = detection.angle_grey, detection.angle_white
+                radius = detection.radius
+                arc_distance = detection.arc_distance
+
+                if config.prediction_enabled and config.prediction_model == 'tracker':
+                    # --- Latency-Compensated Tracker Prediction ---
+                    tracked_angle, angular_velocity = self.grey_tracker.update(angle_grey_rad, frame_time)
+                    if self.realtime:
+                        lead_time = self.pipeline_latency.observe(time.perf_counter() - captured_at)
+                    else:
+                        # In stream time the release lands at the frame's own timestamp
+                        lead_time = 0.0
+
+                    # Signed angular offset from the grey line to the white area, now and
+                    # at the moment a release issued now would take effect
+                    offset = side = angle_white_rad - tracked_angle
+                    predicted_offset = angle_white_rad - self.grey_tracker.predict(lead_time)
+                    approaching = offset * angular_velocity > 0
+
+                    # Rate of change of the arc distance (negative while approaching)
+                    current_arc_velocity = -math.copysign(angular_velocity * radius, offset)
+
+                    if approaching:
+                        time_to_center = offset / angular_velocity
+
+                    if approaching and predicted_offset * offset <= 0:
+                        # The line reaches the center before the release lands
+                        trigger_distance = 0.0
+                    elif approaching:
+                        trigger_distance = abs(predicted_offset) * radius
+                    else:
+                        trigger_distance = arc_distance
+                else:
+                    side = angle_white_rad - angle_grey_rad
+                    # Calculate velocity based on arc distance
+                    if self.last_arc_distance is not None and self.last_grey_time is not None:
+                        time_diff = frame_time - self.last_grey_time
+                        if time_diff > 0:
+                            distance_diff = arc_distance - self.last_arc_distance
+                            current_arc_velocity = distance_diff / time_diff
+
+                    # Update last values for the next frame's calculation
+                    self.last_arc_distance = arc_distance
+                    self.last_grey_time = frame_time
+
+                    # --- Dynamic Prediction Logic ---
+                    if config.prediction_enabled:
+                        prediction_offset = (config.lookahead_factor
+                                             * pow(abs(current_arc_velocity), config.exponential_power))
+
+                        if current_arc_velocity < 0:
+                            trigger_distance = arc_distance - prediction_offset
+                            time_to_center = arc_distance / -current_arc_velocity
+                        else:
+                            trigger_distance = arc_distance
+                    else:
+                        trigger_distance = arc_distance
+
+            else:
+                current_arc_velocity = 0.0
+                self.last_arc_distance = None
+                self.last_grey_time = None
+                self.grey_tracker.reset()
+
+            if releaser is not None and visible and releaser.pending and not self.released:
+                # A pending release whose line already passed the center (or whose deadline
+                # passed) fires now: cancelling it would miss the round, as the frame-mode
+                # check below never triggers from the far side of the center
+                crossed = self.scheduled_side * (angle_white_rad - angle_grey_rad) <= 0
+                if crossed or releaser.overdue(frame_time):
+                    released_at = releaser.fire(frame_time)
+                    if released_at is not None:
+                        print(f"{self._tag(frame_count)} Line passed the center, releasing now.")
+                        self.cooldown_active = True
+                        self.cooldown_start_time = frame_time
+                        self.released = True
+                        time_to_center = None
+
+            if releaser is not None and time_to_center is not None:
+                # Hand the predicted center crossing to the action thread; newer frames refine it
+                if time_to_center <= config.release_horizon and not self.cooldown_active:
+                    releaser.schedule(time_to_center, frame_index, frame_time, captured_at)
+                    self.scheduled_side = math.copysign(1.0, side)
+                else:
+                    if time_to_center <= config.release_horizon:
+                        stage_timer.count('cooldown_suppressed')
+                    releaser.cancel()
+            else:
+                if releaser is not None and visible:
+                    # The line is visible but not approaching; drop any stale prediction
+                    releaser.cancel()
+                if trigger_distance < config.middle_threshold and not self.cooldown_active:
+                    print(f"{self._tag(frame_count)} Predicted position is in the middle! Releasing mouse.")
+                    self.release_sink.release(frame_index, frame_time)
+                    self.cooldown_active = True
+                    self.cooldown_start_time = frame_time
+                    self.released = True
+                elif trigger_distance < config.middle_threshold:
+                    stage_timer.count('cooldown_suppressed')
+
+            self.trigger_distance = trigger_distance
+            self.current_arc_velocity = current_arc_velocity
+            if config.coarse_to_fine:
+                self.refine_next = visible and self._near_release(trigger_distance, current_arc_velocity, frame_time)
+                self.last_frame_time = frame_time
+        stage_timer.mark('decision')
+        return self.released
+
+    def record(self, recorder, frame, frame_index, frame_time, captured_at):
+        """Hands the frame and the last step's results to a FlightRecorder."""
+        detection = self.detection
+        visible = detection.visible
+        recorder.record(frame, frame_index, frame_time, captured_at, self.released,
+                        detection.angle_grey if visible else None,
+                        detection.angle_white if visible else None,
+                        detection.radius if visible else None, self.current_arc_velocity, self.trigger_distance)
+        if self.released:
+            recorder.trigger('release')
+
+    def update_scheduler(self, scheduler):
+        """Picks the scheduler's mode from the last step's results."""
+        detection = self.detection
+        if detection.visible:
+            scheduler.update(True, True, detection.arc_distance, self.current_arc_velocity)
+        else:
+            scheduler.update(detection.grey_center is not None, detection.white_center is not None)
+
+    def publish(self, view, frame, frame_index, stage_timer):
+        """
+        Sends the frame, masks and last detection result to the debug view
+        (see view.DebugViewMailbox), unless the frame was unchanged; counts a
+        dropped frame if the view has not taken the last one yet.
+        """
+        # Skip all overlay work if the view has not taken the last frame
+        slot = view.acquire()
+        if slot is None:
+            stage_timer.count('dropped_frames')
+            return
+        if self.frame_state == FRAME_UNCHANGED:
+            return
+
+        config = self.config
+        detection = self.detection
+        geometry = self.detector.geometry
+        result = DetectionResult(
+            frame_index=frame_index, arc_center=self.detector.arc_center, bar_contour=geometry.contour,
+            grey_center=detection.grey_center, grey_contour=detection.grey_contour,
+            white_center=detection.white_center, white_contour=detection.white_contour,
+            arc_velocity=self.current_arc_velocity, trigger_distance=self.trigger_distance
+        )
+        if detection.visible:
+            result.angle_grey = detection.angle_grey
+            result.angle_white = detection.angle_white
+            result.radius = detection.radius
+        if config.stats_overlay:
+            result.stats_line = stage_timer.stats_line()
+
+        # The capture buffer and masks are reused for the next frame, so the
+        # slot keeps copies in its own preallocated buffers
+        slot.store(frame if view.keep_frames else None, detection.grey_mask, detection.white_mask, geometry.mask)
+        if config.overlay_mode == 'eager':
+            draw_overlay(slot.image, result)
+            result = None
+        slot.result = result
+        view.commit()
+
+def _grab_or_wait(capture, failed_captures, stop_event, stage_timer, scheduler):
+    """
+    Grabs the next frame. Returns (frame, failed_captures); frame is None if
+    the capture failed (after waiting for the next tick) or the stream ended
+    (after setting `stop_event`).
+    """
+    try:
+        return capture.grab(), failed_captures
+    except EndOfStream as e:
+        print(f"{e}, stopping.")
+        stop_event.set()
+    except CaptureError as e:
+        failed_captures += 1
+        stage_timer.count('failed_captures')
+        if failed_captures == 1 or failed_captures % 100 == 0:
+            print(f"Capture failed ({failed_captures} total): {e}", file=sys.stderr)
+        if scheduler is not None:
+            scheduler.update(False, False)
+            scheduler.wait()
+        else:
+            time.sleep(0.001)
+    return None, failed_captures
+
+def processing_loop(config, capture, release_sink, stop_event=None, stage_timer=None, scheduler=None,
+                    releaser=None, recorder=None, roi_tracker=None, view=None, on_roi_moved=None):
+    """
+    Captures frames from `capture`, detects the grey line and white area, and
+    calls `release_sink.release(frame_index, timestamp)` when the (predicted)
+    grey line reaches the middle of the white area. Runs until `stop_event`
+    is set or a file-backed capture reaches its end (which sets it).
+
+    `releaser`, if given (see actions.ScheduledReleaser), receives the
+    predicted time until the grey line reaches the center whenever it is
+    approaching, and fires its own sink at that deadline; `release_sink` is
+    then only used when no prediction is available.
+
+    `stage_timer`, if given (see stats.StageTimer and stats.LiveStats),
+    receives start()/mark(stage)/end() calls for the 'capture', 'bar_mask'
+    (polar engine only; the contour engine reuses the cached mask), 'white',
+    'grey', 'decision' and 'handoff' stages, and count(counter) calls for
+    the STATS_COUNTERS.
+
+    With SKIP_UNCHANGED_FRAMES, frames whose bar matches the last processed
+    frame (see gate.FrameGate) keep its detection result and release decision
+    and are not sent to the debug view; frames without any grey line or white
+    area colored pixels on the bar skip detection.
+
+    `scheduler`, if given, paces the loop (see FrameScheduler); without one
+    frames are processed back to back.
+
+    `recorder`, if given (see recorder.FlightRecorder), receives every frame
+    with its detection results (timed as the 'record' stage) and is
+    triggered on each release.
+
+    `roi_tracker`, if given (see calibrate.RoiTracker), searches for the bar
+    around the ROI while nothing is detected and moves the capture if the
+    game window moved; `on_roi_moved(roi)` is then called with the new ROI.
+
+    `view`, if given (see view.DebugViewMailbox), receives the frames, masks
+    and detection results for the debug view unless OVERLAY is off.
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+    if stage_timer is None:
+        stage_timer = NullStageTimer()
+    if config.overlay_mode == 'off':
+        view = None
+
+    roi_x1, roi_y1, roi_x2, roi_y2 = capture.bbox
+    print("Starting detection script. Press 'Esc' to stop.")
+    print(f"Monitoring region: ({roi_x1},{roi_y1}) to ({roi_x2},{roi_y2})")
+    print(f"Target Grey BGR: {config.grey_bgr}, Target White BGR: {config.white_bgr}")
+    print(f"Capture backend: {capture.name}, detection engine: {config.detection_engine}")
+
+    frame_count = 0
+    failed_captures = 0
+    processor = RoiProcessor(config, capture.width, capture.height, release_sink, releaser,
+                             realtime=capture.realtime)
+
+    while not stop_event.is_set():
+        try:
+            frame_count += 1
+            stage_timer.start()
+
+            screenshot_bgr, failed_captures = _grab_or_wait(capture, failed_captures, stop_event, stage_timer,
+                                                            scheduler)
+            if screenshot_bgr is None:
+                continue
+
+            # Timestamp of the frame at capture (stream time for file sources)
+            frame_time = capture.timestamp
+            stage_timer.mark('capture')
+
+            processor.step(screenshot_bgr, frame_count, capture.frame_index, frame_time, capture.captured_at,
+                           stage_timer)
+
+            if recorder is not None:
+                processor.record(recorder, screenshot_bgr, capture.frame_index, frame_time, capture.captured_at)
+                stage_timer.mark('record')
+
+            if scheduler is not None:
+                processor.update_scheduler(scheduler)
+
+            # --- Visualization ---
+            if view is not None:
+                processor.publish(view, screenshot_bgr, capture.frame_index, stage_timer)
+            stage_timer.mark('handoff')
+            stage_timer.end()
+
+            if roi_tracker is not None:
+                detection = processor.detection
+                moved_roi = roi_tracker.update(detection.grey_center is not None
+                                               or detection.white_center is not None, capture.captured_at)
+                if moved_roi is not None:
+                    print(f"Bar found elsewhere, ROI moved to ({moved_roi[0]},{moved_roi[1]}) "
+                          f"to ({moved_roi[2]},{moved_roi[3]}).")
+                    stage_timer.count('roi_relocations')
+                    processor.reset()
+                    if on_roi_moved is not None:
+                        on_roi_moved(moved_roi)
+
+            if scheduler is not None:
+                scheduler.wait()
+
+        except Exception as e:
+            print(f"Exception in processing_loop: {e}", file=sys.stderr)
+            # The last result may be incomplete; do not reuse it
+            processor.reset()
+            time.sleep(1)
+
+    print(f"Processing thread stopped. {failed_captures} failed captures.")
+
+def _most_urgent(processors):
+    """The processor whose grey line is closest to its white area, preferring visible ones."""
+    return min(processors, key=lambda p: (not p.visible, p.detection.arc_distance if p.visible else 0.0))
+
+def _step_in_worker(processor, frame, frame_count, frame_index, frame_time, captured_at, stage_timer):
+    # Stage times are kept per thread, so each worker starts its own timeline
+    stage_timer.start()
+    return processor.step(frame, frame_count, frame_index, frame_time, captured_at, stage_timer)
+
+def multi_roi_loop(config, capture, release_sinks, releasers=None, names=None, stop_event=None, stage_timer=None,
+                   scheduler=None, workers=0, recorder=None, roi_trackers=None, view=None, on_roi_moved=None):
+    """
+    Runs one minigame per ROI of `capture` (see capture.MultiRoiCapture),
+    each with its own RoiProcessor: detector, tracker, click cooldown and
+    `release_sinks[i]` (and `releasers[i]`, if given). Every tick captures
+    the union of the ROIs once; the per-ROI zero-copy slices are processed
+    on a pool of `workers` threads (0: one per ROI, up to the CPU count).
+    OpenCV and NumPy release the GIL, so throughput scales with cores.
+
+    The stages of each ROI are recorded on `stage_timer` from its worker
+    thread, plus a 'dispatch' stage for the whole fan-out when a pool is
+    used. `scheduler` follows the ROI whose grey line is closest to its
+    white area. `recorder` and `view` receive the first ROI only.
+    `roi_trackers[i]`, if given, must track `capture.rois[i]`;
+    `on_roi_moved(i, roi)` is called when ROI `i` moved.
+
+    Otherwise behaves like `processing_loop`.
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+    if stage_timer is None:
+        stage_timer = NullStageTimer()
+    if config.overlay_mode == 'off':
+        view = None
+    count = len(capture.rois)
+    releasers = releasers or [None] * count
+    names = names or [str(i + 1) for i in range(count)]
+    roi_trackers = roi_trackers or [None] * count
+    if not workers:
+        workers = min(count, os.cpu_count() or 1)
+
+    print("Starting detection script. Press 'Esc' to stop.")
+    for name, roi in zip(names, capture.rois):
+        x1, y1, x2, y2 = roi.bbox
+        print(f"Monitoring region {name}: ({x1},{y1}) to ({x2},{y2})")
+    print(f"Target Grey BGR: {config.grey_bgr}, Target White BGR: {config.white_bgr}")
+    print(f"Capture backend: {capture.name}, detection engine: {config.detection_engine}, "
+          f"{min(workers, count)} detection worker(s)")
+
+    frame_count = 0
+    failed_captures = 0
+    processors = [RoiProcessor(config, roi.width, roi.height, sink, releaser, name, capture.realtime)
+                  for roi, sink, releaser, name in zip(capture.rois, release_sinks, releasers, names)]
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="roi-detect") if workers > 1 and count > 1 \
+        else None
+
+    try:
+        while not stop_event.is_set():
+            try:
+                frame_count += 1
+                stage_timer.start()
+
+                frames, failed_captures = _grab_or_wait(capture, failed_captures, stop_event, stage_timer,
+                                                        scheduler)
+                if frames is None:
+                    continue
+
+                frame_time = capture.timestamp
+                frame_index = capture.frame_index
+                captured_at = capture.captured_at
+                stage_timer.mark('capture')
+
+                if pool is None:
+                    for processor, frame in zip(processors, frames):
+                        processor.step(frame, frame_count, frame_index, frame_time, captured_at, stage_timer)
+                else:
+                    futures = [pool.submit(_step_in_worker, processor, frame, frame_count, frame_index,
+                                           frame_time, captured_at, stage_timer)
+                               for processor, frame in zip(processors, frames)]
+                    for future in futures:
+                        future.result()
+                    stage_timer.mark('dispatch')
+
+                if recorder is not None:
+                    processors[0].record(recorder, frames[0], frame_index, frame_time, captured_at)
+                    stage_timer.mark('record')
+
+                if scheduler is not None:
+                    _most_urgent(processors).update_scheduler(scheduler)
+
+                if view is not None:
+                    processors[0].publish(view, frames[0], frame_index, stage_timer)
+                stage_timer.mark('handoff')
+                stage_timer.end()
+
+                for index, (processor, roi_tracker) in enumerate(zip(processors, roi_trackers)):
+                    if roi_tracker is None:
+                        continue
+                    detection = processor.detection
+                    moved_roi = roi_tracker.update(detection.grey_center is not None
+                                                   or detection.white_center is not None, captured_at)
+                    if moved_roi is not None:
+                        print(f"Bar {names[index]} found elsewhere, ROI moved to ({moved_roi[0]},{moved_roi[1]}) "
+                              f"to ({moved_roi[2]},{moved_roi[3]}).")
+                        stage_timer.count('roi_relocations')
+                        processor.reset()
+                        if on_roi_moved is not None:
+                            on_roi_moved(index, moved_roi)
+
+                if scheduler is not None:
+                    scheduler.wait()
+
+            except Exception as e:
+                print(f"Exception in multi_roi_loop: {e}", file=sys.stderr)
+                for processor in processors:
+                    processor.reset()
+                time.sleep(1)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    print(f"Processing thread stopped. {failed_captures} failed captures.")
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Debug overlay for the live view.
+
+The processing loop only publishes a compact `DetectionResult`; the overlay
+is drawn from it by whoever actually displays the frame, so frames that are
+never shown cost nothing to visualize.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+@dataclass
+class DetectionResult:
+    """Per-frame detection output needed to draw the overlay."""
+    frame_index: int
+    arc_center: Tuple[int, int]
+    bar_contour: Optional[np.ndarray] = None
+    grey_center: Optional[Tuple[int, int]] = None
+    grey_contour: Optional[np.ndarray] = None
+    white_center: Optional[Tuple[int, int]] = None
+    white_contour: Optional[np.ndarray] = None
+    angle_grey: Optional[float] = None
+    angle_white: Optional[float] = None
+    radius: Optional[float] = None
+    arc_velocity: float = 0.0
+    trigger_distance: float = float('inf')
+    stats_line: Optional[str] = None
+
+def draw_overlay(image_bgr, result):
+    """Draws the detected bar, areas, angle lines, arc and stats onto `image_bgr` in place."""
+    arc_center = result.arc_center
+
+    if result.bar_contour is not None:
+        cv2.drawContours(image_bgr, [result.bar_contour], -1, (0, 0, 255), 2)
+
+    if result.white_center:
+        cv2.circle(image_bgr, result.white_center, 7, (0, 255, 0), -1)
+        if result.white_contour is not None:
+            cv2.drawContours(image_bgr, [result.white_contour], -1, (0, 255, 0), 2)
+
+    if result.grey_center and result.white_center:
+        angle_grey_rad = result.angle_grey
+        angle_white_rad = result.angle_white
+        radius = result.radius
+
+        # Convert angles to degrees for drawing
+        angle_grey_deg = np.degrees(angle_grey_rad)
+        angle_white_deg = np.degrees(angle_white_rad)
+
+        # Normalize angles to the 1st quadrant range (270 to 360) for drawing
+        angle_grey_deg_norm = (angle_grey_deg + 360) % 360
+        angle_white_deg_norm = (angle_white_deg + 360) % 360
+
+        # Draw circle and contour for grey line
+        cv2.circle(image_bgr, result.grey_center, 5, (255, 0, 0), -1)
+        if result.grey_contour is not None:
+            cv2.drawContours(image_bgr, [result.grey_contour], -1, (255, 0, 0), 2)
+
+        # --- Draw the Arc Path and Angle Lines ---
+        # 1. Draw the grey angle line
+        grey_line_end = (int(arc_center[0] + radius * np.cos(angle_grey_rad)),
+                         int(arc_center[1] + radius * np.sin(angle_grey_rad)))
+        cv2.line(image_bgr, arc_center, grey_line_end, (255, 0, 0), 1)
+
+        # 2. Draw the white area angle line
+        white_line_end = (int(arc_center[0] + radius * np.cos(angle_white_rad)),
+                          int(arc_center[1] + radius * np.sin(angle_white_rad)))
+        cv2.line(image_bgr, arc_center, white_line_end, (0, 255, 0), 1)
+
+        # 3. Draw the connecting arc
+        # Determine start and end angles for the arc path
+        start_angle = min(angle_grey_deg_norm, angle_white_deg_norm)
+        end_angle = max(angle_grey_deg_norm, angle_white_deg_norm)
+        cv2.ellipse(image_bgr, arc_center, (int(radius), int(radius)),
+                    0, start_angle, end_angle, (255, 255, 255), 2)
+
+    # Add velocity and trigger distance text to the preview
+    cv2.putText(image_bgr, f"Arc Vel: {result.arc_velocity:.1f} pix/s", (10, 50),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 2)
+    cv2.putText(image_bgr, f"Trigger Dist: {result.trigger_distance:.1f}", (10, 70),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 2)
+    if result.stats_line:
+        draw_stats_line(image_bgr, result.stats_line)
+    return image_bgr
+
+def draw_stats_line(image_bgr, text):
+    """Draws the live timing stats along the top of `image_bgr`, wrapped to its width."""
+    # Roughly 5 px per character at this font scale
+    per_line = max(1, image_bgr.shape[1] // 5)
+    for row, start in enumerate(range(0, len(text), per_line)):
+        cv2.putText(image_bgr, text[start:start + per_line], (2, 10 + 10 * row),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.3, (0, 255, 255), 1)
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-process capture/detect pipeline.
+
+Capture runs in one process and detection plus the release action in another,
+so they overlap on multi-core machines instead of alternating under the GIL.
+Frames travel through a `multiprocessing.shared_memory` ring buffer: the
+capture backend writes straight into a ring slot and the detector reads that
+slot in place, so frames are never pickled or copied between processes.
+The debug view, if enabled, attaches to the ring as a read-only consumer.
+"""
+import dataclasses
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .capture import CaptureBackend, CaptureError, EndOfStream, create_capture_backend
+from .config import CONFIG_FILE
+from .scheduler import FrameScheduler
+
+# Number of frames kept in the ring; the detector always takes the newest one
+RING_SLOTS = 4
+# Seconds the capture process waits for a slot lock before checking the stop event again
+SLOT_LOCK_TIMEOUT = 0.05
+
+class SharedFrameRing:
+    """
+    Ring of frames in shared memory with per-slot sequence numbers and locks.
+
+    Layout: `latest` (int64, newest published sequence number or -1),
+    `period` (float64, target capture period set by the detector), `origin`
+    (2 x int64, screen position of the ROI set by the detector), then per
+    slot its sequence number (-1 while being written), capture timestamp and
+    perf_counter capture time, followed by the frames themselves.
+
+    Each slot also has a `multiprocessing.Lock` in `locks`. The writer holds
+    it while filling the slot and every reader while using the frame, so a
+    frame is never overwritten while it is read. The locks also order the
+    plain shared-memory stores between processes, which numpy alone does not.
+
+    Use `create()` in the owning process and `attach(spec)` elsewhere; `spec`
+    is a small tuple describing the ring that can be passed to a new process.
+    """
+
+    def __init__(self, shm, slots, shape, locks, owner, readonly=False):
+        self._shm = shm
+        self._owner = owner
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.locks = locks
+
+        buf = shm.buf
+        offset = 0
+        self.latest = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8
+        self.period = np.ndarray((1,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += 8
+        self.origin = np.ndarray((2,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 16
+        self.slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8 * slots
+        self.slot_time = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += 8 * slots
+        self.slot_captured = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += 8 * slots
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buf, offset=offset)
+        if readonly:
+            self.frames.flags.writeable = False
+
+    @staticmethod
+    def _size(slots, shape):
+        return 32 + 24 * slots + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape, slots=RING_SLOTS, period=0.0, origin=(0, 0), ctx=None):
+        """Creates a ring whose locks come from the multiprocessing context `ctx` (spawn by default)."""
+        ctx = ctx or multiprocessing.get_context('spawn')
+        shm = shared_memory.SharedMemory(create=True, size=cls._size(slots, shape))
+        ring = cls(shm, slots, shape, [ctx.Lock() for _ in range(slots)], owner=True)
+        ring.latest[0] = -1
+        ring.period[0] = period
+        ring.origin[:] = origin
+        ring.slot_seq[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, spec, readonly=False):
+        name, slots, shape, locks = spec
+        return cls(shared_memory.SharedMemory(name=name), slots, shape, locks, owner=False, readonly=readonly)
+
+    @property
+    def spec(self):
+        return (self._shm.name, self.slots, self.shape, self.locks)
+
+    def read_into(self, seq, out):
+        """Copies frame `seq` into `out`; returns False if it was already overwritten."""
+        slot = seq % self.slots
+        with self.locks[slot]:
+            if self.slot_seq[slot] != seq:
+                return False
+            np.copyto(out, self.frames[slot])
+        return True
+
+    def close(self):
+        # Drop the numpy views before closing, or the buffer is still exported
+        self.latest = self.period = self.origin = self.slot_seq = self.slot_time = self.slot_captured = self.frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+class RingCapture(CaptureBackend):
+    """
+    Capture backend that hands out frames from a SharedFrameRing in place.
+
+    `grab()` blocks until a frame newer than the last one is published and
+    returns a view of its ring slot; older unread frames are skipped. The
+    slot's lock is held until the next `grab()` or `close()`, so the capture
+    process waits instead of overwriting the frame while it is being
+    processed. Raises EndOfStream once the pipeline's stop event is set.
+    `move()` asks the capture process to move the capture region.
+    """
+    name = "ring"
+
+    def __init__(self, ring, frame_ready, stop_event, timeout=0.1):
+        height, width = ring.shape[:2]
+        x1, y1 = (int(v) for v in ring.origin)
+        super().__init__((x1, y1, x1 + width, y1 + height), ring.shape[2])
+        self._ring = ring
+        self._frame_ready = frame_ready
+        self._stop_event = stop_event
+        self._timeout = timeout
+        self._held_lock = None
+        self.skipped_frames = 0
+
+    def _release(self):
+        if self._held_lock is not None:
+            self._held_lock.release()
+            self._held_lock = None
+
+    def close(self):
+        self._release()
+
+    def grab(self):
+        # The previous frame is no longer used
+        self._release()
+        while True:
+            if self._stop_event.is_set():
+                raise EndOfStream("Pipeline stopped")
+            # Clear before checking so a frame published in between is not missed
+            self._frame_ready.clear()
+            seq = int(self._ring.latest[0])
+            if seq <= self.frame_index:
+                self._frame_ready.wait(self._timeout)
+                continue
+            slot = seq % self._ring.slots
+            lock = self._ring.locks[slot]
+            if not lock.acquire(timeout=self._timeout):
+                continue
+            if self._ring.slot_seq[slot] == seq:
+                self._held_lock = lock
+                break
+            # Capture went around the ring while we waited; a newer frame is already published
+            lock.release()
+
+        if self.frame_index >= 0:
+            self.skipped_frames += seq - self.frame_index - 1
+
+        self.frame = self._ring.frames[slot]
+        self.frame_index = seq - 1
+        return self._mark_captured(float(self._ring.slot_time[slot]), float(self._ring.slot_captured[slot]))
+
+    def move(self, x1, y1):
+        super().move(x1, y1)
+        self._ring.origin[:] = (x1, y1)
+
+class RingPeriodScheduler(FrameScheduler):
+    """
+    Detector-side scheduler: picks the idle/active/burst mode as usual, but
+    instead of sleeping publishes the target period to the ring, where the
+    capture process paces itself by it. The detector itself simply waits for
+    the next frame.
+    """
+
+    def __init__(self, ring, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ring = ring
+
+    def wait(self):
+        self._ring.period[0] = self.period
+
+class _RingPacedScheduler(FrameScheduler):
+    """Capture-side scheduler whose period is whatever the detector last published."""
+
+    def __init__(self, ring):
+        super().__init__()
+        self._ring = ring
+
+    @property
+    def period(self):
+        return float(self._ring.period[0])
+
+def _capture_process_main(spec, backend_name, bbox, source, frame_ready, stop_event):
+    """Capture process: grabs frames straight into ring slots and publishes them."""
+    ring = SharedFrameRing.attach(spec)
+    pacing = _RingPacedScheduler(ring)
+    backend = None
+    failed_captures = 0
+    try:
+        backend = create_capture_backend(backend_name, bbox, source or None)
+        seq = 0
+        while not stop_event.is_set():
+            x1, y1 = int(ring.origin[0]), int(ring.origin[1])
+            if (x1, y1) != backend.bbox[:2]:
+                backend.move(x1, y1)
+
+            slot = seq % ring.slots
+            lock = ring.locks[slot]
+            # Back-pressure: wait while the detector still works on the frame in this slot
+            while not lock.acquire(timeout=SLOT_LOCK_TIMEOUT):
+                if stop_event.is_set():
+                    return
+            captured = False
+            try:
+                ring.slot_seq[slot] = -1
+                # Let the backend fill the ring slot directly instead of its own buffer
+                backend.frame = ring.frames[slot]
+                backend.grab()
+                ring.slot_time[slot] = backend.timestamp
+                ring.slot_captured[slot] = backend.captured_at
+                ring.slot_seq[slot] = seq
+                captured = True
+            except EndOfStream as e:
+                print(f"{e}, stopping.")
+                break
+            except CaptureError as e:
+                failed_captures += 1
+                if failed_captures == 1 or failed_captures % 100 == 0:
+                    print(f"Capture failed ({failed_captures} total): {e}", file=sys.stderr)
+            finally:
+                lock.release()
+
+            if captured:
+                ring.latest[0] = seq
+                frame_ready.set()
+                seq += 1
+            pacing.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        if backend is not None:
+            backend.close()
+        ring.close()
+
+def _watch_miss_hotkey(recorder, miss_event, stop_event):
+    """Detection process: forwards miss hotkey presses to the flight recorder."""
+    while not stop_event.is_set():
+        if miss_event.wait(0.1):
+            miss_event.clear()
+            recorder.trigger('miss')
+
+def _detection_process_main(config, config_file, spec, frame_ready, stop_event, result_queue, miss_event):
+    """
+    Detection process: runs the regular processing loop on ring frames, with
+    the release action and flight recorder in the same process. Detection
+    results and masks for the debug view are forwarded over `result_queue`;
+    the frame itself stays in the ring.
+    """
+    from .config import save_roi
+    from .live import (create_flight_recorder, create_instance_sink, create_releaser, create_roi_tracker,
+                       start_stats_reporting)
+    from .loop import STATS_COUNTERS, processing_loop
+    from .stats import LiveStats
+    from .view import DebugViewMailbox
+
+    ring = SharedFrameRing.attach(spec)
+    capture = RingCapture(ring, frame_ready, stop_event)
+    release_sink = create_instance_sink(config.instances[0])
+    scheduler = RingPeriodScheduler(ring, config.frame_period, config.idle_frame_period,
+                                    config.idle_delay, config.burst_distance)
+    releaser = create_releaser(config, release_sink)
+
+    # Stats are recorded, logged and served where the frames are processed
+    live_stats = LiveStats(STATS_COUNTERS)
+    stop_stats_reporting = start_stats_reporting(config, live_stats)
+    recorder = create_flight_recorder(config)
+    if recorder is not None:
+        threading.Thread(target=_watch_miss_hotkey, args=(recorder, miss_event, stop_event), daemon=True).start()
+
+    roi_tracker = create_roi_tracker(config, capture)
+    view = forwarder = None
+    if result_queue is not None:
+        # The view draws the overlay from the ring frame, so it must not be pre-drawn
+        # here, and the frame is not copied into the mailbox at all
+        if config.overlay_mode == 'eager':
+            config = dataclasses.replace(config, overlay_mode='lazy')
+        view = DebugViewMailbox(keep_frames=False)
+        poll_interval = 1.0 / config.display_fps if config.display_fps > 0 else 0.05
+        forwarder = threading.Thread(target=_forward_results, args=(view, result_queue, stop_event, poll_interval),
+                                     daemon=True)
+        forwarder.start()
+
+    try:
+        processing_loop(config, capture, release_sink, stop_event=stop_event, stage_timer=live_stats,
+                        scheduler=scheduler, releaser=releaser, recorder=recorder,
+                        roi_tracker=roi_tracker, view=view,
+                        on_roi_moved=partial(save_roi, path=config_file))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        if releaser is not None:
+            releaser.stop()
+        if forwarder is not None:
+            forwarder.join(timeout=1.0)
+        stop_stats_reporting()
+        if recorder is not None:
+            recorder.stop()
+        if roi_tracker is not None:
+            roi_tracker.close()
+        print(f"Detection skipped {capture.skipped_frames} stale frames.")
+        capture.close()
+        ring.close()
+
+def _forward_results(view, result_queue, stop_event, poll_interval):
+    """
+    Detection process: sends published detection results and masks to the
+    view, checking the mailbox every `poll_interval` seconds (the view's
+    refresh period).
+    """
+    while not stop_event.is_set():
+        slot = view.take()
+        if slot is None:
+            stop_event.wait(poll_interval)
+            continue
+        # The queue pickles in a background thread, by when the slot may be refilled
+        masks = [mask.copy() if mask is not None else None for mask in (slot.grey_mask, slot.white_mask)]
+        try:
+            result_queue.put_nowait((slot.result, *masks))
+        except queue.Full:
+            pass
+
+def _receive_results(view, ring, result_queue, bar_mask, stop_event):
+    """Main process: pairs forwarded results with their ring frame, read straight into a view slot."""
+    while not stop_event.is_set():
+        try:
+            result, grey_mask, white_mask = result_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        slot = view.acquire()
+        if slot is None or not ring.read_into(result.frame_index, slot.image_buffer(ring.shape)):
+            continue
+        slot.store(None, grey_mask, white_mask, bar_mask)
+        slot.result = result
+        view.commit()
+
+def run_pipeline(config, stop_event, config_file=CONFIG_FILE):
+    """
+    Runs the live tool as a capture process and a detection/action process
+    connected by a shared-memory frame ring. Setting `stop_event` (also done
+    by Esc) stops the pipeline; the debug view is shown in this process
+    unless OVERLAY is off. Blocks until the pipeline stops.
+    """
+    from .live import start_key_listener
+
+    bbox = config.roi
+    roi_width, roi_height = config.roi_size
+    shape = (roi_height, roi_width, 3)
+    show_view = config.overlay_mode != 'off'
+
+    # Spawn everywhere so the children behave the same on Windows, macOS and Linux
+    ctx = multiprocessing.get_context('spawn')
+    children_stop = ctx.Event()
+    frame_ready = ctx.Event()
+    result_queue = ctx.Queue(maxsize=1) if show_view else None
+    miss_event = ctx.Event()
+    listener = start_key_listener(stop_event, config.recorder_hotkey,
+                                  miss_event.set if config.recorder_enabled else None)
+
+    ring = SharedFrameRing.create(shape, period=config.idle_frame_period, origin=bbox[:2])
+    reader = None
+    processes = [
+        ctx.Process(target=_capture_process_main, name="mine-tool-capture",
+                    args=(ring.spec, config.capture_backend, bbox, config.capture_source, frame_ready,
+                          children_stop)),
+        ctx.Process(target=_detection_process_main, name="mine-tool-detect",
+                    args=(config, config_file, ring.spec, frame_ready, children_stop, result_queue, miss_event)),
+    ]
+    try:
+        for process in processes:
+            process.daemon = True
+            process.start()
+        print(f"Pipeline started: capture pid {processes[0].pid}, detection pid {processes[1].pid}.")
+
+        # Stop the children on Esc or when the view closes, and the view when a child stops
+        def watch():
+            while not stop_event.is_set() and not children_stop.is_set():
+                time.sleep(0.05)
+            stop_event.set()
+            children_stop.set()
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+
+        if show_view:
+            from .geometry import get_arc_geometry
+            from .view import DebugViewMailbox, run_debug_view
+
+            reader = SharedFrameRing.attach(ring.spec, readonly=True)
+            bar_mask = get_arc_geometry(roi_width, roi_height, config.bar_thickness_percentage,
+                                        config.arc_geometry_cache).mask
+            view = DebugViewMailbox()
+            threading.Thread(target=_receive_results, args=(view, reader, result_queue, bar_mask, children_stop),
+                             daemon=True).start()
+            run_debug_view(view, roi_width, roi_height, config.display_fps, stop_event)
+        else:
+            watcher.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        children_stop.set()
+        listener.stop()
+        for process in processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        if reader is not None:
+            # Give the receiver thread a moment to notice the stop event
+            time.sleep(0.15)
+            reader.close()
+        ring.close()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Polar-unwrapped detection engine.
+
+The quarter-ring bar is unwrapped once into a rectangular strip whose columns
+are angles and whose rows are radii. Each frame is then resampled into that
+strip with a single `cv2.remap`, and the grey line and white zone are located
+as runs of angle bins in the strip's column profile. This yields angles and
+radii directly, without a contour or connected-component search.
+"""
+import math
+
+import cv2
+import numpy as np
+
+class PolarUnwrap:
+    """
+    Precomputed remap table from ROI pixels to an (angle x radius) strip.
+
+    Columns run from -90 degrees (top of the bar) to 0 degrees (right end),
+    in the arctan2 convention used by the contour engine; rows run from the
+    inner to the outer radius. One radius bin spans one pixel, and
+    `ANGLE_BINS_PER_PIXEL` angle bins span one pixel of arc at the outer
+    radius: with one bin per pixel, nearest-neighbour sampling skips about a
+    tenth of the band's pixels, enough to split the sparse matches of a
+    blurred white area that the contour engine still joins.
+
+    Attributes:
+        angles: Center angle (radians) of each column.
+        radii: Center radius of each row.
+        strip: Reused (rows, columns, 3) buffer the frame is unwrapped into.
+    """
+
+    ANGLE_BINS_PER_PIXEL = 2
+
+    def __init__(self, geometry):
+        self.center = geometry.center
+        inner_radius = geometry.inner_radius
+        outer_radius = geometry.outer_radius
+
+        angle_bins = max(1, math.ceil(outer_radius * math.pi / 2 * self.ANGLE_BINS_PER_PIXEL))
+        radius_bins = max(1, outer_radius - inner_radius)
+
+        angle_step = (math.pi / 2) / angle_bins
+        self.angle_step = angle_step
+        self.angles = (-math.pi / 2 + (np.arange(angle_bins) + 0.5) * angle_step).astype(np.float32)
+        self.radii = (inner_radius + np.arange(radius_bins) + 0.5).astype(np.float32)
+
+        map_x = self.center[0] + self.radii[:, None] * np.cos(self.angles)[None, :]
+        map_y = self.center[1] + self.radii[:, None] * np.sin(self.angles)[None, :]
+        # Fixed-point maps make cv2.remap noticeably faster than float maps
+        self._map1, self._map2 = cv2.convertMaps(map_x.astype(np.float32), map_y.astype(np.float32),
+                                                 cv2.CV_16SC2)
+        self.strip = np.empty((radius_bins, angle_bins, 3), dtype=np.uint8)
+
+    def unwrap(self, image_bgr, columns=None):
+        """
+        Resamples the bar band of `image_bgr` into `self.strip` and returns it,
+        or only the angle bins in the slice `columns` (a view of the strip).
+        """
+        if columns is None:
+            columns = slice(None)
+        return cv2.remap(image_bgr, self._map1[:, columns], self._map2[:, columns], cv2.INTER_NEAREST,
+                         dst=self.strip[:, columns], borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+    def column_of(self, angle):
+        """The angle bin (column) containing `angle`, clipped to the strip."""
+        column = int((angle + math.pi / 2) / self.angle_step)
+        return min(max(column, 0), len(self.angles) - 1)
+
+    def to_point(self, angle, radius):
+        """Converts a polar position back to integer ROI pixel coordinates."""
+        return (int(self.center[0] + radius * math.cos(angle)),
+                int(self.center[1] + radius * math.sin(angle)))
+
+    def find_run(self, strip_mask, min_area=50, gap=0, start=0):
+        """
+        Locates the largest run of matches in a strip mask, whose first
+        column is angle bin `start` (for masks of part of the strip).
+
+        Both targets cross the bar radially, so the mask is reduced to its
+        number of matches per angle bin and searched in 1-D: bins with
+        matches up to `gap` pixels apart form a run, as the contour engine's
+        `gap` pixel wide dilation joins them. Each run is measured as the
+        contour engine measures an area, from the outline through the centers
+        of its edge pixels, here its angular width times its radial extent,
+        both grown by the dilation. Returns (angle, radius, area, span) for
+        the largest run, where angle and radius are the mean of its matches
+        and span is its (first, last) angle, or None if it is smaller than
+        `min_area`.
+        """
+        bins_per_pixel = self.ANGLE_BINS_PER_PIXEL
+        # 255 times the number of matches in each angle bin
+        profile = cv2.reduce(strip_mask, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S)[0]
+        columns = np.flatnonzero(profile).tolist()
+        if not columns:
+            return None
+        join, grow = (gap * bins_per_pixel, gap - 1) if gap > 1 else (1, 0)
+        # Runs are short lists of (first, last) bins, so plain Python beats more numpy calls here
+        runs = []
+        first = previous = columns[0]
+        for column in columns[1:]:
+            if column - previous > join:
+                runs.append((first, previous))
+                first = column
+            previous = column
+        runs.append((first, previous))
+        runs.sort(key=lambda run: run[0] - run[1])
+
+        # Widest runs first, until even a run spanning every radius could not be larger
+        most_rows = strip_mask.shape[0] + grow - 1
+        best_area, best = min_area, None
+        for first, last in runs:
+            width = (last - first + join) / bins_per_pixel - 1
+            if width * most_rows < best_area:
+                break
+            row_profile = cv2.reduce(strip_mask[:, first:last + 1], 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S)[:, 0]
+            rows = np.flatnonzero(row_profile)
+            area = width * (rows[-1] - rows[0] + grow)
+            if area >= best_area:
+                best_area, best = area, (first, last, row_profile)
+        if best is None:
+            return None
+
+        first, last, row_profile = best
+        run = profile[first:last + 1]
+        weight = float(row_profile.sum())
+        column = first + np.dot(np.arange(len(run)), run) / weight
+        row = np.dot(np.arange(len(row_profile)), row_profile) / weight
+        angle = float(-math.pi / 2 + (start + column + 0.5) * self.angle_step)
+        radius = float(self.radii[0] + row)
+        span = (float(self.angles[start + first]), float(self.angles[start + last]))
+        return angle, radius, int(best_area), span
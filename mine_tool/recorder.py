@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Flight recorder for diagnosing missed releases.
+
+Keeps the last N ROI frames together with their detection results and
+capture timestamps in a preallocated ring. When a release fires (or the miss
+hotkey is pressed) the recorder waits a few more frames so the outcome is
+included, then hands the whole ring to a background thread that writes it to
+an .npz file, and keeps recording into a second, preallocated ring. The
+processing loop itself never copies the window, allocates or touches the
+disk for it.
+
+A dump can be replayed directly: `python replay.py flight_records/<file>.npz`.
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Per-frame detection values stored alongside each frame (NaN when not detected)
+RESULT_FIELDS = ("angle_grey", "angle_white", "radius", "arc_velocity", "trigger_distance")
+# Ring buffers swapped with the writer's on each dump; all but 'results' are indexed by slot first
+RING_BUFFERS = ('frames', 'frame_index', 'timestamp', 'captured_at', 'released', 'results')
+
+def _unroll(buffer, start, count):
+    """The `count` ring entries from slot `start` on, oldest first (a view unless they wrap)."""
+    end = start + count
+    if end <= len(buffer):
+        return buffer[start:end]
+    return np.concatenate((buffer[start:], buffer[:end - len(buffer)]))
+
+class FlightRecorder:
+    """
+    Ring buffer of the last `size` frames of shape `shape`.
+
+    Call `record()` once per frame after the release decision, and
+    `trigger(reason)` to request a dump; the dump is taken `post_frames`
+    frames later and contains the `size` most recent frames, oldest first.
+    `trigger()` may be called from any thread.
+
+    Taking a dump swaps the ring with a spare one of the same size instead
+    of copying it, and the ring starts over empty: a dump taken within
+    `size` frames of the previous one only holds the frames since then.
+    """
+
+    def __init__(self, shape, size=120, post_frames=30, directory="flight_records"):
+        if size < 1:
+            raise ValueError(f"Flight recorder size must be at least 1, got {size}")
+        self.size = size
+        self.post_frames = min(post_frames, size - 1)
+        self.directory = directory
+
+        self.frames = np.zeros((size,) + tuple(shape), dtype=np.uint8)
+        self.frame_index = np.full(size, -1, dtype=np.int64)
+        self.timestamp = np.full(size, np.nan)
+        self.captured_at = np.full(size, np.nan)
+        self.released = np.zeros(size, dtype=bool)
+        self.results = np.full((len(RESULT_FIELDS), size), np.nan)
+        self._head = 0
+        self._filled = 0
+
+        # Second ring the writer thread saves from while recording goes on in the first
+        self._snapshot = {name: np.empty_like(getattr(self, name)) for name in RING_BUFFERS}
+        self._snapshot_meta = None
+
+        self._pending_reason = None
+        self._countdown = 0
+        self._writer_idle = threading.Event()
+        self._writer_idle.set()
+        self._work = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self.dumps = 0
+        self.skipped_dumps = 0
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="flight-recorder", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Waits for a dump in progress and stops the writer thread."""
+        self._stopping = True
+        self._work.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+            self._thread = None
+
+    def trigger(self, reason):
+        """Requests a dump `post_frames` frames from now. Ignored if one is already pending."""
+        if self._pending_reason is None:
+            self._countdown = self.post_frames
+            self._pending_reason = reason
+
+    def record(self, frame, frame_index, timestamp, captured_at, released=False,
+               angle_grey=None, angle_white=None, radius=None, arc_velocity=0.0,
+               trigger_distance=float('inf')):
+        """Copies `frame` and its detection results into the ring."""
+        slot = self._head
+        np.copyto(self.frames[slot], frame)
+        self.frame_index[slot] = frame_index
+        self.timestamp[slot] = timestamp
+        self.captured_at[slot] = captured_at
+        self.released[slot] = released
+        results = self.results
+        results[0, slot] = np.nan if angle_grey is None else angle_grey
+        results[1, slot] = np.nan if angle_white is None else angle_white
+        results[2, slot] = np.nan if radius is None else radius
+        results[3, slot] = arc_velocity
+        results[4, slot] = trigger_distance
+        self._head = (slot + 1) % self.size
+        if self._filled < self.size:
+            self._filled += 1
+
+        if self._pending_reason is not None:
+            if self._countdown > 0:
+                self._countdown -= 1
+            else:
+                self._take_snapshot(self._pending_reason, frame_index)
+                self._pending_reason = None
+
+    def _take_snapshot(self, reason, frame_index):
+        if not self._writer_idle.is_set():
+            self.skipped_dumps += 1
+            print(f"Flight recorder still writing, skipped the '{reason}' dump at frame {frame_index}.",
+                  file=sys.stderr)
+            return
+
+        # Hand the ring to the writer as it is and record into the spare one
+        snapshot = self._snapshot
+        for name in RING_BUFFERS:
+            ring = getattr(self, name)
+            setattr(self, name, snapshot[name])
+            snapshot[name] = ring
+        count = self._filled
+        start = (self._head - count) % self.size
+        self._head = self._filled = 0
+
+        self._snapshot_meta = (reason, frame_index, start, count)
+        self._writer_idle.clear()
+        self._work.set()
+
+    def _run(self):
+        while True:
+            self._work.wait()
+            self._work.clear()
+            if self._snapshot_meta is not None:
+                self._write(*self._snapshot_meta)
+                self._snapshot_meta = None
+                self._writer_idle.set()
+            if self._stopping:
+                return
+
+    def _write(self, reason, frame_index, start, count):
+        snapshot = self._snapshot
+        path = os.path.join(self.directory,
+                            f"flight_{time.strftime('%Y%m%d_%H%M%S')}_{frame_index}_{reason}.npz")
+        arrays = {name: _unroll(snapshot[name], start, count) for name in RING_BUFFERS[:-1]}
+        for row, name in enumerate(RESULT_FIELDS):
+            arrays[name] = _unroll(snapshot['results'][row], start, count)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            np.savez_compressed(path, reason=np.array(reason), trigger_frame=np.array(frame_index), **arrays)
+        except OSError as e:
+            print(f"Could not write flight record '{path}': {e}", file=sys.stderr)
+            return
+        self.dumps += 1
+        print(f"Flight record saved to '{path}' ({count} frames).")
+
+def load_flight_record(path):
+    """Loads a flight record .npz into a dict of arrays."""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
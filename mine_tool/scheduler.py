@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Deadline-based frame scheduler for the processing loop.
+
+Instead of sleeping a fixed amount after every frame, the scheduler keeps a
+running deadline on `time.perf_counter()` and only sleeps for whatever is left
+of the target frame period once the frame's work is done. The period itself
+adapts to what is on screen:
+
+* idle:   nothing detected for a while, poll at a low rate to save CPU;
+* active: the minigame is visible, run at the configured frame period;
+* burst:  the grey line is approaching the white zone, run as fast as possible.
+"""
+import time
+
+class FrameScheduler:
+    IDLE = 'idle'
+    ACTIVE = 'active'
+    BURST = 'burst'
+
+    # Below this much remaining time, spin instead of sleeping to hit the deadline precisely
+    SPIN_THRESHOLD = 0.001
+
+    def __init__(self, frame_period=0.01, idle_frame_period=0.05, idle_delay=0.5, burst_distance=60.0):
+        """
+        Args:
+            frame_period: Target seconds per frame while the minigame is visible.
+            idle_frame_period: Target seconds per frame while nothing is detected.
+            idle_delay: Seconds without any detection before switching to idle.
+            burst_distance: Arc distance (pixels) below which an approaching grey
+                line switches to burst mode (no waiting between frames).
+        """
+        self.frame_period = max(0.0, frame_period)
+        self.idle_frame_period = max(self.frame_period, idle_frame_period)
+        self.idle_delay = idle_delay
+        self.burst_distance = burst_distance
+
+        self.mode = self.IDLE
+        self._last_detection = None
+        self._deadline = None
+
+    @property
+    def period(self):
+        """Target frame period for the current mode."""
+        if self.mode == self.BURST:
+            return 0.0
+        if self.mode == self.IDLE:
+            return self.idle_frame_period
+        return self.frame_period
+
+    def update(self, grey_visible, white_visible, arc_distance=None, arc_velocity=0.0):
+        """
+        Picks the mode for the next frame from the current detection results.
+        `arc_distance` and `arc_velocity` are only used when both the grey line
+        and the white area are visible.
+        """
+        now = time.perf_counter()
+        if grey_visible or white_visible:
+            self._last_detection = now
+
+        if grey_visible and white_visible and arc_distance is not None \
+                and arc_distance < self.burst_distance and arc_velocity <= 0:
+            self.mode = self.BURST
+        elif self._last_detection is not None and now - self._last_detection < self.idle_delay:
+            self.mode = self.ACTIVE
+        else:
+            self.mode = self.IDLE
+        return self.mode
+
+    def wait(self):
+        """
+        Waits until the next frame deadline. Time spent on the frame's work is
+        subtracted from the period; if the frame overran its deadline the
+        schedule restarts from now instead of trying to catch up.
+        """
+        now = time.perf_counter()
+        if self._deadline is None:
+            self._deadline = now
+
+        self._deadline += self.period
+        if self._deadline <= now:
+            self._deadline = now
+            return
+
+        while True:
+            remaining = self._deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            if remaining > self.SPIN_THRESHOLD:
+                time.sleep(remaining - self.SPIN_THRESHOLD)
+            else:
+                # Yield to other threads while spinning out the last fraction
+                time.sleep(0)
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic mining minigame with ground truth, for benchmarks without the game.
+
+`MinigameSimulator` renders the curved bar, the white area and the moving
+grey line in the geometry the detector expects (see geometry.py), round
+after round, and knows the exact time the line crosses the center of the
+white area. `SimulatedCapture` serves its frames as a capture backend
+('sim'), and `SimulatedMouse` is a release sink that ends the round the way
+letting go of the mouse button does in the game. `run_simulation` plays a
+number of rounds through the processing loop and scores the releases.
+
+Time runs either as stream time (`realtime=False`: frame i shows the game
+at i / fps, however long processing takes, so only the prediction is
+scored) or on the wall clock (`realtime=True`: each grab shows the game as
+it is at that moment, so capture and processing latency count as well).
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from .actions import ScheduledReleaser, StreamTimeReleaser
+from .capture import CaptureBackend, EndOfStream
+from .geometry import get_arc_geometry
+
+@dataclass
+class SimulatedRound:
+    """
+    One minigame: the white area and how the grey line moves, with the
+    ground truth and outcome. Angles are in radians (arctan2 convention) and
+    times in simulator seconds.
+    """
+    zone_center: float
+    zone_width: float
+    direction: int
+    start_time: Optional[float] = None
+    crossing_time: Optional[float] = None
+    end_time: Optional[float] = None
+    released_at: Optional[float] = None
+    release_angle: Optional[float] = None
+
+    @property
+    def hit(self):
+        """True if the line was inside the white area when the mouse was released."""
+        return self.release_angle is not None and abs(self.release_angle - self.zone_center) <= self.zone_width / 2
+
+    @property
+    def timing_error(self):
+        """Release time minus the ground-truth crossing time (negative: early), or None if not released."""
+        if self.released_at is None:
+            return None
+        return self.released_at - self.crossing_time
+
+class MinigameSimulator:
+    """
+    Renders the minigame for an ROI of `roi_width` x `roi_height`.
+
+    Each round shows the bar with a white area of `zone_width` degrees at a
+    random position; the grey line starts at one end of the bar (alternating
+    ends) and sweeps towards the other at `speed` degrees per second, changing
+    by `acceleration` degrees per second squared. A round ends when the mouse
+    is released or the line reaches the far end (a miss); the screen then
+    shows no minigame for `gap` seconds before the next round starts.
+    `noise` adds Gaussian pixel noise with that standard deviation.
+    """
+
+    BACKGROUND_BGR = (47, 74, 58)
+    # Smallest travel, in degrees, before the line reaches the white area's center
+    MIN_LEAD = 15.0
+
+    def __init__(self, roi_width, roi_height, grey_bgr, white_bgr, bar_bgr, thickness_percentage=0.15,
+                 speed=120.0, acceleration=0.0, zone_width=12.0, noise=0.0, rounds=10, gap=0.6,
+                 line_width=3.0, seed=0):
+        if speed <= 0:
+            raise ValueError(f"speed must be positive, got {speed}")
+        if acceleration < 0 and speed ** 2 + 2 * acceleration * 90.0 <= 0:
+            raise ValueError(f"The line stops before the end of the bar at speed {speed} "
+                             f"and acceleration {acceleration}")
+        self.roi_width = int(roi_width)
+        self.roi_height = int(roi_height)
+        self.grey_bgr = grey_bgr
+        self.white_bgr = white_bgr
+        self.speed = math.radians(speed)
+        self.acceleration = math.radians(acceleration)
+        self.noise = noise
+        self.gap = gap
+        self.line_width = line_width
+
+        self.geometry = get_arc_geometry(roi_width, roi_height, thickness_percentage)
+        self._base = np.empty((self.roi_height, self.roi_width, 3), dtype=np.uint8)
+        self._base[:] = self.BACKGROUND_BGR
+        self._base[self.geometry.mask > 0] = bar_bgr
+        self._noise = np.empty((self.roi_height, self.roi_width, 3), dtype=np.int16) if noise > 0 else None
+
+        rng = np.random.default_rng(seed)
+        lead = max(self.MIN_LEAD, zone_width / 2)
+        self.rounds = [SimulatedRound(zone_center=math.radians(rng.uniform(-90.0 + lead, -lead)),
+                                      zone_width=math.radians(zone_width), direction=1 if i % 2 == 0 else -1)
+                       for i in range(rounds)]
+        self._current = 0
+        self._lock = threading.Lock()
+        if self.rounds:
+            self._start_round(self.rounds[0], gap)
+
+    @classmethod
+    def from_config(cls, config, roi_width=None, roi_height=None, **kwargs):
+        """Builds a simulator with the colors and bar thickness of a Config, for its ROI size by default."""
+        if roi_width is None or roi_height is None:
+            roi_width, roi_height = config.roi_size
+        return cls(roi_width, roi_height, config.grey_bgr, config.white_bgr, config.bar_bgr,
+                   config.bar_thickness_percentage, **kwargs)
+
+    def _travel_time(self, distance):
+        """Seconds the line takes to travel `distance` radians from its start."""
+        if self.acceleration == 0:
+            return distance / self.speed
+        return (math.sqrt(self.speed ** 2 + 2 * self.acceleration * distance) - self.speed) / self.acceleration
+
+    def _start_round(self, game_round, start_time):
+        game_round.start_time = start_time
+        start_angle = -math.pi / 2 if game_round.direction > 0 else 0.0
+        game_round.crossing_time = start_time + self._travel_time(abs(game_round.zone_center - start_angle))
+        game_round.end_time = start_time + self._travel_time(math.pi / 2)
+
+    def line_angle(self, game_round, t):
+        """Angle of the grey line in `game_round` at time `t`."""
+        elapsed = t - game_round.start_time
+        travelled = self.speed * elapsed + 0.5 * self.acceleration * elapsed ** 2
+        start_angle = -math.pi / 2 if game_round.direction > 0 else 0.0
+        return start_angle + game_round.direction * travelled
+
+    def _advance(self, t):
+        """Ends rounds whose line reached the far end by `t`; returns the current round or None."""
+        while self._current < len(self.rounds):
+            game_round = self.rounds[self._current]
+            if t < game_round.end_time:
+                return game_round
+            self._current += 1
+            if self._current < len(self.rounds):
+                self._start_round(self.rounds[self._current], game_round.end_time + self.gap)
+        return None
+
+    def finished(self, t):
+        """True once every round has ended and its gap has passed."""
+        with self._lock:
+            return self._advance(t) is None and t >= self.rounds[-1].end_time + self.gap if self.rounds else True
+
+    def render(self, t, out):
+        """Draws the screen at time `t` into `out`, an (H, W, 3) uint8 array."""
+        with self._lock:
+            game_round = self._advance(t)
+            np.copyto(out, self._base)
+            if game_round is None or t < game_round.start_time:
+                # Between rounds the minigame is closed
+                out[:] = self.BACKGROUND_BGR
+            else:
+                geometry = self.geometry
+                flat = out.reshape(-1, 3)
+                in_zone = np.abs(geometry.angles - game_round.zone_center) <= game_round.zone_width / 2
+                flat[geometry.pixel_index[in_zone]] = self.white_bgr
+                offset = np.abs(geometry.angles - self.line_angle(game_round, t)) * geometry.radii
+                flat[geometry.pixel_index[offset <= self.line_width / 2]] = self.grey_bgr
+        if self._noise is not None:
+            cv2.randn(self._noise, 0, self.noise)
+            cv2.add(out, self._noise, dst=out, dtype=cv2.CV_8U)
+        return out
+
+    def release(self, t):
+        """The mouse was released at time `t`: ends the current round, if one is on screen."""
+        with self._lock:
+            game_round = self._advance(t)
+            if game_round is None or t < game_round.start_time:
+                return
+            game_round.released_at = t
+            game_round.release_angle = self.line_angle(game_round, t)
+            game_round.end_time = t
+            self._current += 1
+            if self._current < len(self.rounds):
+                self._start_round(self.rounds[self._current], t + self.gap)
+
+    def score(self):
+        """
+        Returns the number of rounds, hits and misses (rounds without a
+        release), and the signed timing error of the releases in milliseconds
+        (mean, mean absolute, p95 absolute and max absolute).
+        """
+        errors = np.array([r.timing_error for r in self.rounds if r.released_at is not None]) * 1000.0
+        result = {
+            'rounds': len(self.rounds),
+            'hits': sum(r.hit for r in self.rounds),
+            'misses': sum(r.released_at is None for r in self.rounds),
+            'timing_error_ms': None,
+        }
+        if len(errors):
+            abs_errors = np.abs(errors)
+            result['timing_error_ms'] = {
+                'mean': float(errors.mean()),
+                'mean_abs': float(abs_errors.mean()),
+                'p95_abs': float(np.percentile(abs_errors, 95)),
+                'max_abs': float(abs_errors.max()),
+            }
+        return result
+
+class SimulatedCapture(CaptureBackend):
+    """
+    Capture backend that renders a MinigameSimulator instead of grabbing the
+    screen. Raises EndOfStream once the simulator's rounds are over.
+
+    With `realtime=False`, frame i shows the game at i / `fps` seconds and
+    `timestamp` is that stream time. With `realtime=True`, each grab shows the
+    game at the wall-clock time since `open()`, on the simulated display's
+    `fps` refresh grid, and `timestamp` is `time.perf_counter()` as for the
+    screen backends. Without a simulator, one with the default colors and
+    settings is created for the bbox size.
+    """
+    name = "sim"
+
+    def __init__(self, bbox, channels=3, simulator=None, realtime=True, fps=60.0):
+        super().__init__(bbox, channels)
+        if simulator is None:
+            from .config import Config
+            simulator = MinigameSimulator.from_config(Config(), self.width, self.height)
+        self.simulator = simulator
+        self.realtime = realtime
+        self.fps = fps
+        # BGRA frames are rendered in BGR first; BGR frames straight into `self.frame`
+        self._render = np.empty((self.height, self.width, 3), dtype=np.uint8) if channels == 4 else None
+        self._start_time = None
+        self._captured = {}
+
+    def open(self):
+        if self._start_time is None:
+            self._start_time = time.perf_counter()
+
+    def elapsed(self):
+        """Simulator time of the wall clock now (real-time mode)."""
+        return time.perf_counter() - self._start_time
+
+    def captured_at_of(self, frame_index):
+        """`captured_at` of a recent frame, or None if it is too old."""
+        return self._captured.get(frame_index)
+
+    def grab(self):
+        if self._start_time is None:
+            self.open()
+        if self.realtime:
+            now = time.perf_counter()
+            # The game only redraws at its own frame rate
+            t = math.floor((now - self._start_time) * self.fps) / self.fps
+        else:
+            t = (self.frame_index + 1) / self.fps
+        if self.simulator.finished(t):
+            raise EndOfStream(f"Simulation ended after {self.frame_index + 1} frames")
+
+        if self._render is None:
+            # Looked up on every grab: the pipeline points `frame` at a different ring slot each time
+            self.simulator.render(t, self.frame)
+        else:
+            self.simulator.render(t, self._render)
+            self._store(self._render, None, cv2.COLOR_BGR2BGRA)
+        if self.realtime:
+            self._mark_captured(now, time.perf_counter())
+        else:
+            self._mark_captured(t, time.perf_counter())
+        self._captured[self.frame_index] = self.captured_at
+        self._captured.pop(self.frame_index - 256, None)
+        return self.frame
+
+class SimulatedMouse:
+    """
+    Release sink standing in for the mouse: ends the simulator's round at the
+    release time and records each release with its capture-to-release
+    latency, measured from the capture of the frame the release was decided
+    on (including any scheduled wait for the predicted crossing).
+    """
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.releases = []
+
+    def release(self, frame_index, timestamp):
+        now = time.perf_counter()
+        capture = self.capture
+        # In real time the release lands when it is sent, not at its predicted timestamp
+        t = capture.elapsed() if capture.realtime else timestamp
+        capture.simulator.release(t)
+        captured_at = capture.captured_at_of(frame_index)
+        self.releases.append({'frame_index': frame_index, 'timestamp': timestamp, 'sim_time': t,
+                              'latency': now - captured_at if captured_at is not None else None})
+
+def run_simulation(config, speed, rounds=20, fps=60.0, realtime=False, stage_timer=None, **kwargs):
+    """
+    Plays `rounds` simulated rounds at `speed` degrees per second through the
+    processing loop with `config` and returns the simulator's score, plus the
+    capture-to-release latency in milliseconds (real time only: in stream
+    time, processing does not take simulated time) and the processed frames.
+    Further keyword arguments go to MinigameSimulator. Real-time runs are
+    paced by a FrameScheduler configured as in the live tool.
+    """
+    from dataclasses import replace
+
+    from .loop import processing_loop
+    from .scheduler import FrameScheduler
+
+    config = replace(config, overlay_mode='off')
+    simulator = MinigameSimulator.from_config(config, speed=speed, rounds=rounds, **kwargs)
+    capture = SimulatedCapture(config.roi, simulator=simulator, realtime=realtime, fps=fps)
+    capture.open()
+    mouse = SimulatedMouse(capture)
+
+    scheduler = None
+    if realtime:
+        scheduler = FrameScheduler(config.frame_period, config.idle_frame_period, config.idle_delay,
+                                   config.burst_distance)
+    releaser = None
+    if config.release_mode == 'scheduled' and config.prediction_enabled:
+        releaser = ScheduledReleaser(mouse) if realtime else StreamTimeReleaser(mouse)
+        releaser.start()
+    try:
+        processing_loop(config, capture, mouse, stage_timer=stage_timer, releaser=releaser, scheduler=scheduler)
+    finally:
+        if releaser is not None:
+            releaser.stop()
+        capture.close()
+
+    result = simulator.score()
+    result['speed'] = speed
+    result['frames'] = capture.frame_index + 1
+    result['duration_s'] = capture.elapsed() if realtime else capture.timestamp
+    result['latency_ms'] = None
+    latencies = [r['latency'] * 1000.0 for r in mouse.releases if r['latency'] is not None]
+    if realtime and latencies:
+        result['latency_ms'] = {
+            'mean': float(np.mean(latencies)),
+            'p95': float(np.percentile(latencies, 95)),
+            'max': float(np.max(latencies)),
+        }
+    return result
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Timing helpers for measuring where each frame of the processing loop goes.
+
+`StageTimer` keeps every sample and is meant for bounded runs such as replays.
+`LiveStats` keeps fixed-size histograms so it can run for the whole session;
+`StatsLogger` and `serve_stats` publish its snapshots as a periodic log and a
+local HTTP endpoint.
+"""
+import csv
+import json
+import math
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+class NullStageTimer:
+    """Stage timer that records nothing; used when no timing is requested."""
+
+    def start(self):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def end(self):
+        pass
+
+    def count(self, counter, n=1):
+        pass
+
+    def stats_line(self):
+        return None
+
+class StageTimer:
+    """
+    Records how long each stage of every frame takes.
+
+    The processing loop calls `start()` at the beginning of a frame, `mark(stage)`
+    after each stage and `end()` once the frame is complete. Durations are kept
+    in seconds. Each thread has its own start/mark timeline, so the workers of
+    `loop.multi_roi_loop` can record their stages concurrently.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.frame_times = []
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+        self._timeline = threading.local()
+
+    def start(self):
+        self._timeline.frame_start = self._timeline.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.samples[stage].append(now - self._timeline.last)
+        self._timeline.last = now
+
+    def end(self):
+        self.frame_times.append(time.perf_counter() - self._timeline.frame_start)
+
+    def count(self, counter, n=1):
+        """Adds `n` to the event counter `counter` (e.g. 'dropped_frames')."""
+        with self._lock:
+            self.counters[counter] += n
+
+    def stats_line(self):
+        return None
+
+    def summary(self):
+        """
+        Returns {stage: {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}},
+        including a 'total' entry for whole frames.
+        """
+        stages = dict(self.samples)
+        stages['total'] = self.frame_times
+        result = {}
+        for stage, durations in stages.items():
+            if not durations:
+                continue
+            values = np.asarray(durations) * 1000.0
+            result[stage] = {
+                'count': len(values),
+                'mean_ms': float(values.mean()),
+                'p50_ms': float(np.percentile(values, 50)),
+                'p95_ms': float(np.percentile(values, 95)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'max_ms': float(values.max()),
+            }
+        return result
+
+class LatencyHistogram:
+    """
+    Fixed-size histogram of durations with logarithmically spaced bins.
+
+    Covers 1 µs to 10 s with about 4% relative resolution, so percentiles stay
+    accurate to a few percent while memory and update cost stay constant
+    however long the session runs.
+    """
+
+    MIN_SECONDS = 1e-6
+    MAX_SECONDS = 10.0
+    BINS_PER_DECADE = 60
+
+    def __init__(self):
+        decades = np.log10(self.MAX_SECONDS / self.MIN_SECONDS)
+        self._scale = self.BINS_PER_DECADE / math.log(10)
+        self._edges = self.MIN_SECONDS * np.power(10.0, np.arange(int(decades * self.BINS_PER_DECADE) + 1)
+                                                  / self.BINS_PER_DECADE)
+        self.counts = np.zeros(len(self._edges), dtype=np.int64)
+        self.total = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= self.MIN_SECONDS:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / self.MIN_SECONDS) * self._scale), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.total += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentiles(self, qs):
+        """Returns the upper bin edge (seconds) at each percentile in `qs`."""
+        if self.total == 0:
+            return [0.0 for _ in qs]
+        cumulative = np.cumsum(self.counts)
+        result = []
+        for q in qs:
+            index = int(np.searchsorted(cumulative, self.total * q / 100.0))
+            # The top bin is open-ended, so never report more than the largest sample
+            edge = self._edges[min(index + 1, len(self._edges) - 1)]
+            result.append(float(min(edge, self.max)))
+        return result
+
+class LiveStats:
+    """
+    Long-running counterpart of StageTimer for the live tool.
+
+    Same start()/mark(stage)/end()/count(counter) interface, but stage
+    durations go into LatencyHistograms and `snapshot()` can be taken from
+    any thread while the processing loop keeps recording. `counters` names
+    counters to report as 0 until they first occur.
+    """
+
+    def __init__(self, counters=()):
+        self.histograms = defaultdict(LatencyHistogram)
+        self.counters = defaultdict(int, {name: 0 for name in counters})
+        self.frames = 0
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        # Per-thread start/mark timeline, as in StageTimer
+        self._timeline = threading.local()
+
+    def start(self):
+        self._timeline.frame_start = self._timeline.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        with self._lock:
+            self.histograms[stage].add(now - self._timeline.last)
+        self._timeline.last = now
+
+    def end(self):
+        now = time.perf_counter()
+        with self._lock:
+            self.histograms['total'].add(now - self._timeline.frame_start)
+            self.frames += 1
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] += n
+
+    def snapshot(self):
+        """
+        Returns a JSON-serializable dict with the uptime, frame count, average
+        FPS, the p50/p95/p99/max of each stage in milliseconds, and the counters.
+        """
+        with self._lock:
+            uptime = time.perf_counter() - self.started_at
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                p50, p95, p99 = histogram.percentiles((50, 95, 99))
+                stages[stage] = {
+                    'count': histogram.total,
+                    'p50_ms': p50 * 1000.0,
+                    'p95_ms': p95 * 1000.0,
+                    'p99_ms': p99 * 1000.0,
+                    'max_ms': histogram.max * 1000.0,
+                }
+            return {
+                'time': time.time(),
+                'uptime_s': uptime,
+                'frames': self.frames,
+                'fps': self.frames / uptime if uptime > 0 else 0.0,
+                'stages': stages,
+                'counters': dict(self.counters),
+            }
+
+    def stats_line(self):
+        """One-line summary for the overlay: p95 of each stage plus the counters."""
+        snapshot = self.snapshot()
+        stages = " ".join(f"{stage} {row['p95_ms']:.1f}" for stage, row in snapshot['stages'].items())
+        counters = " ".join(f"{name} {value}" for name, value in sorted(snapshot['counters'].items()))
+        return f"{snapshot['fps']:.0f} FPS | p95 ms: {stages} | {counters}".rstrip(" |")
+
+def _flatten_snapshot(snapshot):
+    """Flattens a LiveStats snapshot into a single CSV row."""
+    row = {'time': snapshot['time'], 'uptime_s': snapshot['uptime_s'],
+           'frames': snapshot['frames'], 'fps': snapshot['fps']}
+    for stage, values in snapshot['stages'].items():
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'):
+            row[f"{stage}_{key}"] = values[key]
+    row.update(snapshot['counters'])
+    return row
+
+class StatsLogger:
+    """
+    Appends a LiveStats snapshot to `path` every `interval` seconds from a
+    background thread, as JSON lines ('jsonl') or CSV rows ('csv'). The CSV
+    columns are fixed by the first snapshot written.
+    """
+
+    FORMATS = ("jsonl", "csv")
+
+    def __init__(self, stats, path, interval=5.0, fmt="jsonl"):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown stats log format '{fmt}'. Choose one of: {', '.join(self.FORMATS)}")
+        self.stats = stats
+        self.path = path
+        self.interval = interval
+        self.fmt = fmt
+        self._stop = threading.Event()
+        self._thread = None
+        self._csv_fields = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stats-logger", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        # Always record the final state
+        self.write()
+
+    def write(self):
+        snapshot = self.stats.snapshot()
+        try:
+            with open(self.path, 'a', newline='') as f:
+                if self.fmt == 'jsonl':
+                    f.write(json.dumps(snapshot) + "\n")
+                else:
+                    row = _flatten_snapshot(snapshot)
+                    if self._csv_fields is None:
+                        self._csv_fields = list(row)
+                        write_header = f.tell() == 0
+                    else:
+                        write_header = False
+                    writer = csv.DictWriter(f, fieldnames=self._csv_fields, extrasaction='ignore', restval='')
+                    if write_header:
+                        writer.writeheader()
+                    writer.writerow(row)
+        except OSError as e:
+            print(f"Could not write stats log '{self.path}': {e}", file=sys.stderr)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+def serve_stats(stats, port, host='127.0.0.1'):
+    """
+    Serves `stats.snapshot()` as JSON at http://host:port/ from a daemon
+    thread. Returns the server; call `shutdown()` on it to stop.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ('/', '/stats'):
+                self.send_error(404)
+                return
+            body = json.dumps(stats.snapshot()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StatsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stats-http", daemon=True).start()
+    return server
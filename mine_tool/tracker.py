@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Motion tracking and latency compensation for the release prediction.
+
+`AlphaBetaTracker` filters the grey line's angle and angular velocity from
+capture-timestamped measurements. `LatencyEstimator` measures, online, how
+long the pipeline takes from capture to the point where a release is issued,
+so the prediction can lead the release by exactly that amount.
+"""
+import math
+
+class AlphaBetaTracker:
+    """
+    Alpha-beta filter over an angle (radians) and its angular velocity (rad/s).
+
+    Each measurement is first compared with the position predicted from the
+    previous state; `alpha` controls how much of that residual corrects the
+    angle and `beta` how much corrects the velocity. The velocity starts from
+    the difference of the first two measurements, so the filter does not have
+    to converge from standstill. The tracker resets itself when the
+    measurements are too far apart in time or jump implausibly.
+    """
+
+    def __init__(self, alpha=0.5, beta=0.1, max_gap=0.25, max_jump=math.radians(30)):
+        self.alpha = alpha
+        self.beta = beta
+        self.max_gap = max_gap
+        self.max_jump = max_jump
+        self.reset()
+
+    def reset(self):
+        self.angle = None
+        self.velocity = 0.0
+        self.timestamp = None
+        # Measurements since the last reset
+        self.samples = 0
+
+    @property
+    def initialized(self):
+        return self.angle is not None
+
+    def update(self, angle, timestamp):
+        """Adds a measurement taken at `timestamp` (capture time) and returns (angle, velocity)."""
+        if self.angle is None or timestamp - self.timestamp > self.max_gap:
+            self._restart(angle, timestamp)
+            return self.angle, self.velocity
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return self.angle, self.velocity
+
+        predicted = self.angle + self.velocity * dt
+        residual = angle - predicted
+        if abs(residual) > self.max_jump:
+            # The line jumped (new minigame round or a false detection); start over
+            self._restart(angle, timestamp)
+            return self.angle, self.velocity
+        if self.samples == 1:
+            # Two-point initialization: take the velocity straight from the first step
+            self.angle = angle
+            self.velocity = residual / dt
+        else:
+            self.angle = predicted + self.alpha * residual
+            self.velocity += self.beta * residual / dt
+        self.timestamp = timestamp
+        self.samples += 1
+        return self.angle, self.velocity
+
+    def _restart(self, angle, timestamp):
+        self.angle = angle
+        self.velocity = 0.0
+        self.timestamp = timestamp
+        self.samples = 1
+
+    def predict(self, lead_time):
+        """Returns the angle expected `lead_time` seconds after the last measurement."""
+        return self.angle + self.velocity * lead_time
+
+class LatencyEstimator:
+    """Exponentially weighted moving average of capture-to-release latency, in seconds."""
+
+    def __init__(self, initial=0.0, smoothing=0.1):
+        self.value = initial
+        self.smoothing = smoothing
+        self.samples = 0
+
+    def observe(self, latency):
+        if latency < 0:
+            return self.value
+        if self.samples == 0:
+            self.value = latency
+        else:
+            self.value += self.smoothing * (latency - self.value)
+        self.samples += 1
+        return self.value
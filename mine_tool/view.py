@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Always-on-top debug view.
+
+The processing loop publishes frames, masks and detection results into a
+`DebugViewMailbox`; `run_debug_view` shows the latest of them in a Tk window.
+Tkinter and Pillow are only imported when the window is actually opened, so
+headless users of the package never load them.
+"""
+import sys
+
+import cv2
+import numpy as np
+
+from .overlay import draw_overlay
+
+# Tiles of the composited debug view, left to right
+DEBUG_VIEW_TILES = ("Live", "Grey Line Mask", "White Area Mask", "Curved Bar Mask")
+
+def _copy_into(buffer, array):
+    """Copies `array` into `buffer`, which is (re)allocated if missing or of another shape. Returns the buffer."""
+    if buffer is None or buffer.shape != array.shape or buffer.dtype != array.dtype:
+        buffer = np.empty(array.shape, dtype=array.dtype)
+    np.copyto(buffer, array)
+    return buffer
+
+class ViewSlot:
+    """
+    One buffer of a DebugViewMailbox: a frame, its color masks and detection
+    result. `result` is a DetectionResult still to be drawn onto `image`
+    (lazy overlay), or None if it was already drawn (eager). Masks that were
+    not published are None; the view then keeps showing the previous ones.
+    """
+
+    def __init__(self):
+        self.image = None
+        self.result = None
+        self.grey_mask = None
+        self.white_mask = None
+        self.bar_mask = None
+        self._buffers = {}
+
+    def store(self, image=None, grey_mask=None, white_mask=None, bar_mask=None):
+        """
+        Copies the frame and color masks into this slot's buffers, which are
+        allocated on first use and then reused. The bar mask is static, so
+        only a reference to it is kept.
+        """
+        if image is not None:
+            self.image = self._buffers['image'] = _copy_into(self._buffers.get('image'), image)
+        self.grey_mask = self.white_mask = None
+        if grey_mask is not None:
+            self.grey_mask = self._buffers['grey'] = _copy_into(self._buffers.get('grey'), grey_mask)
+        if white_mask is not None:
+            self.white_mask = self._buffers['white'] = _copy_into(self._buffers.get('white'), white_mask)
+        self.bar_mask = bar_mask
+
+    def image_buffer(self, shape):
+        """This slot's frame buffer of `shape`, for writing a frame into it directly."""
+        image = self._buffers.get('image')
+        if image is None or image.shape != shape:
+            image = self._buffers['image'] = np.empty(shape, dtype=np.uint8)
+        self.image = image
+        return image
+
+class DebugViewMailbox:
+    """
+    Double-buffered latest-result slot between the processing loop and the
+    debug view.
+
+    The loop fills the back slot (`acquire()`, fill it, `commit()`) while the
+    view reads the front one (`take()`). Handing a slot over is a single
+    attribute store, atomic under the GIL, so neither side takes a lock, and
+    the view draws straight from the slot without copying it. A slot is only
+    refilled once the view has taken the newer one, so what the view is
+    drawing is never overwritten; until then the loop's frames are dropped
+    (`acquire()` returns None), as the view could not show them anyway.
+
+    With `keep_frames=False` the processing loop only publishes masks and
+    results, for views that get the frame elsewhere (see pipeline.py).
+    """
+
+    def __init__(self, keep_frames=True):
+        self.keep_frames = keep_frames
+        self._slots = (ViewSlot(), ViewSlot())
+        self._latest = 0
+        self._ready = False
+
+    def busy(self):
+        """True while the view has not taken the last published frame."""
+        return self._ready
+
+    def acquire(self):
+        """Returns the back slot to fill, or None while the view is busy."""
+        if self._ready:
+            return None
+        return self._slots[1 - self._latest]
+
+    def commit(self):
+        """Publishes the slot returned by the last `acquire()`."""
+        # Point at the new slot before flagging it, so take() never sees a stale index
+        self._latest = 1 - self._latest
+        self._ready = True
+
+    def take(self):
+        """
+        Returns the newest published slot, or None if nothing was published
+        since the last call. The slot stays untouched until the next call.
+        """
+        if not self._ready:
+            return None
+        slot = self._slots[self._latest]
+        self._ready = False
+        return slot
+
+    def publish(self, image, result, grey_mask=None, white_mask=None, bar_mask=None):
+        """Copies a frame and its masks into the back slot and publishes it; returns False if the view was busy."""
+        slot = self.acquire()
+        if slot is None:
+            return False
+        slot.store(image, grey_mask, white_mask, bar_mask)
+        slot.result = result
+        self.commit()
+        return True
+
+def run_debug_view(mailbox, tile_width, tile_height, display_fps, stop_event):
+    """
+    Builds the always-on-top debug view and runs the Tk main loop until
+    `stop_event` is set; closing the window sets it.
+
+    The live view and the three masks are tiled into one preallocated canvas
+    that is shown through a single persistent PhotoImage, updated in place at
+    most `display_fps` times per second and only when a new frame arrived.
+    """
+    import tkinter as tk
+    from PIL import Image, ImageTk
+
+    canvas_bgr = np.zeros((tile_height, tile_width * len(DEBUG_VIEW_TILES), 3), dtype=np.uint8)
+    canvas_rgb = np.empty_like(canvas_bgr)
+    tile_bgr = np.empty((tile_height, tile_width, 3), dtype=np.uint8)
+    update_interval_ms = max(1, int(1000 / display_fps)) if display_fps > 0 else 50
+
+    root = tk.Tk()
+    root.title("Mine Tool Debug View")
+    root.attributes("-topmost", True)
+    root.resizable(False, False)
+
+    photo = ImageTk.PhotoImage(Image.fromarray(canvas_rgb))
+    label_view = tk.Label(root, image=photo)
+    label_view.image = photo
+    label_view.pack()
+
+    last_bar_mask = None
+
+    def put_tile(index, image):
+        """Copies a BGR or grayscale image into tile `index`, resizing it if needed."""
+        if image.shape[:2] != (tile_height, tile_width):
+            image = cv2.resize(image, (tile_width, tile_height), interpolation=cv2.INTER_NEAREST)
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR, dst=tile_bgr)
+        x1 = index * tile_width
+        canvas_bgr[:, x1:x1 + tile_width] = image
+
+    def update_gui_from_mailbox():
+        """Takes the latest frame and masks, composites them and updates the view."""
+        nonlocal last_bar_mask
+        if stop_event.is_set():
+            root.quit()
+            return
+
+        slot = mailbox.take()
+        if slot is None:
+            # Nothing new since the last update; skip all conversion work
+            root.after(update_interval_ms, update_gui_from_mailbox)
+            return
+
+        if slot.result is not None:
+            # Lazy overlay: draw only the frames that are actually displayed
+            draw_overlay(slot.image, slot.result)
+        put_tile(0, slot.image)
+
+        for index, mask in ((1, slot.grey_mask), (2, slot.white_mask)):
+            if mask is not None:
+                put_tile(index, mask)
+
+        # The bar mask is static; only redraw its tile when it changes
+        if slot.bar_mask is not None and slot.bar_mask is not last_bar_mask:
+            put_tile(3, slot.bar_mask)
+            last_bar_mask = slot.bar_mask
+
+        cv2.cvtColor(canvas_bgr, cv2.COLOR_BGR2RGB, dst=canvas_rgb)
+        photo.paste(Image.fromarray(canvas_rgb))
+
+        root.after(update_interval_ms, update_gui_from_mailbox)
+
+    # Label the tiles once; they are part of the window, not of the canvas
+    labels = tk.Frame(root)
+    for title in DEBUG_VIEW_TILES:
+        tk.Label(labels, text=title, width=1).pack(side=tk.LEFT, expand=True, fill=tk.X)
+    labels.pack(fill=tk.X)
+
+    root.after(update_interval_ms, update_gui_from_mailbox)
+
+    try:
+        root.mainloop()
+    except Exception as e:
+        print(f"Tkinter mainloop error: {e}", file=sys.stderr)
+    finally:
+        stop_event.set()
+
+        try:
+            if root.winfo_exists():
+                root.destroy()
+        except tk.TclError:
+            pass
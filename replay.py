@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Headless replay and benchmark harness for Mine Tool.
+
+Feeds frames from a recorded video through the same detection and trigger
+logic as the live tool (`mine_tool.loop.processing_loop`). Mouse releases go to a
+recording sink instead of the real mouse, so no display, game or mouse hook
+is needed.
+
+Usage:
+    python replay.py assets/mine_tool_example_v1.0.0-alpha.2+poc.mp4 --region 786,459,889,562 --tolerance 25
+    python replay.py recording.mp4 --region 400,300,520,420 --json report.json
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import replace
+
+from mine_tool.actions import RecordingReleaseSink, StreamTimeReleaser
+from mine_tool.capture import EndOfStream, FileCapture, parse_region
+from mine_tool.config import CONFIG_FILE, load_config
+from mine_tool.loop import processing_loop
+from mine_tool.stats import StageTimer
+
+class _FrameLimit:
+    """Wraps a capture backend and ends the stream after `max_frames` frames."""
+
+    def __init__(self, capture, max_frames):
+        self._capture = capture
+        self._max_frames = max_frames
+
+    def __getattr__(self, name):
+        return getattr(self._capture, name)
+
+    def grab(self):
+        if self._capture.frame_index + 1 >= self._max_frames:
+            raise EndOfStream(f"Reached the {self._max_frames} frame limit")
+        return self._capture.grab()
+
+def run_replay(source, config=None, region=None, loop=False, realtime=False, max_frames=None):
+    """
+    Replays `source` through the processing loop with `config` (default: read
+    from config.ini, if present) and returns a report dict with per-stage
+    latency, event counters, sustained FPS and every release.
+    """
+    if config is None:
+        config = load_config(CONFIG_FILE)
+    capture = FileCapture(config.roi, source, region=region, loop=loop, realtime=realtime)
+    capture.open()
+
+    if max_frames is not None:
+        capture = _FrameLimit(capture, max_frames)
+
+    release_sink = RecordingReleaseSink()
+    stage_timer = StageTimer()
+    # Scheduled releases fire against video time so replays stay deterministic
+    releaser = None
+    if config.release_mode == 'scheduled' and config.prediction_enabled:
+        releaser = StreamTimeReleaser(release_sink)
+
+    # Nothing displays the debug view during a replay, so no view is passed
+    start = time.perf_counter()
+    try:
+        processing_loop(config, capture, release_sink, stage_timer=stage_timer, releaser=releaser)
+    finally:
+        elapsed = time.perf_counter() - start
+        capture.close()
+
+    frames = len(stage_timer.frame_times)
+    return {
+        'source': source,
+        'frames': frames,
+        'elapsed_s': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'stages': stage_timer.summary(),
+        'counters': dict(stage_timer.counters),
+        'releases': release_sink.releases,
+    }
+
+def print_report(report):
+    print()
+    print(f"Replayed {report['frames']} frames from '{report['source']}' "
+          f"in {report['elapsed_s']:.2f} s ({report['fps']:.1f} FPS)")
+    print(f"{'stage':<10} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, row in report['stages'].items():
+        print(f"{stage:<10} {row['count']:>7} {row['mean_ms']:>9.3f} {row['p50_ms']:>9.3f} "
+              f"{row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['max_ms']:>9.3f}")
+    for counter, value in sorted(report['counters'].items()):
+        print(f"{counter}: {value}")
+    print(f"{len(report['releases'])} release(s)")
+    for release in report['releases']:
+        print(f"  frame {release['frame_index']:>6}  t={release['timestamp']:.3f} s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recording through the Mine Tool detection loop.")
+    parser.add_argument('source', help="Video file (or image) to replay")
+    parser.add_argument('--region', type=parse_region,
+                        help="Crop x1,y1,x2,y2 in video pixels (default: the config ROI if it fits)")
+    parser.add_argument('--loop', action='store_true', help="Restart the video when it ends")
+    parser.add_argument('--realtime', action='store_true', help="Pace frames at the video frame rate")
+    parser.add_argument('--max-frames', type=int, help="Stop after this many frames")
+    parser.add_argument('--tolerance', type=int, help="COLOR_TOLERANCE to replay with (default: from config.ini)")
+    parser.add_argument('--json', metavar='PATH', help="Also write the report as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    if args.loop and args.max_frames is None and not args.realtime:
+        parser.error("--loop needs --max-frames or --realtime")
+
+    config = load_config(CONFIG_FILE)
+    if args.tolerance is not None:
+        config = replace(config, color_tolerance=args.tolerance)
+    report = run_replay(args.source, config, region=args.region, loop=args.loop,
+                        realtime=args.realtime, max_frames=args.max_frames)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
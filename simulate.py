@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Simulated minigame benchmark for Mine Tool.
+
+Plays synthetic rounds of the mining minigame (see mine_tool/sim.py) through
+the same processing loop as the live tool, at each line speed of a sweep,
+and scores every release against the exact time the grey line crossed the
+center of the white area. No display, game or mouse is needed.
+
+By default the rounds run in stream time, so results are repeatable and
+only the detection and prediction are scored. With --realtime the game runs
+on the wall clock, so capture and processing latency count as well, and the
+capture-to-release latency is reported.
+
+Usage:
+    python simulate.py
+    python simulate.py --speeds 90,180,360 --rounds 50 --noise 6 --json sim.json
+    python simulate.py --realtime --speeds 120 --rounds 10
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+
+from mine_tool.config import CONFIG_FILE, load_config
+from mine_tool.sim import run_simulation
+
+def parse_speeds(value):
+    """Parses a comma-separated list of speeds in degrees per second."""
+    try:
+        speeds = [float(v) for v in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected comma-separated numbers, got '{value}'")
+    if any(speed <= 0 for speed in speeds):
+        raise argparse.ArgumentTypeError(f"Speeds must be positive, got '{value}'")
+    return speeds
+
+def print_report(results):
+    print()
+    print(f"{'speed':>7} {'rounds':>7} {'hits':>5} {'misses':>7} {'hit %':>6} "
+          f"{'err ms':>8} {'p95 |err|':>10} {'max |err|':>10} {'lat p95':>8}")
+    for result in results:
+        error = result['timing_error_ms']
+        latency = result['latency_ms']
+        hit_rate = 100.0 * result['hits'] / result['rounds'] if result['rounds'] else 0.0
+        error_columns = (f"{error['mean']:>8.1f} {error['p95_abs']:>10.1f} {error['max_abs']:>10.1f}"
+                         if error else f"{'-':>8} {'-':>10} {'-':>10}")
+        latency_column = f"{latency['p95']:>8.2f}" if latency else f"{'-':>8}"
+        print(f"{result['speed']:>7g} {result['rounds']:>7} {result['hits']:>5} {result['misses']:>7} "
+              f"{hit_rate:>6.1f} {error_columns} {latency_column}")
+    print("Speeds in degrees per second; timing errors in ms (negative: released early); "
+          "latency from capture to release in ms.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Mine Tool on a simulated minigame.")
+    parser.add_argument('--speeds', type=parse_speeds, default=[60.0, 120.0, 240.0, 480.0],
+                        help="Comma-separated grey line speeds in degrees per second (default: 60,120,240,480)")
+    parser.add_argument('--rounds', type=int, default=20, help="Rounds per speed (default: 20)")
+    parser.add_argument('--fps', type=float, default=60.0, help="Frame rate of the simulated game (default: 60)")
+    parser.add_argument('--acceleration', type=float, default=0.0,
+                        help="Grey line acceleration in degrees per second squared (default: 0)")
+    parser.add_argument('--zone-width', type=float, default=12.0,
+                        help="Width of the white area in degrees (default: 12)")
+    parser.add_argument('--noise', type=float, default=0.0,
+                        help="Standard deviation of the Gaussian pixel noise (default: 0)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the white area positions (default: 0)")
+    parser.add_argument('--realtime', action='store_true',
+                        help="Run the game on the wall clock and measure capture-to-release latency")
+    parser.add_argument('--verbose', action='store_true', help="Show the processing loop's output")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    config = load_config(CONFIG_FILE)
+    results = []
+    for speed in args.speeds:
+        print(f"Simulating {args.rounds} round(s) at {speed:g} deg/s...")
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            results.append(run_simulation(config, speed, args.rounds, args.fps, args.realtime,
+                                          acceleration=args.acceleration, zone_width=args.zone_width,
+                                          noise=args.noise, seed=args.seed))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
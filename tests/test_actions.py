@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Scheduled releases fired from the action thread."""
+import threading
+import time
+
+import pytest
+
+from mine_tool.actions import ScheduledReleaser, create_release_sink
+
+class _TimedSink:
+    """Records each release with the perf_counter time it happened at."""
+
+    def __init__(self):
+        self.releases = []
+        self.released = threading.Event()
+
+    def release(self, frame_index, timestamp):
+        self.releases.append((frame_index, timestamp, time.perf_counter()))
+        self.released.set()
+
+@pytest.fixture
+def releaser():
+    sink = _TimedSink()
+    releaser = ScheduledReleaser(sink)
+    releaser.start()
+    yield releaser, sink
+    releaser.stop()
+
+def test_scheduled_release_fires_at_its_deadline(releaser):
+    releaser, sink = releaser
+    captured_at = time.perf_counter()
+    releaser.schedule(0.03, 7, 2.0, captured_at)
+    assert releaser.pending
+    assert sink.released.wait(1.0)
+
+    ((frame_index, timestamp, released_at),) = sink.releases
+    assert (frame_index, timestamp) == (7, 2.03)
+    # Never early; the thread spins out the last stretch, so it is only late by scheduling noise
+    assert released_at >= captured_at + 0.03
+    assert released_at - (captured_at + 0.03) < 0.02
+    assert not releaser.pending
+    assert releaser.poll(2.1) == 2.03
+    assert releaser.poll(2.1) is None
+
+def test_newer_frames_replace_or_cancel_the_release(releaser):
+    releaser, sink = releaser
+    releaser.schedule(0.05, 1, 1.0, time.perf_counter())
+    releaser.schedule(0.02, 2, 1.1, time.perf_counter())
+    assert sink.released.wait(1.0)
+    time.sleep(0.06)
+    assert [release[0] for release in sink.releases] == [2]
+
+    releaser.schedule(0.03, 3, 1.2, time.perf_counter())
+    releaser.cancel()
+    time.sleep(0.06)
+    assert len(sink.releases) == 1 and not releaser.pending
+
+def test_overdue_release_fires_from_the_caller(releaser):
+    releaser, sink = releaser
+    assert releaser.fire(1.0) is None
+    releaser.schedule(10.0, 4, 1.0, time.perf_counter())
+    assert not releaser.overdue(1.0)
+    assert releaser.fire(1.0) == 11.0
+    assert [release[:2] for release in sink.releases] == [(4, 11.0)]
+    assert not releaser.pending
+
+def test_create_release_sink_rejects_unknown_actions():
+    for action in ('keyboard', 'key:', ''):
+        with pytest.raises(ValueError):
+            create_release_sink(action)
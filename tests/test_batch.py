@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Batch detection over frame stacks."""
+import math
+
+import numpy as np
+import pytest
+
+from mine_tool.batch import BatchDetector, iter_frame_batches
+from mine_tool.capture import FileCapture
+from mine_tool.config import Config
+from mine_tool.detector import Detector
+from mine_tool.sim import MinigameSimulator
+
+def _frames(config, count=150, noise=0.0):
+    """Frames of two simulated rounds and the gap between them."""
+    simulator = MinigameSimulator.from_config(config, rounds=2, noise=noise)
+    width, height = config.roi_size
+    return np.stack([simulator.render(i / 60.0, np.empty((height, width, 3), dtype=np.uint8))
+                     for i in range(count)])
+
+def _batch_detector(config, **kwargs):
+    geometry = Detector.from_config(config).geometry
+    return BatchDetector(geometry, config.grey_bgr, config.white_bgr, config.color_tolerance,
+                         grey_min_area=config.grey_line_min_area, **kwargs)
+
+@pytest.mark.parametrize('noise', [0.0, 6.0])
+def test_batch_detector_matches_the_contour_engine(noise):
+    config = Config()
+    frames = _frames(config, noise=noise)
+    result = _batch_detector(config).detect(frames)
+    detector = Detector.from_config(config)
+
+    detections = [detector.detect(frame) for frame in frames]
+    visible = np.array([d.visible for d in detections])
+    assert visible.sum() > len(frames) / 3
+    assert np.array_equal(result.valid, visible)
+    for i in np.flatnonzero(visible):
+        assert result.angle_grey[i] == pytest.approx(detections[i].angle_grey, abs=math.radians(1.0))
+        assert result.angle_white[i] == pytest.approx(detections[i].angle_white, abs=math.radians(1.0))
+        assert result.radius[i] == pytest.approx(detections[i].radius, abs=1.5)
+        # The two angle differences add up along the arc
+        assert result.arc_distance[i] == pytest.approx(detections[i].arc_distance, abs=2.0)
+    assert np.isnan(result.angle_grey[~result.grey_valid]).all()
+
+def test_batch_size_does_not_change_the_results():
+    config = Config()
+    frames = _frames(config, count=100, noise=6.0)
+    whole = _batch_detector(config).detect(frames)
+    split = _batch_detector(config, batch_size=16).detect(frames)
+    for name in ('angle_grey', 'angle_white', 'radius', 'grey_valid', 'white_valid'):
+        assert np.array_equal(getattr(whole, name), getattr(split, name), equal_nan=True)
+    with pytest.raises(ValueError):
+        _batch_detector(config).detect(frames[:, :50])
+
+def test_iter_frame_batches_reads_every_frame(tmp_path):
+    config = Config()
+    frames = _frames(config, count=10)
+    path = str(tmp_path / "frames.npz")
+    np.savez(path, frames=frames, timestamp=np.arange(10) / 60.0)
+
+    with FileCapture(config.roi, path) as capture:
+        batches = [(stack.copy(), timestamps.copy(), stack.base)
+                   for stack, timestamps in iter_frame_batches(capture, batch_size=4)]
+    assert [len(stack) for stack, _, _ in batches] == [4, 4, 2]
+    assert np.array_equal(np.concatenate([stack for stack, _, _ in batches]), frames)
+    assert np.allclose(np.concatenate([timestamps for _, timestamps, _ in batches]), np.arange(10) / 60.0)
+    # Every batch is read into the same buffer
+    assert all(base is batches[0][2] for _, _, base in batches)
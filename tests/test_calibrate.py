@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Following the bar with the ROI tracker."""
+import numpy as np
+
+from mine_tool import calibrate
+from mine_tool.calibrate import RoiTracker
+from mine_tool.capture import CaptureBackend, CaptureError
+from mine_tool.config import Config
+from mine_tool.sim import MinigameSimulator
+
+SCREEN_SIZE = (640, 480)
+BAR_ROI = (200, 150, 320, 270)
+
+class _ScreenCapture(CaptureBackend):
+    """Captures its bbox from a fixed screen image."""
+    name = "screen"
+
+    def __init__(self, bbox, screen):
+        super().__init__(bbox)
+        self.screen = screen
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def grab(self):
+        x1, y1, x2, y2 = self.bbox
+        if x2 > self.screen.shape[1] or y2 > self.screen.shape[0]:
+            raise CaptureError(f"{self.bbox} is outside the screen")
+        np.copyto(self.frame, self.screen[y1:y2, x1:x2])
+        return self._mark_captured()
+
+def _screen(config):
+    """A screen showing the simulated minigame mid-round at BAR_ROI."""
+    x1, y1, x2, y2 = BAR_ROI
+    screen = np.empty((SCREEN_SIZE[1], SCREEN_SIZE[0], 3), dtype=np.uint8)
+    screen[:] = MinigameSimulator.BACKGROUND_BGR
+    simulator = MinigameSimulator.from_config(config, x2 - x1, y2 - y1)
+    # The first round starts after one gap between rounds
+    screen[y1:y2, x1:x2] = simulator.render(simulator.gap + 0.1, np.empty((y2 - y1, x2 - x1, 3), dtype=np.uint8))
+    return screen
+
+def test_roi_tracker_reuses_one_search_backend(monkeypatch):
+    config = Config()
+    screen = _screen(config)
+    backends = []
+
+    def create_capture_backend(name, bbox, *args, **kwargs):
+        backends.append(_ScreenCapture(bbox, screen))
+        return backends[-1]
+
+    monkeypatch.setattr(calibrate, 'create_capture_backend', create_capture_backend)
+    # The game window moved since the ROI was set
+    x1, y1, x2, y2 = BAR_ROI
+    capture = _ScreenCapture((x1 - 25, y1 + 15, x2 - 25, y2 + 15), screen)
+    tracker = RoiTracker(capture, 'screen', config.bar_bgr, config.grey_bgr, config.white_bgr,
+                         config.color_tolerance, config.bar_thickness_percentage)
+
+    assert tracker.search() == BAR_ROI
+    assert capture.bbox == BAR_ROI
+    assert tracker.search() is None
+    assert tracker.relocations == 1
+    # Both searches grabbed through the backend opened up front, moved along with the ROI
+    (backend,) = backends
+    assert backend.frame_index == 1
+    assert backend.bbox == tracker.search_bbox()
+    tracker.close()
+    assert backend.closed
+
+def test_roi_tracker_search_area_keeps_its_size_at_the_screen_edge(monkeypatch):
+    config = Config()
+    monkeypatch.setattr(calibrate, 'create_capture_backend',
+                        lambda name, bbox, *args, **kwargs: _ScreenCapture(bbox, _screen(config)))
+    capture = _ScreenCapture((40, 0, 160, 120), None)
+    tracker = RoiTracker(capture, 'screen', config.bar_bgr, config.grey_bgr, config.white_bgr,
+                         config.color_tolerance, config.bar_thickness_percentage, margin=0.5)
+    assert tracker.search_bbox() == (0, 0, 240, 240)
+    capture.move(200, 150)
+    assert tracker.search_bbox() == (140, 90, 380, 330)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Capture backends reading from files."""
+import cv2
+import numpy as np
+import pytest
+
+from mine_tool.capture import EndOfStream, FileCapture, MultiRoiCapture, create_capture_backend
+
+def _write_record(path, count=3, shape=(40, 60, 3), fps=20.0):
+    """A flight record whose frame `i` is filled with `i`, captured at `i / fps` seconds."""
+    frames = np.stack([np.full(shape, i, dtype=np.uint8) for i in range(count)])
+    np.savez(path, frames=frames, timestamp=100.0 + np.arange(count) / fps)
+    return str(path)
+
+def test_file_capture_fills_one_buffer_in_place(tmp_path):
+    source = _write_record(tmp_path / "record.npz")
+    with FileCapture((0, 0, 60, 40), source) as capture:
+        buffer = capture.frame
+        for i in range(3):
+            frame = capture.grab()
+            assert frame is buffer
+            assert (frame == i).all()
+            assert capture.frame_index == i
+            # Stream time of the recording, starting at its first frame
+            assert capture.timestamp == pytest.approx(i / 20.0)
+        with pytest.raises(EndOfStream):
+            capture.grab()
+    assert not capture.realtime
+
+def test_file_capture_loops_with_increasing_timestamps(tmp_path):
+    source = _write_record(tmp_path / "record.npz")
+    with FileCapture((0, 0, 60, 40), source, loop=True) as capture:
+        values, timestamps = [], []
+        for _ in range(5):
+            values.append(int(capture.grab()[0, 0, 0]))
+            timestamps.append(capture.timestamp)
+    assert values == [0, 1, 2, 0, 1]
+    assert np.all(np.diff(timestamps) > 0)
+
+def test_file_capture_crops_and_resizes_the_region(tmp_path):
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    image[20:60, 50:90] = (10, 20, 30)
+    path = str(tmp_path / "screen.png")
+    cv2.imwrite(path, image)
+
+    with FileCapture((0, 0, 20, 20), path, region=(50, 20, 90, 60)) as capture:
+        frame = capture.grab()
+        assert frame.shape == (20, 20, 3)
+        assert (frame == (10, 20, 30)).all()
+    # Without a region, a ROI inside the image is cropped at its own position
+    with FileCapture((40, 10, 60, 30), path) as capture:
+        frame = capture.grab()
+        assert (frame[10:, 10:] == (10, 20, 30)).all() and not frame[:10].any()
+
+def test_file_capture_converts_into_a_bgra_buffer(tmp_path):
+    source = _write_record(tmp_path / "record.npz", count=1)
+    with FileCapture((0, 0, 60, 40), source, channels=4) as capture:
+        frame = capture.grab()
+    assert frame.shape == (40, 60, 4)
+    assert (frame[..., :3] == 0).all() and (frame[..., 3] == 255).all()
+
+def test_create_capture_backend(tmp_path):
+    source = _write_record(tmp_path / "record.npz")
+    backend = create_capture_backend('auto', (0, 0, 60, 40), source)
+    try:
+        assert isinstance(backend, FileCapture)
+        assert backend.frame_count == 3 and backend.fps == pytest.approx(20.0)
+    finally:
+        backend.close()
+    with pytest.raises(ValueError):
+        create_capture_backend('dxcam', (0, 0, 60, 40))
+
+def test_multi_roi_capture_slices_one_grab(tmp_path):
+    # Each pixel holds its own coordinates, so a view shows where it was cut from
+    ys, xs = np.mgrid[:100, :200]
+    image = np.dstack([xs, ys, np.zeros_like(xs)]).astype(np.uint8)
+    path = str(tmp_path / "screen.png")
+    cv2.imwrite(path, image)
+
+    with MultiRoiCapture('file', [(10, 10, 30, 30), (50, 20, 70, 40)], path) as capture:
+        assert capture.bbox == (10, 10, 70, 40)
+        backend = capture.backend
+        first, second = capture.grab()
+        assert first.base is backend.frame and second.base is backend.frame
+        assert (first[0, 0, 0], first[0, 0, 1]) == (10, 10)
+        assert (second[0, 0, 0], second[0, 0, 1]) == (50, 20)
+
+        # Inside the union, a moved ROI is only sliced anew
+        capture.rois[0].move(12, 15)
+        first, _ = capture.grab()
+        assert capture.backend is backend
+        assert (first[0, 0, 0], first[0, 0, 1]) == (12, 15) and first.shape == (20, 20, 3)
+
+        # Outside it, the union is captured again
+        capture.rois[1].move(150, 60)
+        first, second = capture.grab()
+        assert capture.backend is not backend
+        assert capture.bbox == (12, 15, 170, 80)
+        assert (first[0, 0, 0], first[0, 0, 1]) == (12, 15)
+        assert (second[0, 0, 0], second[0, 0, 1]) == (150, 60)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""Detector engines and the frame gate on simulated frames and the example recording."""
+import math
+import os
+from dataclasses import replace
+
+import cv2
+import numpy as np
+import pytest
+
+from mine_tool import geometry
+from mine_tool.capture import EndOfStream, FileCapture
+from mine_tool.config import Config
+from mine_tool.detector import Detector, color_bounds, find_largest_area
+from mine_tool.gate import FRAME_EMPTY, FRAME_UNCHANGED, FrameGate
+from mine_tool.sim import MinigameSimulator
+
+EXAMPLE_VIDEO = os.path.join(os.path.dirname(__file__), os.pardir, 'assets',
+                             'mine_tool_example_v1.0.0-alpha.2+poc.mp4')
+# The tool's debug view in the example recording, which shows a white area in most frames
+EXAMPLE_REGION = (198, 322, 296, 420)
+
+def _example_frames():
+    """Yields copies of the example recording's frames, cropped and resized to the default ROI."""
+    capture = FileCapture(Config().roi, EXAMPLE_VIDEO, region=EXAMPLE_REGION)
+    capture.open()
+    try:
+        while True:
+            try:
+                yield capture.grab().copy()
+            except EndOfStream:
+                return
+    finally:
+        capture.close()
+
+def _simulated_frames(config, count=120, fps=60.0):
+    """Frames of a few simulated rounds with pixel noise, which show the grey line as well."""
+    simulator = MinigameSimulator.from_config(config, rounds=3, noise=6.0)
+    width, height = config.roi_size
+    return [simulator.render(i / fps, np.empty((height, width, 3), dtype=np.uint8)) for i in range(count)]
+
+def _detect_example(configs):
+    """Runs one detector per config over the example recording; returns a list of detections per config."""
+    frames = list(_example_frames())
+    height, width = frames[0].shape[:2]
+    detectors = [Detector.from_config(c, width, height) for c in configs]
+    return [[detector.detect(frame) for frame in frames] for detector in detectors]
+
+def _masked_frame_detection(frame, config, bar_mask):
+    """The contour engine's centers, matching colors in the bar-masked frame instead of masking the match."""
+    bar_only = cv2.bitwise_and(frame, frame, mask=bar_mask)
+    white_mask = cv2.inRange(bar_only, *color_bounds(config.white_bgr, config.color_tolerance))
+    kernel = np.ones((config.white_area_width_increase, config.white_area_width_increase), np.uint8)
+    white_center, _, _ = find_largest_area(cv2.dilate(white_mask, kernel), Detector.WHITE_MIN_AREA)
+    grey_mask = cv2.inRange(bar_only, *color_bounds(config.grey_bgr, config.color_tolerance))
+    grey_center, _, _ = find_largest_area(grey_mask, config.grey_line_min_area)
+    return white_center, grey_center
+
+@pytest.mark.skipif(not os.path.exists(EXAMPLE_VIDEO), reason="example recording not available")
+def test_polar_engine_matches_contour_engine():
+    config = Config()
+    contour, polar = _detect_example([replace(config, detection_engine='contour'),
+                                      replace(config, detection_engine='polar')])
+
+    contour_found = sum(d.white_center is not None for d in contour)
+    polar_found = sum(d.white_center is not None for d in polar)
+    assert contour_found > len(contour) / 2
+    assert abs(polar_found - contour_found) <= 0.05 * contour_found
+
+    differences = [abs(c.angle_white - p.angle_white) for c, p in zip(contour, polar)
+                   if c.white_center is not None and p.white_center is not None]
+    assert np.median(differences) < math.radians(1.5)
+    # Stray matches along the edge of the strip stay below the minimum area
+    assert all(p.angle_white > math.radians(-80) for p in polar if p.white_center is not None)
+
+def test_polar_runs_join_matches_up_to_the_gap():
+    polar = Detector.from_config(replace(Config(), detection_engine='polar')).polar_unwrap
+    mask = np.zeros(polar.strip.shape[:2], dtype=np.uint8)
+    rows = mask.shape[0]
+    # A 10 pixel wide area across the whole bar and a narrower one 5.5 pixels further on
+    mask[:, 100:120] = 255
+    mask[:, 131:141] = 255
+
+    angle, radius, area, span = polar.find_run(mask, min_area=10)
+    assert span == (polar.angles[100], polar.angles[119])
+    assert angle == pytest.approx((polar.angles[109] + polar.angles[110]) / 2)
+    assert radius == pytest.approx(polar.radii.mean())
+    # As the contour engine measures a 10 x rows pixel area
+    assert area == 9 * (rows - 1)
+    assert polar.find_run(mask, min_area=area + 1) is None
+
+    assert polar.find_run(mask, min_area=10, gap=2)[3] == span
+    _, _, joined_area, span = polar.find_run(mask, min_area=10, gap=6)
+    assert span == (polar.angles[100], polar.angles[140])
+    assert joined_area > area
+
+    # Within a slice of the strip, angles still count from the strip's first column
+    assert polar.find_run(mask[:, 90:], min_area=10, start=90)[0] == pytest.approx(angle)
+
+def test_contour_engine_matches_colors_on_the_bar_only():
+    config = Config()
+    frames = _simulated_frames(config)
+    if os.path.exists(EXAMPLE_VIDEO):
+        frames += list(_example_frames())
+    height, width = frames[0].shape[:2]
+    detector = Detector.from_config(config, width, height)
+    visible = 0
+    for frame in frames:
+        detection = detector.detect(frame)
+        expected = _masked_frame_detection(frame, config, detector.geometry.mask)
+        assert (detection.white_center, detection.grey_center) == expected
+        visible += detection.visible
+    assert visible > 0
+
+def _gate_states(config, frames, **kwargs):
+    """Pairs each frame's gate state with its detection and the detection of the last frame the gate let through."""
+    detector = Detector.from_config(config)
+    gate = FrameGate(detector.geometry, config.grey_bgr, config.white_bgr, config.color_tolerance,
+                     config.change_tolerance, **kwargs)
+    reference = None
+    for frame in frames:
+        state = gate.check(frame)
+        detection = detector.detect(frame)
+        yield state, detection, reference
+        if state != FRAME_UNCHANGED:
+            reference = detection
+
+def _gate_frames(config):
+    """Simulated frames followed by the example recording's, if available."""
+    frames = _simulated_frames(config)
+    if os.path.exists(EXAMPLE_VIDEO):
+        frames += list(_example_frames())
+    return frames
+
+def test_frame_gate_agrees_with_detection():
+    config = Config()
+    # Sampling every band pixel, an unchanged frame has exactly the same color matches
+    for state, detection, reference in _gate_states(config, _gate_frames(config), sample_stride=1):
+        found = (detection.white_center, detection.grey_center)
+        if state == FRAME_EMPTY:
+            assert found == (None, None)
+        elif state == FRAME_UNCHANGED:
+            assert found == (reference.white_center, reference.grey_center)
+
+def _center_distance(a, b):
+    """Pixels between two centers; infinite if only one of them was found."""
+    if a is None or b is None:
+        return 0.0 if a is b else math.inf
+    return math.dist(a, b)
+
+def test_frame_gate_samples_a_grid_of_the_band():
+    config = Config()
+    unchanged = lagging = 0
+    for state, detection, reference in _gate_states(config, _gate_frames(config)):
+        if state == FRAME_EMPTY:
+            assert (detection.white_center, detection.grey_center) == (None, None)
+        elif state == FRAME_UNCHANGED:
+            unchanged += 1
+            distance = max(_center_distance(detection.white_center, reference.white_center),
+                           _center_distance(detection.grey_center, reference.grey_center))
+            lagging += distance > 3
+    # A reused center is at most a few pixels off, except when an area just fades below its minimum
+    assert lagging <= unchanged / 20
+
+    large = Detector.from_config(config, 600, 600)
+    gate = FrameGate(large.geometry, config.grey_bgr, config.white_bgr, config.color_tolerance)
+    assert gate.sample_stride > 1
+    assert len(gate.sample_index) <= 1.1 * FrameGate.SAMPLE_PIXELS
+
+def test_detector_reuses_its_buffers():
+    config = Config()
+    first, second = _simulated_frames(config, count=50)[-2:]
+    detector = Detector.from_config(config)
+    a = detector.detect(first)
+    grey_mask, white_mask = a.grey_mask.copy(), a.white_mask.copy()
+    b = detector.detect(second)
+    assert b.grey_mask is a.grey_mask and b.white_mask is a.white_mask
+    # A fresh detector on the first frame finds the masks the reused buffers held
+    c = Detector.from_config(config).detect(first)
+    assert np.array_equal(c.grey_mask, grey_mask) and np.array_equal(c.white_mask, white_mask)
+
+def test_coarse_to_fine_detection_matches_full_detection():
+    config = replace(Config(), roi_x1=0, roi_y1=0, roi_x2=600, roi_y2=600)
+    frames = _simulated_frames(config)
+    full = Detector.from_config(config)
+    refined = Detector.from_config(replace(config, coarse_to_fine=True))
+    assert refined.coarse_scale == config.coarse_scale > 1
+
+    detections = [full.detect(frame) for frame in frames]
+    coarse = [refined.detect(frame) for frame in frames]
+    both = [(d, c) for d, c in zip(detections, coarse) if d.visible and c.visible]
+    # The coarse grid may only miss a line that has just entered the frame
+    assert sum(d.visible for d in detections) - len(both) <= 2
+    assert len(both) > len(frames) / 4
+    for d, c in both:
+        assert c.angle_grey == pytest.approx(d.angle_grey, abs=math.radians(0.5))
+        assert c.angle_white == pytest.approx(d.angle_white, abs=math.radians(0.5))
+
+    # The window around the previous frame's targets finds them at full resolution
+    for previous, frame, detection in zip(detections, frames[1:], detections[1:]):
+        if previous.visible:
+            near = refined.detect(frame, near=previous)
+            assert (near.grey_center, near.white_center) == (detection.grey_center, detection.white_center)
+    # Targets outside the window are searched for in the whole frame
+    stale = next(d for d in reversed(detections) if d.visible)
+    first = next(i for i, d in enumerate(detections) if d.visible)
+    near = refined.detect(frames[first], near=stale)
+    assert (near.grey_center, near.white_center) == (detections[first].grey_center, detections[first].white_center)
+
+def test_arc_geometry_cache_keeps_a_file_per_roi_size(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "arc_geometry.npz")
+    for size in (120, 98, 120, 98):
+        # A fresh process: only the files on disk survive
+        monkeypatch.setattr(geometry, '_arc_geometry_cache', {})
+        built = geometry.get_arc_geometry(size, size, 0.15, cache_file)
+        assert built.key == (size, size, 0.15)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["arc_geometry_120x120_0.15.npz",
+                                                                "arc_geometry_98x98_0.15.npz"]
+    # Both ROIs load their geometry instead of rebuilding and rewriting it
+    monkeypatch.setattr(geometry.ArcGeometry, 'save', lambda self, path: pytest.fail("rebuilt " + path))
+    for size in (120, 98):
+        monkeypatch.setattr(geometry, '_arc_geometry_cache', {})
+        assert geometry.get_arc_geometry(size, size, 0.15, cache_file).key == (size, size, 0.15)
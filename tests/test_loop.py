@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Release decisions of the processing loop, played against the simulated minigame."""
+import contextlib
+import io
+import os
+import time
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mine_tool.actions import RecordingReleaseSink, StreamTimeReleaser
+from mine_tool.capture import FileCapture, MultiRoiCapture
+from mine_tool.config import Config
+from mine_tool.sim import MinigameSimulator, run_simulation
+from mine_tool.loop import multi_roi_loop, processing_loop
+from mine_tool.stats import NullStageTimer
+from replay import run_replay
+
+EXAMPLE_VIDEO = os.path.join(os.path.dirname(__file__), os.pardir, 'assets',
+                             'mine_tool_example_v1.0.0-alpha.2+poc.mp4')
+
+class _SlowStageTimer(NullStageTimer):
+    """Makes detection take `delay` seconds of wall-clock time per frame."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def mark(self, stage):
+        if stage == 'grey':
+            time.sleep(self.delay)
+
+def _simulate(config, speed, rounds=10, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_simulation(config, speed, rounds=rounds, **kwargs)
+
+def test_stream_time_releaser_fire():
+    sink = RecordingReleaseSink()
+    releaser = StreamTimeReleaser(sink)
+    assert releaser.fire(1.0) is None
+    releaser.schedule(0.05, 7, 1.0, 1.0)
+    assert not releaser.overdue(1.02)
+    assert releaser.overdue(1.05)
+    assert releaser.fire(1.02) == 1.02
+    assert not releaser.pending
+    assert sink.releases == [{'frame_index': 7, 'timestamp': 1.02}]
+
+def test_scheduled_release_fires_when_the_line_passed_the_center():
+    # At 480 deg/s on a 120 px ROI the line moves ~8 degrees per frame, so a release
+    # is regularly still pending on the first frame past the center; it must fire
+    # then instead of being cancelled, or the round is missed
+    config = replace(Config(), roi_x1=0, roi_y1=0, roi_x2=120, roi_y2=120, release_mode='scheduled')
+    result = _simulate(config, 480)
+    assert result['misses'] == 0
+
+def test_scheduled_release_matches_frame_mode_on_large_roi():
+    config = replace(Config(), roi_x1=0, roi_y1=0, roi_x2=600, roi_y2=600, release_mode='scheduled')
+    result = _simulate(config, 240)
+    assert result['misses'] == 0
+    assert result['hits'] == result['rounds']
+
+def test_coarse_to_fine_releases_on_large_roi():
+    # Coarse frames only track the line; the window searched near the release is at full resolution
+    config = replace(Config(), roi_x1=0, roi_y1=0, roi_x2=600, roi_y2=600, coarse_to_fine=True)
+    result = _simulate(config, 240)
+    assert result['hits'] == result['rounds']
+    assert result['timing_error_ms']['max_abs'] < 1000.0 / 60
+
+def test_stream_time_results_ignore_processing_time():
+    # In stream time a release lands at its frame's timestamp, however long the frame took
+    # on the wall clock, so the prediction must not lead by the measured processing time
+    config = replace(Config(), release_mode='frame')
+    fast = _simulate(config, 360, rounds=4)
+    slow = _simulate(config, 360, rounds=4, stage_timer=_SlowStageTimer(0.01))
+    assert slow == fast
+
+def _write_record(path, frames, fps):
+    np.savez(path, frames=frames, timestamp=np.arange(len(frames)) / fps)
+    return str(path)
+
+def test_repeated_frames_are_skipped_without_changing_the_releases(tmp_path):
+    config = Config()
+    simulator = MinigameSimulator.from_config(config, rounds=3, noise=6.0)
+    width, height = config.roi_size
+    frames = np.stack([simulator.render(i / 30.0, np.empty((height, width, 3), dtype=np.uint8))
+                       for i in range(120)])
+    # A 60 FPS capture of the game drawn at 30 FPS shows every frame twice
+    game = _write_record(tmp_path / "game.npz", frames, 30.0)
+    capture = _write_record(tmp_path / "capture.npz", np.repeat(frames, 2, axis=0), 60.0)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = run_replay(game, config)
+        report = run_replay(capture, config)
+    assert len(expected['releases']) == 3
+    # The repeats neither feed the tracker a standstill nor delay a release
+    assert [r['timestamp'] for r in report['releases']] == [r['timestamp'] for r in expected['releases']]
+    assert [r['frame_index'] for r in report['releases']] == [2 * r['frame_index'] for r in expected['releases']]
+    # Every repeat skips detection: as unchanged, or as empty between rounds
+    counters = report['counters']
+    assert counters['unchanged_frames'] > 0
+    assert counters['unchanged_frames'] + counters.get('empty_frames', 0) >= len(frames)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_multi_roi_loop_runs_each_client_on_its_own(tmp_path, workers):
+    config = replace(Config(), release_mode='frame')
+    width, height = config.roi_size
+    # Two clients side by side, at different speeds
+    simulators = [MinigameSimulator.from_config(config, rounds=3, noise=6.0),
+                  MinigameSimulator.from_config(config, rounds=3, noise=6.0, speed=150.0, seed=1)]
+    rois = [(0, 0, width, height), (width + 20, 0, 2 * width + 20, height)]
+    screen = np.zeros((250, height, 2 * width + 20, 3), dtype=np.uint8)
+    client = np.empty((height, width, 3), dtype=np.uint8)
+    for i, frame in enumerate(screen):
+        for simulator, (x1, y1, x2, y2) in zip(simulators, rois):
+            frame[y1:y2, x1:x2] = simulator.render(i / 60.0, client)
+    path = _write_record(tmp_path / "screen.npz", screen, 60.0)
+
+    sinks = [RecordingReleaseSink() for _ in rois]
+    with MultiRoiCapture('file', rois, path) as capture, contextlib.redirect_stdout(io.StringIO()):
+        multi_roi_loop(config, capture, sinks, workers=workers)
+
+    for roi, sink in zip(rois, sinks):
+        alone = RecordingReleaseSink()
+        with FileCapture(roi, path) as capture, contextlib.redirect_stdout(io.StringIO()):
+            processing_loop(config, capture, alone)
+        assert len(alone.releases) == 3
+        assert sink.releases == alone.releases
+    assert sinks[0].releases != sinks[1].releases
+
+@pytest.mark.skipif(not os.path.exists(EXAMPLE_VIDEO), reason="example recording not available")
+def test_readme_replay_example_releases_in_each_round():
+    # The bar's ROI in the example recording, with the tolerance its compression needs (see README.md)
+    config = replace(Config(), color_tolerance=25)
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = run_replay(EXAMPLE_VIDEO, config, region=(786, 459, 889, 562))
+    assert [release['frame_index'] for release in report['releases']] == [10, 75]
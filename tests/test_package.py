@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Importing the package and the entry point without side effects."""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+IMPORT_SCRIPT = """
+import sys
+import app
+import mine_tool
+from mine_tool import load_config
+
+config = load_config()
+assert 'cv2' not in sys.modules, "loading the config imported OpenCV"
+from mine_tool import Detector
+Detector.from_config(config)
+hooks = {'pynput', 'tkinter', 'PIL', 'mss'} & set(sys.modules)
+assert not hooks, f"detection imported {hooks}"
+"""
+
+def test_import_has_no_side_effects(tmp_path):
+    # Run from an empty directory, where a written config.ini would show
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    result = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert os.listdir(tmp_path) == []
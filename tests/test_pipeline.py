@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Shared-memory frame ring and the capture process."""
+import contextlib
+import io
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+
+from mine_tool.actions import RecordingReleaseSink
+from mine_tool.config import Config
+from mine_tool.loop import processing_loop
+from mine_tool.pipeline import RingCapture, SharedFrameRing, _capture_process_main
+
+def test_ring_read_into_detects_overwritten_frames():
+    ring = SharedFrameRing.create((4, 4, 3), slots=2)
+    try:
+        out = np.empty((4, 4, 3), dtype=np.uint8)
+        ring.frames[1] = 7
+        ring.slot_seq[1] = 3
+        assert ring.read_into(3, out)
+        assert (out == 7).all()
+        assert not ring.read_into(1, out)
+        ring.slot_seq[1] = 5
+        assert not ring.read_into(3, out)
+    finally:
+        ring.close()
+
+def test_capture_waits_for_the_frame_being_processed():
+    config = Config()
+    stop_event, frame_ready = threading.Event(), threading.Event()
+    roi_width, roi_height = config.roi_size
+    ring = SharedFrameRing.create((roi_height, roi_width, 3), period=0.0, origin=config.roi[:2])
+    capture = RingCapture(ring, frame_ready, stop_event)
+    # The capture loop in a thread shares the ring's locks just as the capture process does
+    writer = threading.Thread(target=_capture_process_main,
+                              args=(ring.spec, 'sim', config.roi, '', frame_ready, stop_event), daemon=True)
+    writer.start()
+    try:
+        for _ in range(3):
+            frame = capture.grab()
+            held = frame.copy()
+            # About a dozen simulated frames: the capture fills every other slot, then waits
+            time.sleep(0.2)
+            assert np.array_equal(frame, held)
+            assert ring.latest[0] == capture.frame_index + ring.slots - 1
+    finally:
+        stop_event.set()
+        capture.close()
+        writer.join(timeout=5.0)
+        ring.close()
+
+def test_simulated_capture_process_drives_releases():
+    config = Config(overlay_mode='off', skip_unchanged_frames=True)
+    ctx = multiprocessing.get_context('spawn')
+    stop_event, frame_ready = ctx.Event(), ctx.Event()
+    roi_width, roi_height = config.roi_size
+    ring = SharedFrameRing.create((roi_height, roi_width, 3), period=0.0, origin=config.roi[:2])
+    process = ctx.Process(target=_capture_process_main,
+                          args=(ring.spec, 'sim', config.roi, '', frame_ready, stop_event), daemon=True)
+    process.start()
+    sink = RecordingReleaseSink()
+    capture = RingCapture(ring, frame_ready, stop_event)
+    # Two simulated rounds start within the first three seconds
+    timer = threading.Timer(4.0, stop_event.set)
+    timer.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            processing_loop(config, capture, sink, stop_event=stop_event)
+    finally:
+        timer.cancel()
+        stop_event.set()
+        capture.close()
+        process.join(timeout=5.0)
+        ring.close()
+    assert capture.frame_index > 0
+    assert sink.releases
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Flight recorder dumps."""
+import contextlib
+import io
+
+import numpy as np
+
+from mine_tool.recorder import FlightRecorder, load_flight_record
+
+def _record(recorder, frame_indices):
+    for i in frame_indices:
+        recorder.record(np.full((2, 3, 3), i, dtype=np.uint8), i, i / 60.0, i / 60.0, released=(i == 9),
+                        angle_grey=-1.0, angle_white=None)
+
+def _dump(recorder, directory):
+    """Stops the recorder and loads its only dump."""
+    recorder.stop()
+    (path,) = directory.iterdir()
+    return load_flight_record(str(path))
+
+def test_dump_hands_the_ring_to_the_writer(tmp_path):
+    recorder = FlightRecorder((2, 3, 3), size=8, post_frames=2, directory=str(tmp_path))
+    recorder.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _record(recorder, range(10))
+        ring = recorder.frames
+        recorder.trigger('release')
+        _record(recorder, range(10, 13))
+        # The dump swapped the ring out instead of copying it
+        assert recorder._snapshot['frames'] is ring
+        assert recorder.frames is not ring
+        record = _dump(recorder, tmp_path)
+
+    assert str(record['reason']) == 'release'
+    assert int(record['trigger_frame']) == 12
+    # The 8 most recent frames, oldest first, across the ring's wrap
+    assert record['frame_index'].tolist() == list(range(5, 13))
+    assert record['frames'][:, 0, 0, 0].tolist() == list(range(5, 13))
+    assert record['released'].tolist() == [i == 9 for i in range(5, 13)]
+    assert np.isnan(record['angle_white']).all() and (record['angle_grey'] == -1.0).all()
+
+def test_ring_starts_over_after_a_dump(tmp_path):
+    recorder = FlightRecorder((2, 3, 3), size=8, post_frames=0, directory=str(tmp_path))
+    recorder.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _record(recorder, range(10))
+        recorder.trigger('miss')
+        _record(recorder, [10])
+        recorder.stop()
+        next(tmp_path.iterdir()).unlink()
+
+        recorder.start()
+        _record(recorder, range(11, 14))
+        recorder.trigger('miss')
+        _record(recorder, [14])
+        record = _dump(recorder, tmp_path)
+
+    assert record['frame_index'].tolist() == list(range(11, 15))
+    assert record['frames'][:, 0, 0, 0].tolist() == list(range(11, 15))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Frame pacing of the deadline-based scheduler."""
+import pytest
+
+from mine_tool import scheduler as scheduler_module
+from mine_tool.scheduler import FrameScheduler
+
+class _Clock:
+    """Stands in for the `time` module; sleeping advances the clock instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # A zero-second yield while spinning still lets a little time pass
+        seconds = max(seconds, 1e-5)
+        self.now += seconds
+        self.slept += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(scheduler_module, 'time', clock)
+    return clock
+
+def test_scheduler_modes(clock):
+    scheduler = FrameScheduler(frame_period=0.01, idle_frame_period=0.05, idle_delay=0.5, burst_distance=60.0)
+    assert scheduler.mode == FrameScheduler.IDLE and scheduler.period == 0.05
+
+    assert scheduler.update(False, True) == FrameScheduler.ACTIVE
+    assert scheduler.period == 0.01
+    # Approaching the white area closely enough runs without waiting
+    assert scheduler.update(True, True, arc_distance=40.0, arc_velocity=-5.0) == FrameScheduler.BURST
+    assert scheduler.period == 0.0
+    # Moving away from it, or still far off, does not
+    assert scheduler.update(True, True, arc_distance=40.0, arc_velocity=5.0) == FrameScheduler.ACTIVE
+    assert scheduler.update(True, True, arc_distance=80.0, arc_velocity=-5.0) == FrameScheduler.ACTIVE
+
+    clock.now += 0.4
+    assert scheduler.update(False, False) == FrameScheduler.ACTIVE
+    clock.now += 0.2
+    assert scheduler.update(False, False) == FrameScheduler.IDLE
+
+def test_scheduler_subtracts_the_frame_work_from_the_period(clock):
+    scheduler = FrameScheduler(frame_period=0.01)
+    scheduler.update(True, True)
+    scheduler.wait()
+    start = clock.now
+    for _ in range(5):
+        clock.now += 0.004
+        scheduler.wait()
+    # Frames start on a fixed 10 ms grid, however long their work took
+    assert clock.now == pytest.approx(start + 0.05, abs=1e-4)
+
+def test_scheduler_restarts_after_an_overrun(clock):
+    scheduler = FrameScheduler(frame_period=0.01)
+    scheduler.update(True, True)
+    scheduler.wait()
+    clock.now += 0.035
+    slept = clock.slept
+    # A late frame does not wait, and the following frames do not try to catch up
+    scheduler.wait()
+    assert clock.slept == slept
+    overrun = clock.now
+    clock.now += 0.002
+    scheduler.wait()
+    assert clock.now == pytest.approx(overrun + 0.01, abs=1e-4)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""The simulated minigame: its ground truth, scoring and capture backend."""
+import contextlib
+import io
+import math
+
+import numpy as np
+import pytest
+
+from mine_tool.capture import EndOfStream, create_capture_backend
+from mine_tool.config import Config
+from mine_tool.detector import Detector
+from mine_tool.sim import MinigameSimulator, run_simulation
+
+@pytest.mark.parametrize('acceleration', [0.0, 300.0])
+def test_line_is_drawn_on_the_zone_center_at_the_crossing_time(acceleration):
+    config = Config()
+    simulator = MinigameSimulator.from_config(config, rounds=4, acceleration=acceleration)
+    detector = Detector.from_config(config)
+    width, height = config.roi_size
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+
+    for game_round in simulator.rounds:
+        # Rounds alternate ends; both sweeps meet the zone center at the crossing time
+        assert simulator.line_angle(game_round, game_round.crossing_time) == pytest.approx(game_round.zone_center)
+        detection = detector.detect(simulator.render(game_round.crossing_time, frame))
+        assert detection.visible
+        assert detection.angle_grey == pytest.approx(game_round.zone_center, abs=math.radians(3.0))
+        assert detection.angle_white == pytest.approx(game_round.zone_center, abs=math.radians(3.0))
+        # Releasing starts the next round
+        simulator.release(game_round.crossing_time)
+    assert simulator.score()['hits'] == len(simulator.rounds)
+
+def test_releases_are_scored_against_the_crossing_time():
+    simulator = MinigameSimulator.from_config(Config(), rounds=3)
+    first, second, third = simulator.rounds
+    simulator.release(first.crossing_time + 0.004)
+    assert second.start_time == pytest.approx(first.released_at + simulator.gap)
+    # Long before the crossing, the line is outside the white area
+    simulator.release(second.start_time + 0.01)
+
+    assert first.hit and first.timing_error == pytest.approx(0.004)
+    assert not second.hit and second.timing_error < 0
+    assert simulator.finished(third.end_time + simulator.gap)
+    score = simulator.score()
+    assert (score['rounds'], score['hits'], score['misses']) == (3, 1, 1)
+    assert score['timing_error_ms']['max_abs'] == pytest.approx(second.crossing_time * 1000.0
+                                                                - second.start_time * 1000.0 - 10.0)
+
+@pytest.mark.parametrize('channels', [3, 4])
+def test_sim_capture_backend_plays_the_rounds_in_stream_time(channels):
+    config = Config()
+    simulator = MinigameSimulator.from_config(config, rounds=1)
+    capture = create_capture_backend('sim', config.roi, channels=channels, simulator=simulator, realtime=False)
+    try:
+        frames = 0
+        with pytest.raises(EndOfStream):
+            while True:
+                frame = capture.grab()
+                assert capture.timestamp == pytest.approx(frames / 60.0)
+                frames += 1
+        assert frame.shape == config.roi_size[::-1] + (channels,)
+    finally:
+        capture.close()
+    # Unreleased, the round lasts until the line reaches the far end, followed by a gap
+    game_round, = simulator.rounds
+    assert game_round.released_at is None
+    assert (frames - 1) / 60.0 < game_round.end_time + simulator.gap <= frames / 60.0
+
+def test_run_simulation_scores_the_processing_loop():
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = run_simulation(Config(), 240, rounds=4)
+    assert (result['rounds'], result['hits'], result['misses']) == (4, 4, 0)
+    # Scheduled releases land within a fraction of a frame of the crossing
+    assert result['timing_error_ms']['max_abs'] < 1000.0 / 60
+    assert result['duration_s'] == pytest.approx((result['frames'] - 1) / 60.0)
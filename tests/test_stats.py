@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Live timing stats, their log and the HTTP endpoint."""
+import csv
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from mine_tool.stats import LatencyHistogram, LiveStats, StatsLogger, serve_stats
+
+def _live_stats():
+    """LiveStats with a few recorded frames and counters."""
+    stats = LiveStats(counters=('dropped_frames', 'failed_captures'))
+    for _ in range(3):
+        stats.start()
+        stats.mark('capture')
+        stats.mark('white')
+        stats.end()
+    stats.count('dropped_frames', 2)
+    return stats
+
+def test_latency_histogram_percentiles():
+    rng = np.random.default_rng(0)
+    samples = rng.lognormal(np.log(0.002), 0.5, 10000)
+    histogram = LatencyHistogram()
+    for seconds in samples:
+        histogram.add(seconds)
+
+    for measured, expected in zip(histogram.percentiles((50, 95, 99)), np.percentile(samples, (50, 95, 99))):
+        assert measured == pytest.approx(expected, rel=0.05)
+    assert histogram.percentiles((100,)) == [samples.max()]
+    assert histogram.total == len(samples)
+
+def test_live_stats_snapshot():
+    stats = _live_stats()
+    # Stages recorded from another thread use that thread's own timeline
+    worker = threading.Thread(target=lambda: (stats.start(), stats.mark('grey'), stats.end()))
+    worker.start()
+    worker.join()
+
+    snapshot = stats.snapshot()
+    assert snapshot['frames'] == 4
+    assert {stage: row['count'] for stage, row in snapshot['stages'].items()} == \
+        {'capture': 3, 'white': 3, 'grey': 1, 'total': 4}
+    assert snapshot['counters'] == {'dropped_frames': 2, 'failed_captures': 0}
+    assert json.loads(json.dumps(snapshot)) == snapshot
+    assert "dropped_frames 2" in stats.stats_line()
+
+@pytest.mark.parametrize('fmt', StatsLogger.FORMATS)
+def test_stats_logger_appends_snapshots(tmp_path, fmt):
+    path = str(tmp_path / f"stats.{fmt}")
+    stats = _live_stats()
+    logger = StatsLogger(stats, path, interval=60.0, fmt=fmt)
+    logger.write()
+    stats.count('failed_captures')
+    logger.stop()
+
+    with open(path, newline='') as f:
+        if fmt == 'jsonl':
+            rows = [json.loads(line) for line in f]
+            counters = [row['counters']['failed_captures'] for row in rows]
+        else:
+            rows = list(csv.DictReader(f))
+            counters = [int(row['failed_captures']) for row in rows]
+            assert float(rows[0]['capture_p95_ms']) >= 0.0
+    assert counters == [0, 1]
+
+def test_stats_endpoint_serves_the_snapshot():
+    stats = _live_stats()
+    server = serve_stats(stats, 0)
+    # Talk to the endpoint directly, even if a proxy is configured
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        for path in ('/', '/stats'):
+            with opener.open(url + path, timeout=5) as response:
+                assert response.headers['Content-Type'] == 'application/json'
+                snapshot = json.load(response)
+            assert snapshot['frames'] == 3
+            assert snapshot['counters']['dropped_frames'] == 2
+        with pytest.raises(urllib.error.HTTPError) as error:
+            opener.open(url + '/other', timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
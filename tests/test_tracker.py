@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""AlphaBetaTracker and LatencyEstimator."""
+import math
+
+import pytest
+
+from mine_tool.tracker import AlphaBetaTracker, LatencyEstimator
+
+def test_tracker_starts_at_the_measured_speed():
+    tracker = AlphaBetaTracker()
+    speed = math.radians(480)
+    angle = None
+    for frame in range(4):
+        angle, velocity = tracker.update(-math.pi / 2 + speed * frame / 60, frame / 60)
+    assert velocity == pytest.approx(speed, rel=1e-6)
+    assert angle == pytest.approx(-math.pi / 2 + speed * 3 / 60)
+    assert tracker.predict(0.01) == pytest.approx(angle + speed * 0.01)
+
+def test_tracker_first_measurement_has_no_velocity():
+    tracker = AlphaBetaTracker()
+    assert tracker.update(0.2, 0.0) == (0.2, 0.0)
+
+def test_tracker_restarts_after_a_jump():
+    tracker = AlphaBetaTracker()
+    tracker.update(-1.5, 0.0)
+    tracker.update(-1.4, 1 / 60)
+    assert tracker.update(-0.2, 2 / 60) == (-0.2, 0.0)
+    # The measurement after a restart initializes the velocity again
+    _, velocity = tracker.update(-0.1, 3 / 60)
+    assert velocity == pytest.approx(0.1 * 60)
+
+def test_latency_estimator_smooths():
+    estimator = LatencyEstimator(smoothing=0.5)
+    assert estimator.observe(0.01) == 0.01
+    assert estimator.observe(0.03) == pytest.approx(0.02)
+    assert estimator.observe(-1.0) == pytest.approx(0.02)
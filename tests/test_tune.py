@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""The vectorized tuner against the processing loop it models."""
+import contextlib
+import io
+import itertools
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mine_tool import loop
+from mine_tool.actions import RecordingReleaseSink
+from mine_tool.capture import FileCapture
+from mine_tool.config import Config
+from mine_tool.detector import Detection
+from mine_tool.sim import MinigameSimulator
+from tune import GRID_PARAMETERS, evaluate_grid, extract_trace, parse_values, run_tuning
+
+GRID_VALUES = {
+    'MIDDLE_THRESHOLD': [5.0, 15.0, 30.0],
+    'LOOKAHEAD_FACTOR': [0.0, 0.02],
+    'EXPONENTIAL_POWER': [1.0, 1.1],
+    'CLICK_COOLDOWN_DURATION': [0.05, 2.0],
+}
+
+def _tuning_config():
+    """The settings the tuner's results apply to, with every frame detected in full."""
+    return replace(Config(), prediction_model='legacy', release_mode='frame', skip_unchanged_frames=False)
+
+@pytest.fixture(scope='module')
+def recording(tmp_path_factory):
+    """A recording of three simulated rounds at 60 FPS, in which nothing is released."""
+    config = Config()
+    simulator = MinigameSimulator.from_config(config, rounds=3, noise=6.0)
+    width, height = config.roi_size
+    frames = np.stack([simulator.render(i / 60.0, np.empty((height, width, 3), dtype=np.uint8))
+                       for i in range(250)])
+    path = str(tmp_path_factory.mktemp('tune') / "rounds.npz")
+    np.savez(path, frames=frames, timestamp=np.arange(len(frames)) / 60.0)
+    return path
+
+class _TraceDetector:
+    """Stands in for the loop's Detector and returns a tuner trace's detections, one frame after another."""
+    trace = None
+
+    def __init__(self):
+        self.frame = 0
+
+    @classmethod
+    def from_config(cls, config, roi_width=None, roi_height=None):
+        return cls()
+
+    def empty(self):
+        return Detection()
+
+    def detect(self, frame_bgr, stage_timer=None, near=None):
+        trace, i = self.trace, self.frame
+        self.frame += 1
+        if not trace['valid'][i]:
+            return Detection()
+        return Detection(grey_center=(0, 0), white_center=(0, 0), angle_grey=trace['angle_grey'][i],
+                         angle_white=trace['angle_white'][i], radius=trace['radius'][i])
+
+def _loop_releases(config, source, trace, monkeypatch):
+    """Number of releases the processing loop makes on `source`, deciding on the detections of `trace`."""
+    monkeypatch.setattr(_TraceDetector, 'trace', trace)
+    monkeypatch.setattr(loop, 'Detector', _TraceDetector)
+    sink = RecordingReleaseSink()
+    with FileCapture(config.roi, source) as capture, contextlib.redirect_stdout(io.StringIO()):
+        loop.processing_loop(config, capture, sink)
+    return len(sink.releases)
+
+def test_grid_releases_match_the_processing_loop(recording, monkeypatch):
+    config = _tuning_config()
+    grid = np.array(list(itertools.product(*(GRID_VALUES[name] for name in GRID_PARAMETERS))))
+    trace = extract_trace(config, recording, None, config.color_tolerance)
+    metrics = evaluate_grid(trace, grid, latency=0.0, hit_window=5.0)
+
+    # Batch detection places the line by its pixels' centroid rather than its contour's, so
+    # the loop is run on the same detections to compare the release logic alone
+    assert metrics['releases'].max() > 0
+    for row, (threshold, lookahead, power, cooldown) in enumerate(grid):
+        row_config = replace(config, middle_threshold=threshold, lookahead_factor=lookahead,
+                             exponential_power=power, click_cooldown_duration=cooldown)
+        assert metrics['releases'][row] == _loop_releases(row_config, recording, trace, monkeypatch), \
+            dict(zip(GRID_PARAMETERS, grid[row]))
+    assert (metrics['hits'] <= metrics['scored']).all() and (metrics['scored'] <= metrics['releases']).all()
+
+def test_run_tuning_ranks_the_grid(recording):
+    results, crossings = run_tuning(_tuning_config(), [recording], None, [15.0], GRID_VALUES, workers=1)
+
+    assert len(results) == np.prod([len(values) for values in GRID_VALUES.values()])
+    # One center crossing per round
+    assert crossings == {15.0: 3}
+    best = results[0]
+    assert best['hits'] == 3 and best['releases'] == 3
+    keys = [(-r['hits'], r['releases'] - r['hits'], r['mean_abs_error']) for r in results]
+    assert keys == sorted(keys)
+
+def test_parse_values():
+    assert parse_values("5:15:5") == [5.0, 10.0, 15.0]
+    assert parse_values("0.5,1") == [0.5, 1.0]
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Frames and detection results handed from the processing loop to the debug view."""
+import contextlib
+import io
+import sys
+import threading
+import types
+from dataclasses import replace
+
+import numpy as np
+import PIL
+
+from mine_tool.actions import RecordingReleaseSink
+from mine_tool.capture import FileCapture
+from mine_tool.config import Config
+from mine_tool.loop import processing_loop
+from mine_tool.overlay import draw_overlay
+from mine_tool.sim import MinigameSimulator
+from mine_tool.view import DebugViewMailbox, run_debug_view
+
+def _round_frames(config, count=5, fps=60.0):
+    """Simulated frames from the middle of the first round, with the grey line and white area visible."""
+    simulator = MinigameSimulator.from_config(config)
+    width, height = config.roi_size
+    start = simulator.gap + 0.1
+    return np.stack([simulator.render(start + i / fps, np.empty((height, width, 3), dtype=np.uint8))
+                     for i in range(count)])
+
+def _run_loop(config, frames, view, directory):
+    """Runs the processing loop over `frames` with `view` as its debug view."""
+    path = str(directory / "frames.npz")
+    np.savez(path, frames=frames, timestamp=np.arange(len(frames)) / 60.0)
+    with FileCapture(config.roi, path) as capture, contextlib.redirect_stdout(io.StringIO()):
+        processing_loop(config, capture, RecordingReleaseSink(), view=view)
+
+def test_mailbox_drops_frames_while_the_view_is_busy():
+    view = DebugViewMailbox()
+    frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(4)]
+    assert view.take() is None
+    assert view.publish(frames[0], 'first')
+    # Until the view takes the first frame, newer ones are dropped
+    assert not view.publish(frames[1], 'second') and view.busy()
+    first = view.take()
+    assert first.result == 'first' and (first.image == 0).all()
+    assert view.take() is None
+
+    # The next frame goes to the other slot, so the one being drawn stays intact
+    assert view.publish(frames[2], 'third')
+    assert (first.image == 0).all()
+    second = view.take()
+    assert second is not first and (second.image == 2).all()
+    # Each slot copies into the buffers it allocated the first time
+    image = first.image
+    assert view.publish(frames[3], 'fourth')
+    assert view.take() is first and first.image is image and (image == 3).all()
+
+def test_lazy_overlay_is_left_to_the_view(tmp_path):
+    config = replace(Config(), overlay_mode='lazy')
+    frames = _round_frames(config)
+    view = DebugViewMailbox()
+    _run_loop(config, frames, view, tmp_path)
+
+    # The view had not taken the first frame, so the later ones were dropped untouched
+    slot = view.take()
+    assert slot.result is not None and slot.result.white_center is not None
+    assert np.array_equal(slot.image, frames[0])
+    draw_overlay(slot.image, slot.result)
+    assert not np.array_equal(slot.image, frames[0])
+
+def test_eager_overlay_is_drawn_by_the_loop(tmp_path):
+    config = replace(Config(), overlay_mode='eager')
+    frames = _round_frames(config)
+    view = DebugViewMailbox()
+    _run_loop(config, frames, view, tmp_path)
+
+    slot = view.take()
+    assert slot.result is None
+    assert not np.array_equal(slot.image, frames[0])
+
+def test_no_overlay_work_without_the_view(tmp_path):
+    config = replace(Config(), overlay_mode='off')
+    view = DebugViewMailbox()
+    _run_loop(config, _round_frames(config), view, tmp_path)
+    assert view.take() is None
+
+class _FakeTk:
+    """The parts of tkinter the debug view uses; `after()` callbacks run one per `mainloop()` step."""
+    TclError = Exception
+    LEFT = 'left'
+    X = 'x'
+
+    def __init__(self):
+        self.callbacks = []
+        self.running = False
+
+    def Tk(self):
+        return self
+
+    def Label(self, *args, **kwargs):
+        return self
+
+    def Frame(self, *args, **kwargs):
+        return self
+
+    def title(self, *args, **kwargs):
+        pass
+
+    attributes = resizable = pack = destroy = title
+
+    def winfo_exists(self):
+        return False
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def quit(self):
+        self.running = False
+
+    def mainloop(self):
+        self.running = True
+        while self.running and self.callbacks:
+            self.callbacks.pop(0)()
+
+class _FakePhotoImage:
+    """Records every image pasted into the view's PhotoImage."""
+    pasted = []
+
+    def __init__(self, image):
+        pass
+
+    def paste(self, image):
+        self.pasted.append(np.array(image))
+
+def test_debug_view_composites_each_new_frame_once(monkeypatch):
+    fake_tk = _FakeTk()
+    monkeypatch.setitem(sys.modules, 'tkinter', fake_tk)
+    monkeypatch.setattr(PIL, 'ImageTk', types.SimpleNamespace(PhotoImage=_FakePhotoImage), raising=False)
+    monkeypatch.setattr(_FakePhotoImage, 'pasted', [])
+
+    frame = np.zeros((20, 20, 3), dtype=np.uint8)
+    frame[..., 2] = 200
+    grey_mask = np.zeros((20, 20), dtype=np.uint8)
+    grey_mask[:5] = 255
+    view = DebugViewMailbox()
+    view.publish(frame, None, grey_mask=grey_mask)
+    stop_event = threading.Event()
+    intervals = []
+
+    def count_steps(ms, callback):
+        intervals.append(ms)
+        if len(intervals) == 4:
+            stop_event.set()
+        fake_tk.callbacks.append(callback)
+
+    fake_tk.after = count_steps
+    run_debug_view(view, 10, 10, 30, stop_event)
+
+    # One paste for the one published frame, none while nothing new arrives
+    (canvas,) = _FakePhotoImage.pasted
+    assert canvas.shape == (10, 40, 3)
+    assert (canvas[:, :10] == (200, 0, 0)).all()
+    assert (canvas[:2, 10:20] == 255).all() and not canvas[3:, 10:20].any()
+    # Updates are throttled to DISPLAY_FPS
+    assert intervals == [33] * 4
+    assert stop_event.is_set()
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Offline parameter tuner for Mine Tool.
+
+Extracts the grey line / white area angle traces from recorded sessions once
+per COLOR_TOLERANCE with the batch detector (see mine_tool/batch.py), then
+evaluates the release logic of the legacy prediction model
+(MIDDLE_THRESHOLD, LOOKAHEAD_FACTOR, EXPONENTIAL_POWER and
+CLICK_COOLDOWN_DURATION) for every combination of a parameter grid at once
+with NumPy, spread over a process pool. The results only apply with
+PREDICTION_MODEL = legacy and RELEASE_MODE = frame.
+
+Each release is scored by where the grey line actually was, relative to the
+white area's center, `--latency` seconds after the frame that triggered it.
+A release within `--hit-window` pixels of the center is a hit.
+
+Usage:
+    python tune.py recording.mp4 --region 786,459,889,562
+    python tune.py flight_records/*.npz --tolerance 10,15,20 --threshold 5:30:5
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mine_tool.batch import BatchDetector, BatchResult, iter_frame_batches
+from mine_tool.capture import FileCapture, parse_region
+from mine_tool.config import CONFIG_FILE, load_config
+from mine_tool.geometry import get_arc_geometry
+
+# Parameters evaluated per grid point, in grid column order
+GRID_PARAMETERS = ("MIDDLE_THRESHOLD", "LOOKAHEAD_FACTOR", "EXPONENTIAL_POWER", "CLICK_COOLDOWN_DURATION")
+
+# The release logic the grid is evaluated with
+REQUIRED_SETTINGS = {'PREDICTION_MODEL': 'legacy', 'RELEASE_MODE': 'frame'}
+
+def extract_trace(config, source, region, color_tolerance):
+    """
+    Runs batch detection over every frame of `source` with the colors and
+    ROI of `config` and returns a dict of per-frame arrays: 'time', 'valid',
+    'angle_grey', 'angle_white' and 'radius' (NaN where not detected).
+    """
+    capture = FileCapture(config.roi, source, region=region)
+    capture.open()
+    geometry = get_arc_geometry(capture.width, capture.height, config.bar_thickness_percentage,
+                                config.arc_geometry_cache)
+    detector = BatchDetector(geometry, config.grey_bgr, config.white_bgr, color_tolerance,
+                             grey_min_area=config.grey_line_min_area)
+
+    times, results = [], []
+    try:
+        for frames, timestamps in iter_frame_batches(capture, detector.batch_size):
+            results.append(detector.detect(frames))
+            times.append(timestamps.copy())
+    finally:
+        capture.close()
+
+    if not results:
+        empty = np.empty(0)
+        return {'time': empty, 'valid': np.empty(0, dtype=bool), 'angle_grey': empty,
+                'angle_white': empty, 'radius': empty}
+    result = BatchResult.concatenate(results)
+    return {
+        'time': np.concatenate(times),
+        'valid': result.valid,
+        'angle_grey': result.angle_grey,
+        'angle_white': result.angle_white,
+        'radius': result.radius,
+    }
+
+def _landing_error(trace, latency):
+    """
+    Signed position (pixels along the arc) of the grey line relative to the
+    white area's center `latency` seconds after each frame, interpolated over
+    the frames where both were detected. NaN where it cannot be determined.
+    """
+    valid = trace['valid']
+    offset = (trace['angle_grey'] - trace['angle_white']) * trace['radius']
+    error = np.full(len(offset), np.nan)
+    if np.count_nonzero(valid) < 2:
+        return error
+    valid_time = trace['time'][valid]
+    landing = trace['time'] + latency
+    error = np.interp(landing, valid_time, offset[valid], left=np.nan, right=np.nan)
+    # Do not interpolate across gaps where the minigame was not on screen
+    index = np.searchsorted(valid_time, landing)
+    gap = np.ones(len(landing), dtype=bool)
+    inside = (index > 0) & (index < len(valid_time))
+    gap[inside] = (valid_time[index[inside]] - valid_time[index[inside] - 1]) > 0.25
+    error[gap] = np.nan
+    return error
+
+def _crossings(trace):
+    """Number of times the grey line passes the white area's center between consecutive valid frames."""
+    valid = trace['valid']
+    offset = (trace['angle_grey'] - trace['angle_white'])[valid]
+    return int(np.count_nonzero(np.signbit(offset[1:]) != np.signbit(offset[:-1])))
+
+def evaluate_grid(trace, grid, latency, hit_window):
+    """
+    Evaluates the legacy release logic of `processing_loop` for every row
+    of `grid` (columns as in GRID_PARAMETERS) over one trace.
+
+    Returns a dict of per-row arrays: 'releases', 'hits', 'scored' (releases
+    whose landing position is known), 'abs_error_sum' and 'max_abs_error'.
+    """
+    threshold, lookahead, power, cooldown = (grid[:, i:i + 1] for i in range(4))
+    valid, frame_time = trace['valid'], trace['time']
+    if not valid.any():
+        zeros = np.zeros(len(grid))
+        return {'releases': zeros, 'hits': zeros, 'scored': zeros, 'abs_error_sum': zeros, 'max_abs_error': zeros}
+
+    # Arc distance and its rate of change, reset whenever detection drops out
+    arc_distance = np.abs(trace['angle_grey'] - trace['angle_white']) * trace['radius']
+    velocity = np.zeros(len(arc_distance))
+    both = valid[1:] & valid[:-1]
+    dt = np.diff(frame_time)
+    ok = both & (dt > 0)
+    velocity[1:][ok] = np.diff(arc_distance)[ok] / dt[ok]
+
+    # (grid, frames) trigger distances and the frames that would fire ignoring the cooldown
+    approaching = velocity < 0
+    prediction = lookahead * np.power(np.abs(velocity), power)
+    trigger_distance = np.where(approaching, arc_distance - prediction, arc_distance)
+    wants_release = valid & (trigger_distance < threshold)
+
+    # The cooldown is the only sequential part; step through frames for all grid rows at once
+    fired = np.zeros_like(wants_release)
+    cooldown = cooldown[:, 0]
+    last_release = np.full(len(grid), -np.inf)
+    for t in np.flatnonzero(wants_release.any(axis=0)):
+        # Compared as the processing loop does, so frames exactly one cooldown apart round the same way
+        fire = wants_release[:, t] & (frame_time[t] - last_release >= cooldown)
+        fired[:, t] = fire
+        last_release[fire] = frame_time[t]
+
+    error = np.abs(_landing_error(trace, latency))
+    scored = fired & ~np.isnan(error)
+    error = np.nan_to_num(error)
+    return {
+        'releases': fired.sum(axis=1),
+        'hits': (scored & (error <= hit_window)).sum(axis=1),
+        'abs_error_sum': (scored * error).sum(axis=1),
+        'scored': scored.sum(axis=1),
+        'max_abs_error': (scored * error).max(axis=1, initial=0.0),
+    }
+
+def _evaluate_chunk(traces, grid, latency, hit_window):
+    """Process pool worker: sums the metrics of one grid chunk over all traces."""
+    total = None
+    for trace in traces:
+        metrics = evaluate_grid(trace, grid, latency, hit_window)
+        if total is None:
+            total = metrics
+        else:
+            for key, values in metrics.items():
+                total[key] = np.maximum(total[key], values) if key == 'max_abs_error' else total[key] + values
+    return total
+
+def _extract_traces(args):
+    config, sources, region, tolerance = args
+    return tolerance, [extract_trace(config, source, region, tolerance) for source in sources]
+
+def run_tuning(config, sources, region, tolerances, grid_values, latency=0.0, hit_window=5.0,
+               workers=None, chunk_size=256):
+    """
+    Tunes over all `sources`, with the colors and ROI of `config`. `grid_values` maps each name in GRID_PARAMETERS
+    to the values to try. Returns a list of result dicts, best first, and the
+    number of center crossings (release opportunities) per tolerance.
+    """
+    grid = np.array(list(itertools.product(*(grid_values[name] for name in GRID_PARAMETERS))),
+                    dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+
+    results = []
+    crossings = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1. Detection once per tolerance, in parallel
+        traces_by_tolerance = dict(pool.map(_extract_traces,
+                                            [(config, sources, region, tolerance) for tolerance in tolerances]))
+
+        # 2. The grid for every tolerance, in chunks
+        for tolerance in tolerances:
+            traces = traces_by_tolerance[tolerance]
+            crossings[tolerance] = sum(_crossings(trace) for trace in traces)
+            chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+            futures = [pool.submit(_evaluate_chunk, traces, chunk, latency, hit_window) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                metrics = future.result()
+                for row, params in enumerate(chunk):
+                    scored = int(metrics['scored'][row])
+                    results.append({
+                        'COLOR_TOLERANCE': tolerance,
+                        **{name: float(value) for name, value in zip(GRID_PARAMETERS, params)},
+                        'releases': int(metrics['releases'][row]),
+                        'hits': int(metrics['hits'][row]),
+                        'mean_abs_error': float(metrics['abs_error_sum'][row] / scored) if scored else float('inf'),
+                        'max_abs_error': float(metrics['max_abs_error'][row]),
+                    })
+
+    # Most hits first, then fewest wasted releases, then the smallest error
+    results.sort(key=lambda r: (-r['hits'], r['releases'] - r['hits'], r['mean_abs_error']))
+    return results, crossings
+
+def parse_values(value):
+    """Parses 'a,b,c' or 'start:stop:step' (stop inclusive) into a list of floats."""
+    try:
+        if ':' in value:
+            start, stop, step = (float(v) for v in value.split(':'))
+            return [float(v) for v in np.arange(start, stop + step / 2, step)]
+        return [float(v) for v in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected a,b,c or start:stop:step, got '{value}'")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune Mine Tool's release parameters on recorded sessions.")
+    parser.add_argument('sources', nargs='+', help="Recordings (videos or flight records) to tune on")
+    parser.add_argument('--region', type=parse_region,
+                        help="Crop x1,y1,x2,y2 in video pixels (default: the config ROI if it fits)")
+    parser.add_argument('--tolerance', type=parse_values, help="COLOR_TOLERANCE values")
+    parser.add_argument('--threshold', type=parse_values, help="MIDDLE_THRESHOLD values")
+    parser.add_argument('--lookahead', type=parse_values, help="LOOKAHEAD_FACTOR values")
+    parser.add_argument('--power', type=parse_values, help="EXPONENTIAL_POWER values")
+    parser.add_argument('--cooldown', type=parse_values, help="CLICK_COOLDOWN_DURATION values")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Seconds from the triggering frame until the release takes effect (default: 0)")
+    parser.add_argument('--hit-window', type=float, default=5.0,
+                        help="Max distance in pixels from the white area's center for a hit (default: 5)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--top', type=int, default=10, help="Number of results to list (default: 10)")
+    args = parser.parse_args(argv)
+
+    # Default grids around the current configuration
+    config = load_config(CONFIG_FILE)
+    current = {'PREDICTION_MODEL': config.prediction_model, 'RELEASE_MODE': config.release_mode}
+    differing = [name for name, value in REQUIRED_SETTINGS.items() if current[name] != value]
+    if differing:
+        print("Warning: the tuner replays PREDICTION_MODEL = legacy with RELEASE_MODE = frame, but config.ini "
+              "has " + ", ".join(f"{name} = {current[name]}" for name in differing)
+              + ". The results only apply once those are changed too.", file=sys.stderr)
+    tolerances = [int(v) for v in (args.tolerance or [config.color_tolerance])]
+    grid_values = {
+        'MIDDLE_THRESHOLD': args.threshold or parse_values("2:30:2"),
+        'LOOKAHEAD_FACTOR': args.lookahead or parse_values("0:0.05:0.0025"),
+        'EXPONENTIAL_POWER': args.power or parse_values("0.9:1.2:0.015"),
+        'CLICK_COOLDOWN_DURATION': args.cooldown or [config.click_cooldown_duration],
+    }
+    combinations = len(tolerances) * int(np.prod([len(v) for v in grid_values.values()]))
+    print(f"Evaluating {combinations} parameter combinations on {len(args.sources)} recording(s)...")
+
+    start = time.perf_counter()
+    results, crossings = run_tuning(config, args.sources, args.region, tolerances, grid_values,
+                                    args.latency, args.hit_window, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"Done in {elapsed:.2f} s. Center crossings per tolerance: "
+          + ", ".join(f"{t}: {n}" for t, n in crossings.items()))
+    columns = ('COLOR_TOLERANCE',) + GRID_PARAMETERS
+    print(" ".join(f"{name:>23}" for name in columns)
+          + f" {'hits':>5} {'releases':>8} {'mean err px':>11} {'max err px':>10}")
+    for result in results[:args.top]:
+        print(" ".join(f"{result[name]:>23g}" for name in columns)
+              + f" {result['hits']:>5} {result['releases']:>8} "
+                f"{result['mean_abs_error']:>11.2f} {result['max_abs_error']:>10.2f}")
+
+    if results:
+        best = results[0]
+        print("\nBest settings:")
+        for name in columns:
+            print(f"  {name} = {best[name]:g}")
+        for name, value in REQUIRED_SETTINGS.items():
+            print(f"  {name} = {value}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())